@@ -0,0 +1,33 @@
+#!/bin/bash
+# Переносит базу из старого контейнера (/app/wedding_bot.db) в том с данными (/data/wedding_bot.db).
+# Запустить один раз ДО первого `docker compose up` с DATABASE_URL=/app/data/wedding_bot.db:
+# после пересоздания контейнера старая база пропадёт вместе с ним.
+CONTAINER=wedding-bot
+VOLUME=wedding_bot-data
+TMP_DIR=$(mktemp -d)
+
+# Останавливаем бота, чтобы скопировать базу целиком
+docker stop $CONTAINER
+
+if ! docker cp $CONTAINER:/app/wedding_bot.db $TMP_DIR/wedding_bot.db; then
+    echo "В контейнере $CONTAINER нет /app/wedding_bot.db, переносить нечего"
+    rm -rf $TMP_DIR
+    exit 1
+fi
+# Незаписанные в базу изменения (если включён WAL)
+docker cp $CONTAINER:/app/wedding_bot.db-wal $TMP_DIR/wedding_bot.db-wal 2>/dev/null
+
+docker run --rm \
+  -v $VOLUME:/data \
+  -v $TMP_DIR:/backup \
+  alpine \
+  sh -c "if [ -e /data/wedding_bot.db ]; then echo 'В томе уже есть wedding_bot.db, перенос отменён'; exit 1; fi; cp /backup/wedding_bot.db* /data/"
+STATUS=$?
+
+rm -rf $TMP_DIR
+
+if [ $STATUS -ne 0 ]; then
+    exit $STATUS
+fi
+
+echo "База перенесена в том $VOLUME, теперь можно запускать docker compose up -d --build"
@@ -0,0 +1,139 @@
+"""JSON codec for the HTTP API
+
+Uses orjson when it is installed and falls back to the standard library
+json module otherwise. Request bodies are decoded once: the encoding comes
+from a BOM, then the Content-Type charset, and otherwise UTF-8 is assumed
+with a cp1251 fallback for bodies that are not valid UTF-8 (Windows curl).
+"""
+
+import codecs
+import json
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from typing import Any, Optional, Tuple, Union
+
+from aiohttp import web
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+# Checked in order, UTF-8 first
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+_UTF8_NAMES = {"utf-8", "utf8"}
+FALLBACK_ENCODING = "cp1251"
+
+
+class DecodeError(ValueError):
+    """Request body is not valid JSON"""
+
+
+def detect_encoding(body: bytes, charset: Optional[str] = None) -> Tuple[Optional[str], int]:
+    """
+    Detect body encoding
+
+    Returns:
+        Tuple of (encoding or None when unknown, BOM length to skip)
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return encoding, len(bom)
+    if charset:
+        return charset.lower(), 0
+    return None, 0
+
+
+def decode_text(body: bytes, charset: Optional[str] = None) -> str:
+    """Decode request body to text once"""
+    encoding, offset = detect_encoding(body, charset)
+    data = body[offset:] if offset else body
+
+    if encoding is None or encoding in _UTF8_NAMES:
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            encoding = FALLBACK_ENCODING
+
+    try:
+        return data.decode(encoding)
+    except (UnicodeDecodeError, LookupError) as e:
+        raise DecodeError(f"Cannot decode body as {encoding}") from e
+
+
+def _is_utf8(data: bytes) -> bool:
+    try:
+        data.decode("utf-8")
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def loads(body: Union[bytes, str], charset: Optional[str] = None) -> Any:
+    """
+    Parse JSON from a request body
+
+    Raises:
+        DecodeError: Body cannot be decoded or is not valid JSON
+    """
+    try:
+        if isinstance(body, str):
+            return orjson.loads(body) if orjson else json.loads(body)
+
+        encoding, offset = detect_encoding(body, charset)
+        data = body[offset:] if offset else body
+
+        if encoding is None or encoding in _UTF8_NAMES:
+            try:
+                # Both parsers validate UTF-8 while parsing, no separate decode pass
+                return orjson.loads(data) if orjson else json.loads(data)
+            except (ValueError, UnicodeDecodeError):
+                # Only bodies that aren't UTF-8 at all get the fallback decode
+                if _is_utf8(data):
+                    raise
+            encoding = FALLBACK_ENCODING
+
+        try:
+            text = data.decode(encoding)
+        except (UnicodeDecodeError, LookupError) as e:
+            raise DecodeError(f"Cannot decode body as {encoding}") from e
+
+        return orjson.loads(text) if orjson else json.loads(text)
+
+    except DecodeError:
+        raise
+    except (ValueError, UnicodeDecodeError) as e:
+        raise DecodeError("Invalid JSON") from e
+
+
+def _default(obj: Any) -> Any:
+    """Serialize values json can't handle natively"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if is_dataclass(obj):
+        return asdict(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes, dataclasses such as GuestResponse are supported"""
+    if orjson:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def json_response(data: Any, status: int = 200, headers: Optional[dict] = None) -> web.Response:
+    """Create JSON response serialized with dumps()"""
+    return web.Response(
+        body=dumps(data),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+        charset="utf-8"
+    )
@@ -0,0 +1,301 @@
+"""Idempotency-Key support for API endpoints
+
+A client may send an Idempotency-Key header with a POST. The first
+successful response for that key is stored, and every repeated request
+with the same key gets that response replayed without running the
+handler again (no new guest rows, no new notifications). The key is
+claimed in the database before the handler runs, so this also holds
+across API worker processes; a repeat arriving while the first request
+is still running gets 409.
+"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from aiohttp import web
+from sqlalchemy import select, delete, update, and_, or_
+
+from api import codec
+from api.schemas import ErrorResponse
+from config import Config
+from database.database import db
+from database.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# status_code of a key whose first request is still being handled
+IN_PROGRESS = 0
+# A claim older than this belongs to a worker that died mid-request
+CLAIM_TIMEOUT = timedelta(seconds=60)
+# Storing a completed response is retried (delay doubles): a claim left in
+# progress would be taken over after CLAIM_TIMEOUT and the request run again
+SAVE_ATTEMPTS = 5
+SAVE_RETRY_DELAY = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredResponse:
+    """Response stored for an idempotency key"""
+    request_hash: str
+    status_code: int
+    body: str
+    created_at: datetime
+
+
+class IdempotencyStore:
+    """Bounded LRU cache of stored responses backed by the idempotency_keys table
+
+    The table is shared by all API worker processes; the per-key asyncio
+    locks only save database round trips within one process.
+    """
+
+    def __init__(self, ttl: int, max_size: int, prune_every: int = 100):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_size = max_size
+        self.prune_every = prune_every
+        self._cache: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._locks: Dict[str, list] = {}  # {key: [lock, users]}
+        self._saves = 0
+
+    def _is_expired(self, stored: StoredResponse) -> bool:
+        return datetime.utcnow() - stored.created_at > self.ttl
+
+    def _remember(self, key: str, stored: StoredResponse):
+        """Put response into the LRU cache"""
+        self._cache[key] = stored
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def get_cached(self, key: str) -> Optional[StoredResponse]:
+        """Get a completed response from the in-process cache"""
+        stored = self._cache.get(key)
+        if stored is None:
+            return None
+        if self._is_expired(stored):
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return stored
+
+    async def claim(self, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Reserve the key for this request in the database
+
+        The reservation is a row with status_code 0, so API worker
+        processes see each other's requests in progress. An expired row,
+        or a reservation older than CLAIM_TIMEOUT (its worker died), is
+        taken over.
+
+        Returns:
+            None when the key was claimed, otherwise the row already
+            stored for it (status_code 0 = still in progress)
+        """
+        now = datetime.utcnow()
+        async with db.get_session() as session:
+            statement = db.insert(IdempotencyKey).values(
+                key=key,
+                request_hash=request_hash,
+                status_code=IN_PROGRESS,
+                response_body="",
+                created_at=now
+            )
+            result = await session.execute(statement.on_conflict_do_nothing(index_elements=["key"]))
+            if result.rowcount == 1:
+                return None
+
+            result = await session.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    or_(
+                        IdempotencyKey.created_at < now - self.ttl,
+                        and_(
+                            IdempotencyKey.status_code == IN_PROGRESS,
+                            IdempotencyKey.created_at < now - CLAIM_TIMEOUT
+                        )
+                    )
+                )
+                .values(request_hash=request_hash, status_code=IN_PROGRESS, response_body="", created_at=now)
+            )
+            if result.rowcount == 1:
+                return None
+
+            result = await session.execute(
+                select(IdempotencyKey).where(IdempotencyKey.key == key)
+            )
+            row = result.scalar_one()
+
+        stored = StoredResponse(row.request_hash, row.status_code, row.response_body, row.created_at)
+        if stored.status_code != IN_PROGRESS:
+            self._remember(key, stored)
+        return stored
+
+    async def save(self, key: str, stored: StoredResponse):
+        """Store the response for a claimed key"""
+        self._remember(key, stored)
+
+        async with db.get_session() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    request_hash=stored.request_hash,
+                    status_code=stored.status_code,
+                    response_body=stored.body,
+                    created_at=stored.created_at
+                )
+            )
+
+        self._saves += 1
+        if self._saves % self.prune_every == 0:
+            await self.prune()
+
+    async def abandon(self, key: str):
+        """Drop the claim of a failed request so it can be retried"""
+        async with db.get_session() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code == IN_PROGRESS
+                )
+            )
+
+    async def prune(self):
+        """Delete expired keys from the database"""
+        async with db.get_session() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - self.ttl)
+            )
+
+    @staticmethod
+    def _new_lock_entry() -> list:
+        return [asyncio.Lock(), 0]
+
+    async def acquire(self, key: str):
+        """Serialize concurrent requests with the same key"""
+        entry = self._locks.setdefault(key, self._new_lock_entry())
+        entry[1] += 1
+        await entry[0].acquire()
+
+    def release(self, key: str):
+        """Release key lock taken by acquire()"""
+        entry = self._locks[key]
+        entry[0].release()
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+
+idempotency_store = IdempotencyStore(ttl=Config.IDEMPOTENCY_TTL, max_size=Config.IDEMPOTENCY_CACHE_SIZE)
+
+
+def idempotent(handler):
+    """Replay the stored response for requests repeating an Idempotency-Key"""
+
+    @functools.wraps(handler)
+    async def wrapper(request: web.Request) -> web.Response:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return await handler(request)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return codec.json_response({
+                "success": False,
+                "error": ErrorResponse(
+                    "INVALID_REQUEST",
+                    f"{IDEMPOTENCY_HEADER} cannot exceed {MAX_KEY_LENGTH} characters"
+                )
+            }, status=400)
+
+        body = await request.read()
+        request_hash = hashlib.sha256(
+            request.method.encode() + b" " + request.path.encode() + b"\n" + body
+        ).hexdigest()
+
+        await idempotency_store.acquire(key)
+        try:
+            stored = idempotency_store.get_cached(key) or await idempotency_store.claim(key, request_hash)
+
+            if stored is not None:
+                if stored.request_hash != request_hash:
+                    return codec.json_response({
+                        "success": False,
+                        "error": ErrorResponse(
+                            "IDEMPOTENCY_KEY_REUSED",
+                            f"{IDEMPOTENCY_HEADER} was already used with a different request"
+                        )
+                    }, status=422)
+
+                if stored.status_code == IN_PROGRESS:
+                    # Handled by another worker right now
+                    return codec.json_response({
+                        "success": False,
+                        "error": ErrorResponse(
+                            "IDEMPOTENCY_KEY_IN_PROGRESS",
+                            f"A request with this {IDEMPOTENCY_HEADER} is still being processed"
+                        )
+                    }, status=409, headers={"Retry-After": "1"})
+
+                return web.Response(
+                    text=stored.body,
+                    status=stored.status_code,
+                    content_type="application/json",
+                    headers={REPLAYED_HEADER: "true"}
+                )
+
+            try:
+                response = await handler(request)
+            except Exception:
+                await idempotency_store.abandon(key)
+                raise
+
+            # Only successful responses are stored, failed requests may be retried
+            if not 200 <= response.status < 300 or response.body is None:
+                await idempotency_store.abandon(key)
+                return response
+
+            await _save_response(key, StoredResponse(
+                request_hash=request_hash,
+                status_code=response.status,
+                body=response.body.decode("utf-8"),
+                created_at=datetime.utcnow()
+            ))
+            return response
+        finally:
+            idempotency_store.release(key)
+
+    return wrapper
+
+
+async def _save_response(key: str, stored: StoredResponse):
+    """Store a completed response, retrying database errors
+
+    The request itself succeeded, so a failure is logged rather than
+    turned into an error response.
+    """
+    delay = SAVE_RETRY_DELAY
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        try:
+            await idempotency_store.save(key, stored)
+            return
+        except Exception:
+            if attempt == SAVE_ATTEMPTS:
+                logger.exception(
+                    "Failed to store the response for %s %s after %d attempts; "
+                    "a retry after the claim timeout will run the request again",
+                    IDEMPOTENCY_HEADER, key, attempt
+                )
+                return
+            logger.warning("Failed to store the response for %s %s, retrying", IDEMPOTENCY_HEADER, key)
+            await asyncio.sleep(delay)
+            delay *= 2
@@ -1,12 +1,51 @@
 """API route handlers"""
 
-import json
+import hmac
+from functools import wraps
+from typing import Optional
+
 from aiohttp import web
+from telegram import Update
+from services.export_service import export_service, ExportError
 from services.guest_service import guest_service
-from services.notification_service import NotificationService
+from api import codec
+from api.idempotency import idempotent
 from api.schemas import GuestRegistrationRequest, GuestResponse, ErrorResponse
+from config import Config
+from utils.metrics import registry
+
+
+def require_bearer_token(token_setting: str):
+    """
+    Protect a handler with "Authorization: Bearer <token>"
+
+    The token is read from the Config attribute token_setting on every
+    request. The route answers 404 while the token is not configured and
+    401 when the header is missing or wrong.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(request: web.Request) -> web.StreamResponse:
+            expected = getattr(Config, token_setting)
+            if not expected:
+                raise web.HTTPNotFound()
+
+            auth = request.headers.get("Authorization", "")
+            token = auth[7:] if auth.startswith("Bearer ") else ""
+            if not hmac.compare_digest(token.encode(), expected.encode()):
+                return codec.json_response({
+                    "success": False,
+                    "error": ErrorResponse("UNAUTHORIZED", f"Invalid or missing token ({token_setting})")
+                }, status=401, headers={"WWW-Authenticate": "Bearer"})
 
+            return await handler(request)
 
+        return wrapper
+
+    return decorator
+
+
+@idempotent
 async def register_guest(request: web.Request) -> web.Response:
     """
     Handle guest registration via HTTP API
@@ -19,87 +58,308 @@ async def register_guest(request: web.Request) -> web.Response:
         "comment": "Optional comment"
     }
 
+    A repeated request with the same Idempotency-Key header gets the
+    original response replayed.
+
     Returns:
         201: Guest created successfully
         400: Validation error
+        422: Idempotency-Key reused with a different body
         500: Internal server error
     """
     try:
-        # Parse JSON from request with encoding fallback
+        # Parse JSON once, encoding is detected by the codec (e.g. cp1251 from Windows curl)
         try:
-            data = await request.json()
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # Try to handle different encodings (e.g., cp1251 from Windows curl)
-            body = await request.read()
-            if body:
-                # Fallback to cp1251 (common Windows encoding)
-                try:
-                    decoded_body = body.decode('cp1251')
-                    data = json.loads(decoded_body)
-                except (UnicodeDecodeError, json.JSONDecodeError):
-                    # Try UTF-8 as last resort
-                    decoded_body = body.decode('utf-8')
-                    data = json.loads(decoded_body)
-            else:
-                raise
+            data = codec.loads(await request.read(), request.charset)
+        except codec.DecodeError as e:
+            return codec.json_response({
+                "success": False,
+                "error": ErrorResponse("INVALID_REQUEST", str(e))
+            }, status=400)
 
-        # Create request object
-        req = GuestRegistrationRequest(
-            name=data.get("name", ""),
-            guest_count=data.get("guest_count", 1),
-            confirmation_status=data.get("confirmation_status", "pending"),
-            comment=data.get("comment")
-        )
+        if not isinstance(data, dict):
+            return codec.json_response({
+                "success": False,
+                "error": ErrorResponse("INVALID_REQUEST", "Body must be a JSON object")
+            }, status=400)
 
-        # Debug: print the name and comment to verify encoding
-        print(f"DEBUG: name='{req.name}', comment='{req.comment}'")
+        # Create request object
+        req = _build_registration_request(data)
 
         # Validate request
         is_valid, error_message = req.validate()
         if not is_valid:
-            return web.json_response({
+            return codec.json_response({
                 "success": False,
-                "error": ErrorResponse("VALIDATION_ERROR", error_message).to_dict()
+                "error": ErrorResponse("VALIDATION_ERROR", error_message)
             }, status=400)
 
-        # Create guest in database
-        guest = await guest_service.create_guest(
-            name=req.name.strip(),
-            guest_count=req.guest_count,
-            confirmation_status=req.confirmation_status,
-            comment=req.comment.strip() if req.comment else None
-        )
-
-        # Notify bride and groom via Telegram
-        bot = request.app.get("bot")
-        if bot:
-            notification_service = NotificationService(bot)
-            await notification_service.notify_about_new_guest(guest)
+        # Create guest in database, bride and groom are notified via the outbox
+        guest = await guest_service.create_guest(**_guest_data(req))
 
         # Return success response
-        return web.json_response({
+        return codec.json_response({
             "success": True,
-            "data": GuestResponse.from_guest(guest).to_dict()
+            "data": GuestResponse.from_guest(guest)
         }, status=201)
 
-    except KeyError as e:
-        return web.json_response({
-            "success": False,
-            "error": ErrorResponse("INVALID_REQUEST", f"Missing required field: {str(e)}").to_dict()
-        }, status=400)
-
     except Exception as e:
         # Log error for debugging
         print(f"Error in register_guest: {e}")
-        return web.json_response({
+        return codec.json_response({
+            "success": False,
+            "error": ErrorResponse("INTERNAL_ERROR", str(e))
+        }, status=500)
+
+
+@require_bearer_token("API_BATCH_TOKEN")
+@idempotent
+async def register_guests_batch(request: web.Request) -> web.Response:
+    """
+    Handle batch guest registration via HTTP API
+
+    Expected body: a JSON array of guest objects (same fields as
+    /api/v1/guests/register), or NDJSON with one guest object per line
+    (Content-Type: application/x-ndjson). A single JSON object is
+    rejected unless sent as NDJSON; use /api/v1/guests/register for it.
+
+    Valid items are inserted in a single transaction, invalid items are
+    reported and skipped. Owners get one summary notification.
+
+    Requires "Authorization: Bearer <API_BATCH_TOKEN>".
+
+    Returns:
+        201: All guests created
+        207: Some items were rejected, the rest were created
+        400: Invalid body or no valid items
+        401: Missing or wrong token
+        404: Batch registration is disabled (API_BATCH_TOKEN not set)
+        413: Too many items
+        500: Internal server error
+    """
+    try:
+        try:
+            items = _parse_batch_body(await request.read(), request.content_type, request.charset)
+        except ValueError as e:
+            return codec.json_response({
+                "success": False,
+                "error": ErrorResponse("INVALID_REQUEST", str(e))
+            }, status=400)
+
+        if len(items) > Config.API_BATCH_MAX_ITEMS:
+            return codec.json_response({
+                "success": False,
+                "error": ErrorResponse(
+                    "TOO_MANY_ITEMS",
+                    f"Batch cannot exceed {Config.API_BATCH_MAX_ITEMS} items"
+                )
+            }, status=413)
+
+        results = [None] * len(items)
+        valid_indexes = []
+        valid_data = []
+
+        for index, data in enumerate(items):
+            if not isinstance(data, dict):
+                error_message = "Item must be a JSON object"
+            else:
+                req = _build_registration_request(data)
+                is_valid, error_message = req.validate()
+                if is_valid:
+                    valid_indexes.append(index)
+                    valid_data.append(_guest_data(req))
+                    continue
+
+            results[index] = {
+                "index": index,
+                "success": False,
+                "error": ErrorResponse("VALIDATION_ERROR", error_message)
+            }
+
+        # Create all valid guests in one transaction, with one summary notification
+        guests = await guest_service.create_guests(valid_data)
+
+        for index, guest in zip(valid_indexes, guests):
+            results[index] = {
+                "index": index,
+                "success": True,
+                "data": GuestResponse.from_guest(guest)
+            }
+
+        failed_count = len(items) - len(guests)
+        if not guests:
+            status = 400
+        elif failed_count:
+            status = 207
+        else:
+            status = 201
+
+        return codec.json_response({
+            "success": failed_count == 0 and bool(guests),
+            "data": {
+                "created": len(guests),
+                "failed": failed_count,
+                "results": results
+            }
+        }, status=status)
+
+    except Exception as e:
+        print(f"Error in register_guests_batch: {e}")
+        return codec.json_response({
             "success": False,
-            "error": ErrorResponse("INTERNAL_ERROR", str(e)).to_dict()
+            "error": ErrorResponse("INTERNAL_ERROR", str(e))
         }, status=500)
 
 
+def _build_registration_request(data: dict) -> GuestRegistrationRequest:
+    """Create registration request from parsed JSON object"""
+    return GuestRegistrationRequest(
+        name=data.get("name", ""),
+        guest_count=data.get("guest_count", 1),
+        confirmation_status=data.get("confirmation_status", "pending"),
+        comment=data.get("comment")
+    )
+
+
+def _guest_data(req: GuestRegistrationRequest) -> dict:
+    """Normalised guest fields of a validated request"""
+    return {
+        "name": req.name.strip(),
+        "guest_count": int(req.guest_count),
+        "confirmation_status": req.confirmation_status,
+        "comment": req.comment.strip() if req.comment else None
+    }
+
+
+def _parse_batch_body(body: bytes, content_type: str, charset: Optional[str] = None) -> list:
+    """
+    Parse batch body as a JSON array or NDJSON
+
+    Without the NDJSON content type a body that is one JSON value must be
+    an array; NDJSON is only guessed for bodies that are not valid JSON
+    (several lines of objects).
+
+    Raises:
+        ValueError: Body is empty or malformed
+    """
+    if not body:
+        raise ValueError("Request body is empty")
+
+    text = codec.decode_text(body, charset)
+
+    items = None
+    if content_type != "application/x-ndjson":
+        try:
+            items = codec.loads(text)
+        except codec.DecodeError:
+            pass  # Not one JSON value, read it as NDJSON
+        else:
+            if not isinstance(items, list):
+                raise ValueError(
+                    "Body must be a JSON array of guests "
+                    "(or NDJSON with Content-Type: application/x-ndjson)"
+                )
+
+    if items is None:
+        items = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(codec.loads(line))
+            except codec.DecodeError:
+                raise ValueError(f"Invalid JSON on line {line_number}")
+
+    if not items:
+        raise ValueError("No guests in request")
+
+    return items
+
+
+# Chunk size for streaming export files
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+@require_bearer_token("API_EXPORT_TOKEN")
+async def export_guests(request: web.Request) -> web.StreamResponse:
+    """
+    Download the guest list
+
+    Query parameters:
+        format: csv (default) or xlsx
+
+    Requires "Authorization: Bearer <API_EXPORT_TOKEN>".
+
+    Returns:
+        200: File, sent with chunked transfer encoding
+        400: Unknown format
+        401: Missing or wrong token
+        404: Export is disabled (API_EXPORT_TOKEN not set)
+    """
+    try:
+        export = await export_service.export_guests(request.query.get("format", "csv"))
+    except ExportError as e:
+        return codec.json_response({
+            "success": False,
+            "error": ErrorResponse("INVALID_FORMAT", str(e))
+        }, status=400)
+
+    try:
+        response = web.StreamResponse(headers={
+            "Content-Type": export.content_type,
+            "Content-Disposition": f'attachment; filename="{export.filename}"'
+        })
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+
+        while chunk := export.file.read(EXPORT_CHUNK_SIZE):
+            await response.write(chunk)
+
+        await response.write_eof()
+        return response
+    finally:
+        export.close()
+
+
+async def telegram_webhook(request: web.Request) -> web.Response:
+    """
+    Receive a Telegram update (webhook mode)
+
+    Telegram signs requests with the secret passed to setWebhook in the
+    X-Telegram-Bot-Api-Secret-Token header. The update is queued for the
+    bot application and acknowledged right away; handlers run separately.
+
+    Returns:
+        200: Update accepted
+        400: Body is not an update
+        403: Missing or wrong secret token
+    """
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not hmac.compare_digest(token.encode(), Config.WEBHOOK_SECRET.encode()):
+        raise web.HTTPForbidden()
+
+    application = request.app["application"]
+    try:
+        update = Update.de_json(codec.loads(await request.read()), application.bot)
+    except Exception as e:
+        print(f"⚠️ Invalid webhook update: {e}")
+        raise web.HTTPBadRequest()
+
+    await application.update_queue.put(update)
+    return web.Response()
+
+
 async def health_check(request: web.Request) -> web.Response:
     """Health check endpoint"""
-    return web.json_response({
+    return codec.json_response({
         "status": "healthy",
         "service": "wedding-bot-api"
     })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Prometheus metrics endpoint (not proxied by nginx, scrape it on the internal network)"""
+    return web.Response(
+        body=registry.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
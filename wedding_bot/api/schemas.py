@@ -22,10 +22,20 @@ class GuestRegistrationRequest:
             Tuple of (is_valid, error_message)
         """
         # Validate name
+        if not isinstance(self.name, str):
+            return False, "Name must be a string"
         if not self.name or len(self.name.strip()) == 0:
             return False, "Name is required"
 
-        # Validate guest_count
+        # Validate comment
+        if self.comment is not None and not isinstance(self.comment, str):
+            return False, "Comment must be a string"
+
+        # Validate guest_count: an integer, or a string/float holding one
+        if isinstance(self.guest_count, bool) or (
+            isinstance(self.guest_count, float) and not self.guest_count.is_integer()
+        ):
+            return False, "Guest count must be a valid number"
         try:
             count = int(self.guest_count)
             if count < 1:
@@ -36,7 +46,7 @@ class GuestRegistrationRequest:
             return False, "Guest count must be a valid number"
 
         # Validate confirmation_status
-        if self.confirmation_status not in self.VALID_STATUSES:
+        if not isinstance(self.confirmation_status, str) or self.confirmation_status not in self.VALID_STATUSES:
             return False, f"Invalid confirmation_status. Must be one of: {', '.join(self.VALID_STATUSES)}"
 
         return True, None
@@ -1,8 +1,37 @@
 """HTTP server setup for API"""
 
+import time
+
 from aiohttp import web
-from api.routes import register_guest, health_check
+from api.routes import (
+    register_guest, register_guests_batch, export_guests, telegram_webhook, health_check, metrics
+)
 from config import Config
+from utils.metrics import http_requests_total, http_request_duration_seconds, http_requests_in_flight
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Record latency, status and in-flight count per route"""
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource else "unmatched"
+    status = 500
+
+    http_requests_in_flight.inc()
+    started_at = time.perf_counter()
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        http_requests_in_flight.dec()
+        http_request_duration_seconds.observe(
+            time.perf_counter() - started_at, method=request.method, route=route
+        )
+        http_requests_total.inc(method=request.method, route=route, status=status)
 
 
 @web.middleware
@@ -11,7 +40,7 @@ async def cors_middleware(request, handler):
     response = await handler(request)
     response.headers['Access-Control-Allow-Origin'] = '*'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Idempotency-Key'
     return response
 
 
@@ -20,26 +49,37 @@ async def handle_options(request):
     return web.Response(status=200)
 
 
-def create_http_server(bot):
+def create_http_server(application=None, serve_api: bool = True, serve_metrics: bool = True):
     """
     Create and configure HTTP server
 
     Args:
-        bot: Telegram bot instance for sending notifications
+        application: Telegram application; when given, Telegram updates
+            are received on Config.WEBHOOK_PATH
+        serve_api: Register the website API routes (off in the bot process
+            when the API runs standalone)
+        serve_metrics: Register /metrics (off on a port shared by several
+            API workers, see create_metrics_server)
 
     Returns:
         web.AppRunner: Configured app runner
     """
-    # Create app with CORS middleware
-    app = web.Application(middlewares=[cors_middleware])
-
-    # Store bot instance for use in routes
-    app["bot"] = bot
+    # Create app with metrics and CORS middlewares
+    app = web.Application(middlewares=[metrics_middleware, cors_middleware])
 
     # Register routes
-    app.router.add_post("/api/v1/guests/register", register_guest)
+    if serve_api:
+        app.router.add_post("/api/v1/guests/register", register_guest)
+        app.router.add_post("/api/v1/guests/batch", register_guests_batch)
+        app.router.add_get("/api/v1/guests/export", export_guests)
+        app.router.add_options("/api/v1/guests/register", handle_options)
+        app.router.add_options("/api/v1/guests/batch", handle_options)
     app.router.add_get("/health", health_check)
-    app.router.add_options("/api/v1/guests/register", handle_options)
+    if serve_metrics:
+        app.router.add_get("/metrics", metrics)
+    if application is not None:
+        app["application"] = application
+        app.router.add_post(Config.WEBHOOK_PATH, telegram_webhook)
 
     # Create runner
     runner = web.AppRunner(app)
@@ -47,14 +87,31 @@ def create_http_server(bot):
     return runner
 
 
-async def setup_http_server(runner):
+def create_metrics_server():
+    """
+    Create a server with only /metrics for one API worker
+
+    Metrics are per process, so a worker behind a shared SO_REUSEPORT port
+    exposes them on a port of its own.
+
+    Returns:
+        web.AppRunner: Configured app runner
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    return web.AppRunner(app)
+
+
+async def setup_http_server(runner, port: int = Config.API_PORT, reuse_port: bool = False):
     """
     Setup and start HTTP server
 
     Args:
         runner: AppRunner from create_http_server()
+        port: Port to listen on
+        reuse_port: Let several worker processes listen on the same port (SO_REUSEPORT)
     """
     await runner.setup()
-    site = web.TCPSite(runner, Config.API_HOST, Config.API_PORT)
+    site = web.TCPSite(runner, Config.API_HOST, port, reuse_port=reuse_port)
     await site.start()
-    print(f"🌐 HTTP API server started on http://{Config.API_HOST}:{Config.API_PORT}")
+    print(f"🌐 HTTP API server started on http://{Config.API_HOST}:{port}")
@@ -0,0 +1,137 @@
+"""Standalone HTTP API server
+
+Runs the website API without the Telegram bot in API_WORKERS processes
+sharing API_PORT (SO_REUSEPORT, Linux). Guest notifications go to the
+outbox table and are sent by the bot process, started with
+API_MODE=standalone so it does not serve the API itself; it listens on
+BOT_HTTP_PORT for /health, /metrics and the Telegram webhook.
+
+Metrics are per process: with several workers each one serves /metrics
+on API_METRICS_PORT + its worker number instead of on API_PORT, so
+scrape every worker port and sum in Prometheus.
+"""
+import asyncio
+import multiprocessing
+import signal
+import socket
+import sys
+import time
+
+# Fix for Windows: use SelectorEventLoopPolicy for aiosqlite compatibility
+if sys.platform == "win32":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+from api.server import create_http_server, create_metrics_server, setup_http_server
+from config import Config, roles
+from database.database import db
+
+# Seconds a worker gets to finish its requests on shutdown
+SHUTDOWN_TIMEOUT = 15
+
+
+async def serve(worker_id: int, reuse_port: bool):
+    """Run one API worker until SIGTERM/SIGINT"""
+    # A scrape of the shared port would reach a random worker
+    runner = create_http_server(serve_metrics=not reuse_port)
+    await setup_http_server(runner, reuse_port=reuse_port)
+
+    metrics_runner = None
+    if reuse_port:
+        metrics_runner = create_metrics_server()
+        await setup_http_server(metrics_runner, port=Config.API_METRICS_PORT + worker_id)
+    print(f"✅ API worker {worker_id} is running!", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    if sys.platform != "win32":
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+
+    # Owner notifications are addressed here, so follow ROLES_FILE changes too
+    roles_watcher = None
+    if Config.ROLES_RELOAD_INTERVAL > 0:
+        roles_watcher = loop.create_task(roles.watch(Config.ROLES_RELOAD_INTERVAL))
+
+    try:
+        await stop.wait()
+    finally:
+        if roles_watcher:
+            roles_watcher.cancel()
+        await runner.cleanup()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await db.close()
+        print(f"🛑 API worker {worker_id} stopped", flush=True)
+
+
+def run_worker(worker_id: int, reuse_port: bool):
+    """Worker process entry point"""
+    try:
+        asyncio.run(serve(worker_id, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+
+async def prepare_database():
+    """Apply migrations once, before any worker opens the database"""
+    await db.init_db()
+    await db.close()
+
+
+def main():
+    """Main entry point"""
+    Config.check_modes(api_process=True)
+
+    workers = Config.API_WORKERS
+    if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        print("⚠️ SO_REUSEPORT is not supported on this platform, starting one worker", flush=True)
+        workers = 1
+
+    print("📦 Initializing database...", flush=True)
+    asyncio.run(prepare_database())
+
+    if workers == 1:
+        run_worker(0, reuse_port=False)
+        return
+
+    print(f"🚀 Starting {workers} API workers on port {Config.API_PORT}...", flush=True)
+
+    # Fresh interpreters: a forked child would inherit the parent's database
+    # engine and event loop state
+    context = multiprocessing.get_context("spawn")
+    stopping = False
+
+    def spawn(worker_id: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=run_worker, args=(worker_id, True), name=f"api-worker-{worker_id}"
+        )
+        process.start()
+        return process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    processes = [spawn(worker_id) for worker_id in range(workers)]
+
+    # Restart workers that die until asked to stop
+    while not stopping:
+        time.sleep(1)
+        for worker_id, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                print(f"⚠️ API worker {worker_id} exited with code {process.exitcode}, restarting", flush=True)
+                processes[worker_id] = spawn(worker_id)
+
+    print("🛑 Shutting down API workers...", flush=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=SHUTDOWN_TIMEOUT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Micro-benchmark: request JSON decoding and response encoding
+
+Compares the previous register_guest path (request.json(), cp1251/utf-8
+re-decoding on failure, stdlib json responses) with api.codec.
+
+Run from the wedding_bot directory:
+    python -m benchmarks.bench_codec
+"""
+import json
+import timeit
+
+from api import codec
+from api.schemas import ErrorResponse, GuestResponse
+
+PAYLOAD = {
+    "name": "Иван Петров",
+    "guest_count": 2,
+    "confirmation_status": "confirmed",
+    "comment": "Будем вдвоём, без детей. Очень ждём праздника! " * 3
+}
+UTF8_BODY = json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8")
+CP1251_BODY = json.dumps(PAYLOAD, ensure_ascii=False).encode("cp1251")
+
+RESPONSE = GuestResponse(
+    id=123,
+    name=PAYLOAD["name"],
+    guest_count=2,
+    confirmation_status="confirmed",
+    comment=PAYLOAD["comment"],
+    created_at="2026-04-01T12:00:00"
+)
+
+
+def legacy_loads(body: bytes):
+    """Previous parsing: request.json() then cp1251 and utf-8 retries"""
+    try:
+        return json.loads(body.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        try:
+            return json.loads(body.decode("cp1251"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return json.loads(body.decode("utf-8"))
+
+
+def legacy_dumps(response: GuestResponse) -> bytes:
+    """Previous serialization: web.json_response() with stdlib json"""
+    return json.dumps({"success": True, "data": response.to_dict()}).encode("utf-8")
+
+
+def codec_dumps(response: GuestResponse) -> bytes:
+    return codec.dumps({"success": True, "data": response})
+
+
+def bench(label: str, func, *args, number: int = 100_000):
+    seconds = min(timeit.repeat(lambda: func(*args), number=number, repeat=5))
+    print(f"{label:<40} {seconds / number * 1e6:8.2f} µs")
+
+
+def main():
+    print(f"orjson: {'yes' if codec.orjson else 'no (stdlib fallback)'}\n")
+    bench("decode utf-8, legacy", legacy_loads, UTF8_BODY)
+    bench("decode utf-8, codec", codec.loads, UTF8_BODY)
+    bench("decode cp1251, legacy", legacy_loads, CP1251_BODY)
+    bench("decode cp1251, codec", codec.loads, CP1251_BODY)
+    bench("encode GuestResponse, legacy", legacy_dumps, RESPONSE)
+    bench("encode GuestResponse, codec", codec_dumps, RESPONSE)
+    bench("encode ErrorResponse, legacy",
+          lambda: json.dumps({"success": False, "error": ErrorResponse("X", "y").to_dict()}).encode())
+    bench("encode ErrorResponse, codec",
+          lambda: codec.dumps({"success": False, "error": ErrorResponse("X", "y")}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Micro-benchmark: per-message routing cost of handle_text_message
+
+Compares the previous if-chain (button string compares, Config.is_admin
+list scans, four per-handler state dicts) with handlers.router.MessageRouter.
+Only the routing decision is measured; handlers are not awaited.
+
+Best-of-15 results on a single shared vCPU (noisy, ±30% between runs):
+
+    case                          legacy        router
+    admin stats button            400-730 ns    290-660 ns
+    guest question text           430-620 ns    630-1140 ns
+    bride answer text             490-640 ns    580-890 ns
+    guest free text (fallback)    660-850 ns    400-650 ns
+
+Button and fallback messages route faster. Text in a conversation state
+routes about 1.3x slower than the old chain: the state lookup checks the
+entry's TTL (StateStore.peek, a time.time() call) so an expired state
+never captures a message, which the old dicts did not do at all.
+
+Run from the wedding_bot directory:
+    python -m benchmarks.bench_router
+"""
+import timeit
+from dataclasses import replace
+
+from config import Config, roles, ROLE_ADMIN, ROLE_WEBSITE
+from handlers import conversation
+from handlers.conversation import conversation_states
+from handlers.router import MessageRouter
+
+ADMIN_ID = 1000
+GUEST_ID = 2000
+ASKING_GUEST_ID = 2001
+BRIDE_ID = 3000
+
+ADMIN_IDS = [900 + i for i in range(10)] + [ADMIN_ID]
+WEBSITE_BOT_ID = 4000
+roles.ids = replace(roles.ids, admins=frozenset(ADMIN_IDS), website=frozenset((WEBSITE_BOT_ID,)))
+
+
+def legacy_is_admin(user_id: int) -> bool:
+    """Previous Config.is_admin: list scan"""
+    return user_id in ADMIN_IDS
+
+
+def legacy_is_website_sender(user_id: int) -> bool:
+    return user_id == WEBSITE_BOT_ID
+
+
+def handler(name):
+    return lambda *args: name
+
+
+class LegacyState:
+    """Stand-ins for the old per-handler dicts"""
+    adding_faq = {}
+    editing_faq = {}
+    user_questions = {ASKING_GUEST_ID: {"waiting_for_text": True}}
+    pending_answers = {BRIDE_ID: {"question_id": 1, "from_user_id": GUEST_ID}}
+
+
+def legacy_route(user_id: int, text: str):
+    """The previous handle_text_message decision chain (admin list scans)"""
+    if legacy_is_website_sender(user_id):
+        return "website"
+    if text == Config.GUEST_QUESTION_BUTTON_TEXT:
+        return "question_button"
+    if text == Config.FAQ_BUTTON_TEXT:
+        return "faq"
+    if legacy_is_admin(user_id):
+        if text == Config.ADMIN_GUESTS_BUTTON_TEXT:
+            return "guests"
+        if text == Config.ADMIN_STATS_BUTTON_TEXT:
+            return "stats"
+        if text == Config.ADMIN_EDIT_FAQ_BUTTON_TEXT:
+            return "faq_edit"
+    if user_id in LegacyState.adding_faq:
+        data = LegacyState.adding_faq[user_id]
+        if data.get("step") == "question":
+            return "faq_add_question"
+        if data.get("step") == "answer":
+            return "faq_add_answer"
+    if user_id in LegacyState.editing_faq:
+        data = LegacyState.editing_faq[user_id]
+        if data.get("step") == "question":
+            return "faq_edit_question"
+        if data.get("step") == "answer":
+            return "faq_edit_answer"
+    if user_id in LegacyState.user_questions:
+        return "receive_question"
+    if user_id in LegacyState.pending_answers:
+        return "receive_answer"
+    legacy_is_admin(user_id)  # keyboard choice for the help reply
+    return "fallback"
+
+
+def build_router() -> MessageRouter:
+    router = MessageRouter()
+    router.add_role(ROLE_WEBSITE, handler("website"))
+    router.add_button(Config.GUEST_QUESTION_BUTTON_TEXT, handler("question_button"))
+    router.add_button(Config.FAQ_BUTTON_TEXT, handler("faq"))
+    router.add_button(Config.ADMIN_GUESTS_BUTTON_TEXT, handler("guests"), roles=(ROLE_ADMIN,))
+    router.add_button(Config.ADMIN_STATS_BUTTON_TEXT, handler("stats"), roles=(ROLE_ADMIN,))
+    router.add_button(Config.ADMIN_EDIT_FAQ_BUTTON_TEXT, handler("faq_edit"), roles=(ROLE_ADMIN,))
+    router.add_state(conversation.GUEST_QUESTION, handler("receive_question"))
+    router.add_state(conversation.BRIDE_ANSWER, handler("receive_answer"))
+    router.set_fallback(handler("fallback"))
+    return router
+
+
+CASES = [
+    ("admin stats button", ADMIN_ID, Config.ADMIN_STATS_BUTTON_TEXT),
+    ("guest question text", ASKING_GUEST_ID, "Можно прийти с собакой?"),
+    ("bride answer text", BRIDE_ID, "Да, конечно"),
+    ("guest free text (fallback)", GUEST_ID, "Привет"),
+]
+
+
+def bench(label: str, func, *args, number: int = 200_000):
+    seconds = min(timeit.repeat(lambda: func(*args), number=number, repeat=15))
+    print(f"{label:<45} {seconds / number * 1e9:8.1f} ns")
+
+
+def main():
+    router = build_router()
+    conversation_states.set(ASKING_GUEST_ID, conversation.GUEST_QUESTION)
+    conversation_states.set(BRIDE_ID, conversation.BRIDE_ANSWER, question_id=1, from_user_id=GUEST_ID)
+
+    for label, user_id, text in CASES:
+        bench(f"{label}, legacy", legacy_route, user_id, text)
+        bench(f"{label}, router", router.resolve, user_id, text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,6 @@ import sqlite3
 conn = sqlite3.connect('wedding_bot.db')
 cursor = conn.cursor()
 cursor.execute('SELECT * FROM guests')
-for row in cursor.fetchall():
+for row in cursor:
     print(row)
 conn.close()
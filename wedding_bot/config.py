@@ -1,6 +1,11 @@
+import asyncio
 import os
+from dataclasses import dataclass
 from datetime import datetime
-from dotenv import load_dotenv
+from dotenv import load_dotenv, dotenv_values
+
+# Variables set by the process environment win over the .env file
+_PROCESS_ENV_KEYS = frozenset(os.environ)
 
 load_dotenv()
 
@@ -11,6 +16,19 @@ class Config:
     # Telegram Bot Token
     BOT_TOKEN = os.getenv("API_TOKEN")
 
+    # Update delivery: "polling" (getUpdates) or "webhook" (POSTs to the HTTP API server)
+    TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "polling")
+    # Public HTTPS URL Telegram posts updates to, e.g. https://example.com/api/telegram/webhook
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+    # Route on the HTTP API server that receives updates (under nginx /api/)
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/api/telegram/webhook")
+    # Sent by Telegram in X-Telegram-Bot-Api-Secret-Token (1-256 chars: A-Z, a-z, 0-9, _ and -)
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+    # Updates handled at once; updates of one user still run in order (0 = one at a time)
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "0"))
+
     # Telegram User IDs
     BRIDE_ID = int(os.getenv("BRIDE_ID", "123456789"))  # TEST_BRIDE_ID placeholder
     GROOM_ID = int(os.getenv("GROOM_ID", "987654321"))  # TEST_GROOM_ID placeholder
@@ -23,17 +41,101 @@ class Config:
     # Website Bot ID - receives messages from website form via Telegram API
     WEBSITE_BOT_ID = int(os.getenv("WEBSITE_BOT_ID", "123456789"))
 
+    # The IDs above are reloaded from this file on SIGHUP or when it changes
+    ROLES_FILE = os.getenv("ROLES_FILE", ".env")
+    ROLES_RELOAD_INTERVAL = float(os.getenv("ROLES_RELOAD_INTERVAL", "5"))
+
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///wedding_bot.db")
+    # Engine profile: "default" (driver defaults), "balanced" or "burst" (see database/database.py)
+    DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "balanced")
+    # Optional overrides for the selected profile
+    DATABASE_POOL_SIZE = os.getenv("DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW = os.getenv("DATABASE_MAX_OVERFLOW")
+    SQLITE_BUSY_TIMEOUT_MS = os.getenv("SQLITE_BUSY_TIMEOUT_MS")
 
     # API Configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", "8080"))
+    API_BATCH_MAX_ITEMS = int(os.getenv("API_BATCH_MAX_ITEMS", "1000"))
+    # Idempotency-Key responses are replayed for this long (seconds)
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    # Bearer token for POST /api/v1/guests/batch (batch registration is disabled when empty)
+    API_BATCH_TOKEN = os.getenv("API_BATCH_TOKEN", "")
+    # Bearer token for GET /api/v1/guests/export (export is disabled when empty)
+    API_EXPORT_TOKEN = os.getenv("API_EXPORT_TOKEN", "")
+    # "embedded": the bot process serves the API; "standalone": the API runs in
+    # api_main.py and the bot process only serves /health, /metrics and the webhook
+    API_MODE = os.getenv("API_MODE", "embedded")
+    # api_main.py worker processes sharing API_PORT (0 = one per CPU)
+    API_WORKERS = int(os.getenv("API_WORKERS", "0")) or os.cpu_count() or 1
+    # With several API workers each one serves /metrics on its own port,
+    # API_METRICS_PORT + worker number (the shared API_PORT reaches a random worker)
+    API_METRICS_PORT = int(os.getenv("API_METRICS_PORT", "9180"))
+    # Port of the bot process HTTP server (/health, /metrics, webhook) in
+    # standalone API mode; must differ from API_PORT
+    BOT_HTTP_PORT = int(os.getenv("BOT_HTTP_PORT", "8081"))
 
     # Wedding Date
     WEDDING_DATE = datetime.strptime(os.getenv("WEDDING_DATE", "2026-04-25"), "%Y-%m-%d").date()
     WEDDING_TIME = os.getenv("WEDDING_TIME", "15:00")
 
+    # Reminders: days before the wedding, sent at WEDDING_TIME (Moscow time)
+    REMINDER_MILESTONES = [
+        int(days.strip()) for days in os.getenv("REMINDER_MILESTONES", "30,7,1").split(",") if days.strip()
+    ]
+    # How late a reminder may still be sent if the bot was down at the planned time
+    REMINDER_MISFIRE_GRACE_HOURS = float(os.getenv("REMINDER_MISFIRE_GRACE_HOURS", "12"))
+    # Persistent APScheduler job store (defaults to DATABASE_URL with a sync driver)
+    REMINDER_JOBSTORE_URL = os.getenv("REMINDER_JOBSTORE_URL")
+
+    # Outgoing Telegram messages are written to the outbox table and sent by the bot process
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    # Failed sends are retried with exponential backoff (seconds) up to OUTBOX_MAX_ATTEMPTS
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "5"))
+    OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "3600"))
+    # A claimed batch not finished in this many seconds is taken over by another dispatcher
+    OUTBOX_CLAIM_TIMEOUT = float(os.getenv("OUTBOX_CLAIM_TIMEOUT", "300"))
+    # On shutdown the current outbox batch may finish for this long; the rest is sent after restart
+    NOTIFICATION_DRAIN_TIMEOUT = float(os.getenv("NOTIFICATION_DRAIN_TIMEOUT", "15"))
+
+    # Bot user profile updates are written in batches every N seconds
+    BOT_USER_FLUSH_INTERVAL = float(os.getenv("BOT_USER_FLUSH_INTERVAL", "5"))
+
+    # FAQ cache lifetime in seconds (0 = keep until the next FAQ change).
+    # Set when several processes edit FAQ so changes made elsewhere are picked up.
+    FAQ_CACHE_TTL = float(os.getenv("FAQ_CACHE_TTL", "0"))
+
+    # Conversation state (pending questions, answers, FAQ edits): "memory" or "sqlite".
+    # The sqlite backend keeps in-flight conversations across restarts.
+    # Defaults to memory so a local run writes no state file; docker-compose
+    # uses sqlite in the data volume
+    STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+    STATE_DB_PATH = os.getenv("STATE_DB_PATH", "wedding_state.db")
+    # Unfinished conversations are forgotten after this many seconds of inactivity
+    STATE_TTL = float(os.getenv("STATE_TTL", "86400"))
+    STATE_MAX_ENTRIES = int(os.getenv("STATE_MAX_ENTRIES", "10000"))
+    # Expired entries are dropped from memory and the backend every this many seconds
+    STATE_PURGE_INTERVAL = float(os.getenv("STATE_PURGE_INTERVAL", "600"))
+    # An FAQ edit lock is released automatically after this many seconds
+    FAQ_LOCK_TTL = float(os.getenv("FAQ_LOCK_TTL", "1800"))
+
+    # New guest questions are sent to the bride in one digest every N minutes
+    # (0 = send each question immediately)
+    QUESTION_DIGEST_INTERVAL = float(os.getenv("QUESTION_DIGEST_INTERVAL", "10"))
+
+    # A guest question this similar (cosine, 0..1) to an FAQ item or an answered
+    # question gets the stored answer offered before it is sent to the bride
+    DUPLICATE_QUESTION_THRESHOLD = float(os.getenv("DUPLICATE_QUESTION_THRESHOLD", "0.65"))
+
+    # Broadcasts: Telegram allows about 30 messages per second per bot
+    BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+    BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+    BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+
     # Bot Settings
     GUEST_QUESTION_BUTTON_TEXT = "Задать вопрос"
     FAQ_BUTTON_TEXT = "Частые вопросы"
@@ -42,16 +144,153 @@ class Config:
     ADMIN_EDIT_FAQ_BUTTON_TEXT = "✏️ Редактировать FAQ"
 
     @classmethod
-    def is_admin(cls, user_id: int) -> bool:
-        """Check if user is admin"""
-        return user_id in cls.ADMIN_IDS
+    def use_webhook(cls) -> bool:
+        """Whether Telegram updates arrive via webhook instead of polling"""
+        return cls.TELEGRAM_MODE == "webhook"
 
     @classmethod
-    def is_website_sender(cls, user_id: int) -> bool:
-        """Check if message is from website"""
-        return user_id == cls.WEBSITE_BOT_ID
+    def check_modes(cls, api_process: bool = False):
+        """
+        Reject invalid TELEGRAM_MODE/API_MODE combinations at startup
+
+        Args:
+            api_process: Checking for api_main.py instead of the bot process
+
+        Raises:
+            ValueError: Describes the invalid setting
+        """
+        if cls.TELEGRAM_MODE not in ("polling", "webhook"):
+            raise ValueError(f"TELEGRAM_MODE must be polling or webhook, got '{cls.TELEGRAM_MODE}'")
+        if cls.API_MODE not in ("embedded", "standalone"):
+            raise ValueError(f"API_MODE must be embedded or standalone, got '{cls.API_MODE}'")
+
+        if cls.use_webhook() and (not cls.WEBHOOK_URL or not cls.WEBHOOK_SECRET):
+            raise ValueError("TELEGRAM_MODE=webhook requires WEBHOOK_URL and WEBHOOK_SECRET")
+
+        if cls.API_MODE == "standalone" and cls.BOT_HTTP_PORT == cls.API_PORT:
+            # The bot process and the API workers would bind the same port
+            raise ValueError("API_MODE=standalone requires BOT_HTTP_PORT different from API_PORT")
+
+        if api_process and cls.API_MODE != "standalone":
+            # The bot process serves the API itself on API_PORT
+            raise ValueError("api_main.py requires API_MODE=standalone")
+
+        metrics_ports = range(cls.API_METRICS_PORT, cls.API_METRICS_PORT + cls.API_WORKERS)
+        if api_process and cls.API_WORKERS > 1 and cls.API_PORT in metrics_ports:
+            raise ValueError(
+                f"API_PORT must be outside the worker metrics ports "
+                f"{metrics_ports.start}-{metrics_ports.stop - 1} (API_METRICS_PORT + worker number)"
+            )
 
     @classmethod
-    def get_owners(cls) -> list:
-        """Get bride and groom IDs"""
-        return [cls.BRIDE_ID, cls.GROOM_ID]
+    def get_owners(cls) -> frozenset:
+        """Get bride and groom IDs (from the current roles snapshot)"""
+        return roles.ids.owners
+
+
+# User roles for routing updates
+ROLE_WEBSITE = "website"
+ROLE_ADMIN = "admin"
+ROLE_GUEST = "guest"
+
+
+@dataclass(frozen=True)
+class RoleIds:
+    """One consistent set of role IDs"""
+    admins: frozenset
+    website: frozenset
+    owners: frozenset  # Bride and groom
+    bride_id: int
+
+
+class RolesRegistry:
+    """Role IDs as one immutable snapshot, reloadable at runtime
+
+    reload() re-reads ROLES_FILE, swaps the snapshot and updates the
+    matching Config attributes, so code reading Config.BRIDE_ID sees the
+    new values. The snapshot is replaced as a whole, so readers never see
+    admins from one version of the file and owners from another.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = RoleIds(
+            admins=frozenset(Config.ADMIN_IDS),
+            website=frozenset((Config.WEBSITE_BOT_ID,)),
+            owners=frozenset((Config.BRIDE_ID, Config.GROOM_ID)),
+            bride_id=Config.BRIDE_ID
+        )
+        self._mtime = None
+        self._load()
+
+    def role_of(self, user_id: int) -> str:
+        """Resolve the routing role of a user"""
+        ids = self.ids
+        if user_id in ids.website:
+            return ROLE_WEBSITE
+        if user_id in ids.admins:
+            return ROLE_ADMIN
+        return ROLE_GUEST
+
+    def is_bride(self, user_id: int) -> bool:
+        return user_id == self.ids.bride_id
+
+    def reload(self) -> bool:
+        """Re-read role IDs; keep the current ones if the file is invalid"""
+        if not self._load():
+            return False
+        print(f"🔄 Roles reloaded: {len(self.ids.admins)} admins", flush=True)
+        return True
+
+    def _load(self) -> bool:
+        self._mtime = self._get_mtime()
+        file_values = dotenv_values(self.path) if self._mtime is not None else {}
+
+        def get(key: str, default: str) -> str:
+            if key in _PROCESS_ENV_KEYS:
+                return os.environ[key]
+            return file_values.get(key) or default
+
+        try:
+            admin_ids = [int(id.strip()) for id in get("ADMIN_IDS", "123456789,987654321").split(",")]
+            bride_id = int(get("BRIDE_ID", "123456789"))
+            groom_id = int(get("GROOM_ID", "987654321"))
+            website_bot_id = int(get("WEBSITE_BOT_ID", "123456789"))
+        except ValueError as e:
+            print(f"⚠️ Roles not reloaded, invalid value in {self.path}: {e}", flush=True)
+            return False
+
+        Config.ADMIN_IDS = admin_ids
+        Config.BRIDE_ID = bride_id
+        Config.GROOM_ID = groom_id
+        Config.WEBSITE_BOT_ID = website_bot_id
+
+        self.ids = RoleIds(
+            admins=frozenset(admin_ids),
+            website=frozenset((website_bot_id,)),
+            owners=frozenset((bride_id, groom_id)),
+            bride_id=bride_id
+        )
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the roles file modification time changed"""
+        if self._get_mtime() == self._mtime:
+            return False
+        return self.reload()
+
+    async def watch(self, interval: float):
+        """Poll the roles file for changes"""
+        while True:
+            await asyncio.sleep(interval)
+            self.reload_if_changed()
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+
+roles = RolesRegistry(Config.ROLES_FILE)
+role_of = roles.role_of
@@ -1,17 +1,141 @@
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from contextlib import asynccontextmanager
 from .models import Base
+from .migrations import run_migrations
 from config import Config
+from utils.metrics import db_session_duration_seconds
+
+# Advisory lock id serializing init_db() across processes (PostgreSQL)
+SCHEMA_LOCK_KEY = 0x77656464
+
+
+# Engine profiles selectable via Config.DATABASE_PROFILE.
+# "pool" is applied to every backend, "sqlite" pragmas are set on each new SQLite connection.
+ENGINE_PROFILES = {
+    # Driver defaults, no tuning (previous behaviour)
+    "default": {
+        "pool": {},
+        "sqlite": {},
+    },
+    # Everyday settings: WAL lets readers work while a write is in progress
+    "balanced": {
+        "pool": {
+            "pool_size": 5,
+            "max_overflow": 10,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+        },
+        "sqlite": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -16000,  # ~16 MB
+            "mmap_size": 64 * 1024 * 1024,
+            "temp_store": "MEMORY",
+        },
+    },
+    # Registration bursts after invitations go out
+    "burst": {
+        "pool": {
+            "pool_size": 20,
+            "max_overflow": 30,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+        },
+        "sqlite": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 15000,
+            "cache_size": -64000,  # ~64 MB
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+        },
+    },
+}
+
+
+def build_engine_options(url: str, profile_name: str) -> tuple:
+    """
+    Build create_async_engine() keyword arguments and SQLite pragmas for a profile
+
+    Returns:
+        Tuple of (engine kwargs, sqlite pragmas)
+    """
+    if profile_name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown DATABASE_PROFILE '{profile_name}'. "
+            f"Must be one of: {', '.join(ENGINE_PROFILES)}"
+        )
+
+    profile = ENGINE_PROFILES[profile_name]
+    engine_kwargs = {"echo": False}
+    pool_options = dict(profile["pool"])
+    pragmas = {}
+
+    if Config.DATABASE_POOL_SIZE:
+        pool_options["pool_size"] = int(Config.DATABASE_POOL_SIZE)
+    if Config.DATABASE_MAX_OVERFLOW:
+        pool_options["max_overflow"] = int(Config.DATABASE_MAX_OVERFLOW)
+
+    backend = make_url(url).get_backend_name()
+
+    if backend == "sqlite":
+        pragmas = dict(profile["sqlite"])
+        if pragmas and Config.SQLITE_BUSY_TIMEOUT_MS:
+            pragmas["busy_timeout"] = int(Config.SQLITE_BUSY_TIMEOUT_MS)
+
+        database = make_url(url).database
+        if pool_options and database and database != ":memory:":
+            # aiosqlite opens a new connection per session by default (NullPool),
+            # keep connections so pragmas and page cache survive between sessions
+            engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+            engine_kwargs.update(pool_options)
+    else:
+        engine_kwargs.update(pool_options)
+        if pool_options:
+            engine_kwargs["pool_pre_ping"] = True
+
+    return engine_kwargs, pragmas
+
+
+def _install_sqlite_pragmas(engine, pragmas: dict):
+    """Apply pragmas on every new SQLite connection"""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+async def _lock_schema(conn):
+    """Take a lock held until the end of the connection's transaction"""
+    if conn.dialect.name == "sqlite":
+        # Must be the first statement, the driver does not begin before DDL
+        await conn.exec_driver_sql("BEGIN EXCLUSIVE")
+    elif conn.dialect.name == "postgresql":
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
 
 
 class Database:
     """Database connection manager"""
 
     def __init__(self):
+        engine_kwargs, pragmas = build_engine_options(Config.DATABASE_URL, Config.DATABASE_PROFILE)
         self.engine = create_async_engine(
             Config.DATABASE_URL,
-            echo=False
+            **engine_kwargs
         )
+        if pragmas:
+            _install_sqlite_pragmas(self.engine, pragmas)
         self.async_session = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
@@ -19,20 +143,43 @@ class Database:
         )
 
     async def init_db(self):
-        """Initialize database tables"""
+        """Initialize database tables and apply pending migrations
+
+        The bot and the API workers may start at the same time, so the
+        schema is built under an exclusive lock: the process that comes
+        second waits and then finds nothing left to do.
+        """
         async with self.engine.begin() as conn:
+            await _lock_schema(conn)
             await conn.run_sync(Base.metadata.create_all)
+            await run_migrations(conn)
 
     @asynccontextmanager
     async def get_session(self):
         """Get database session"""
-        async with self.async_session() as session:
-            try:
-                yield session
-                await session.commit()
-            except Exception:
-                await session.rollback()
-                raise
+        started_at = time.perf_counter()
+        result = "commit"
+        try:
+            async with self.async_session() as session:
+                try:
+                    yield session
+                    await session.commit()
+                except Exception:
+                    result = "rollback"
+                    await session.rollback()
+                    raise
+        finally:
+            db_session_duration_seconds.observe(time.perf_counter() - started_at, result=result)
+
+    def insert(self, model):
+        """Get an INSERT supporting ON CONFLICT clauses for the configured backend"""
+        if self.engine.dialect.name == "postgresql":
+            return postgresql_insert(model)
+        return sqlite_insert(model)
+
+    async def close(self):
+        """Dispose of pooled connections"""
+        await self.engine.dispose()
 
 
 # Global database instance
@@ -0,0 +1,159 @@
+"""Versioned schema migrations for existing databases
+
+Base.metadata.create_all() only creates missing tables, it never changes a
+table that already exists. Changes to existing tables (new indexes, columns)
+are listed here and applied once, in order, by Database.init_db().
+Every step must be safe to run on a fresh database that create_all() has
+just built, so use IF NOT EXISTS where possible.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Union
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from utils.text import stem_text
+
+
+# A step is either a SQL statement or an async callable receiving the connection
+MigrationStep = Union[str, Callable[[AsyncConnection], Awaitable[None]]]
+
+
+@dataclass
+class Migration:
+    """Single schema migration"""
+    version: int
+    description: str
+    steps: List[MigrationStep]
+
+
+async def create_faq_search_index(conn: AsyncConnection):
+    """Create the FTS5 FAQ index (SQLite only) and fill it from faq_items
+
+    The index stores stemmed text with rowid = faq_items.id and is kept in
+    sync by FAQService. Other databases use FAQService's Python fallback.
+    """
+    if conn.dialect.name != "sqlite":
+        return
+
+    await conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS faq_fts USING fts5("
+        "question, answer, tokenize = 'unicode61 remove_diacritics 2')"
+    ))
+    await conn.execute(text("DELETE FROM faq_fts"))
+
+    result = await conn.execute(text("SELECT id, question, answer FROM faq_items"))
+    rows = [
+        {"id": faq_id, "question": stem_text(question), "answer": stem_text(answer)}
+        for faq_id, question, answer in result
+    ]
+    if rows:
+        await conn.execute(
+            text("INSERT INTO faq_fts (rowid, question, answer) VALUES (:id, :question, :answer)"),
+            rows
+        )
+
+
+def add_column(table: str, column: str, ddl: str) -> MigrationStep:
+    """Step adding a column unless create_all() already created it"""
+    async def step(conn: AsyncConnection):
+        columns = await conn.run_sync(
+            lambda sync_conn: {c["name"] for c in inspect(sync_conn).get_columns(table)}
+        )
+        if column not in columns:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="Indexes for hot query columns",
+        steps=[
+            "CREATE INDEX IF NOT EXISTS ix_guests_created_at_id ON guests (created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_guests_confirmation_status ON guests (confirmation_status)",
+            "CREATE INDEX IF NOT EXISTS ix_questions_pending ON questions (created_at, id) "
+            "WHERE answer_text IS NULL",
+            'CREATE INDEX IF NOT EXISTS ix_faq_items_order ON faq_items ("order")',
+            "CREATE INDEX IF NOT EXISTS ix_bot_users_reminders "
+            "ON bot_users (subscribed_to_reminders, is_active)",
+        ]
+    ),
+    Migration(
+        version=2,
+        description="Full-text FAQ search index",
+        steps=[create_faq_search_index]
+    ),
+    Migration(
+        version=3,
+        description="Question digest delivery",
+        steps=[
+            add_column("questions", "digest_sent_at", "TIMESTAMP"),
+            # Questions asked before digests existed were already sent one by one
+            "UPDATE questions SET digest_sent_at = created_at WHERE digest_sent_at IS NULL",
+        ]
+    ),
+    Migration(
+        version=4,
+        description="Outbox retries, claims and reply markup",
+        steps=[
+            add_column("outbox", "reply_markup", "TEXT"),
+            add_column("outbox", "kind", "VARCHAR(50)"),
+            add_column("outbox", "ref", "VARCHAR(255)"),
+            add_column("outbox", "next_attempt_at", "TIMESTAMP"),
+            add_column("outbox", "claimed_by", "VARCHAR(32)"),
+            add_column("outbox", "claimed_until", "TIMESTAMP"),
+            "UPDATE outbox SET next_attempt_at = created_at WHERE next_attempt_at IS NULL",
+        ]
+    ),
+]
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    """Get the latest applied migration version"""
+    result = await conn.execute(text("SELECT MAX(version) FROM schema_migrations"))
+    return result.scalar() or 0
+
+
+async def run_migrations(conn: AsyncConnection) -> int:
+    """
+    Apply pending migrations inside the caller's transaction
+
+    Returns:
+        Schema version after applying migrations
+    """
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+    current_version = await get_schema_version(conn)
+
+    for migration in MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+
+        for step in migration.steps:
+            if isinstance(step, str):
+                await conn.execute(text(step))
+            else:
+                await step(conn)
+
+        await conn.execute(
+            text(
+                "INSERT INTO schema_migrations (version, description, applied_at) "
+                "VALUES (:version, :description, :applied_at)"
+            ),
+            {
+                "version": migration.version,
+                "description": migration.description,
+                "applied_at": datetime.utcnow()
+            }
+        )
+        current_version = migration.version
+        print(f"🛠 Applied migration {migration.version}: {migration.description}", flush=True)
+
+    return current_version
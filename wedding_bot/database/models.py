@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase
@@ -13,6 +13,10 @@ class Base(AsyncAttrs, DeclarativeBase):
 class BotUser(Base):
     """Bot user model - tracks users who started the bot"""
     __tablename__ = "bot_users"
+    __table_args__ = (
+        # Reminder recipients: subscribed_to_reminders AND is_active
+        Index("ix_bot_users_reminders", "subscribed_to_reminders", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, nullable=False, unique=True)  # Telegram user ID
@@ -40,6 +44,11 @@ class BotUser(Base):
 class Guest(Base):
     """Guest model"""
     __tablename__ = "guests"
+    __table_args__ = (
+        # Guest list ordering and keyset pagination
+        Index("ix_guests_created_at_id", "created_at", "id"),
+        Index("ix_guests_confirmation_status", "confirmation_status"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
@@ -63,6 +72,16 @@ class Guest(Base):
 class Question(Base):
     """Question model"""
     __tablename__ = "questions"
+    __table_args__ = (
+        # Partial index: only unanswered questions are indexed
+        Index(
+            "ix_questions_pending",
+            "created_at",
+            "id",
+            sqlite_where=text("answer_text IS NULL"),
+            postgresql_where=text("answer_text IS NULL")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     from_user_id = Column(BigInteger, nullable=False)
@@ -72,6 +91,7 @@ class Question(Base):
     answered_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     answered_by_user_id = Column(BigInteger, nullable=True)
+    digest_sent_at = Column(DateTime, nullable=True)  # When the bride was notified
 
     def to_dict(self):
         return {
@@ -88,6 +108,9 @@ class Question(Base):
 class FAQ(Base):
     """FAQ model"""
     __tablename__ = "faq_items"
+    __table_args__ = (
+        Index("ix_faq_items_order", "order"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     question = Column(String(500), nullable=False)
@@ -105,3 +128,72 @@ class FAQ(Base):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class ReminderDelivery(Base):
+    """Reminder delivery ledger - one row per milestone and recipient"""
+    __tablename__ = "reminder_deliveries"
+    __table_args__ = (
+        UniqueConstraint("milestone", "user_id", name="uq_reminder_deliveries_milestone_user"),
+        Index("ix_reminder_deliveries_milestone_status", "milestone", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    milestone = Column(String(100), nullable=False)  # e.g. "2026-04-25_week"
+    user_id = Column(BigInteger, nullable=False)  # Telegram user ID
+    status = Column(String(20), nullable=False, default='pending')  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "milestone": self.milestone,
+            "user_id": self.user_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "sent_at": self.sent_at.isoformat() if self.sent_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class IdempotencyKey(Base):
+    """Stored API response for an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of method, path and body
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class OutboxMessage(Base):
+    """Telegram message waiting to be sent by the bot process
+
+    Rows are added in the same transaction as the change they report
+    (e.g. a new guest), so a committed change always has its message.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)  # Telegram chat ID
+    text = Column(Text, nullable=False)
+    parse_mode = Column(String(20), nullable=True)
+    reply_markup = Column(Text, nullable=True)  # JSON of the Telegram markup
+    kind = Column(String(50), nullable=True)  # Delivery listener, e.g. "reminder"
+    ref = Column(String(255), nullable=True)  # Passed to the listener, e.g. milestone key
+    status = Column(String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_by = Column(String(32), nullable=True)  # Dispatcher currently sending the row
+    claimed_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
@@ -1,75 +1,222 @@
 from datetime import datetime, timezone
+from html import escape
+from typing import Optional
 from zoneinfo import ZoneInfo
 
 from telegram import Update
-from telegram.ext import ContextTypes
-from config import Config
+from handlers.context import RoleContext
+from services.export_service import export_service, ExportError
 from services.guest_service import guest_service
+from services.reminder_ledger import reminder_ledger
+from utils.keyboards import get_guests_page_keyboard
 
 # Московский часовой пояс
 MSK_ZONE = ZoneInfo("Europe/Moscow")
 
+# Лимиты списка гостей: Telegram принимает до 4096 символов в сообщении
+MESSAGE_LIMIT = 4000
+GUESTS_PAGE_SIZE = 30
+COMMENT_PREVIEW_LIMIT = 500
+
+# Подписи статусов подтверждения
+STATUS_LABELS = {
+    "confirmed": "✅ Придут",
+    "declined": "❌ Не придут",
+    "pending": "⏳ Не решили",
+}
+
 
 class AdminHandler:
     """Handle admin commands"""
 
-    async def guests_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /guests command - show all guests"""
-        user_id = update.effective_user.id
-
+    async def guests_command(self, update: Update, context: RoleContext):
+        """Handle /guests command - show the first page of guests"""
         # Check if user is admin
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await update.message.reply_text("⛔ У вас нет прав для выполнения этой команды.")
             return
 
-        guests = await guest_service.get_all_guests()
+        message, keyboard = await self._build_guests_page()
 
-        if not guests:
+        if message is None:
             await update.message.reply_text("📋 Список гостей пуст.")
             return
 
-        # Calculate statistics
-        total_guests = sum(g.guest_count for g in guests)
+        await update.message.reply_text(message, parse_mode="HTML", reply_markup=keyboard)
+
+    async def guests_page_callback(self, update: Update, context: RoleContext):
+        """Handle guest list navigation callback"""
+        query = update.callback_query
+        await query.answer()
+
+        if not context.is_admin:
+            await query.edit_message_text("⛔ У вас нет прав.")
+            return
+
+        # Parse: guests_{next|prev}_{guest_id}
+        parts = query.data.split("_")
+        if len(parts) != 3:
+            return
+
+        direction = parts[1]
+        cursor_id = int(parts[2])
 
-        # Build message
-        message = f"<b>📊 Гости</b>\n\n"
-        message += f"Всего гостей: {total_guests}\n\n"
-        message += "<b>📋 Список гостей:</b>\n\n"
+        message, keyboard = await self._build_guests_page(cursor_id, direction)
 
-        for guest in guests:
-            message += f"• <b>{guest.name}</b> (Гостей: {guest.guest_count})\n"
+        if message is None:
+            # Boundary guest disappeared or page is empty - start over
+            message, keyboard = await self._build_guests_page()
 
-            if guest.comment:
-                message += f"   💬 {guest.comment}\n"
+        if message is None:
+            await query.edit_message_text("📋 Список гостей пуст.")
+            return
 
-            # Convert to Moscow timezone
-            created_at_msk = guest.created_at.replace(tzinfo=timezone.utc).astimezone(MSK_ZONE)
-            message += f"   🕐 {created_at_msk.strftime('%d.%m.%Y %H:%M')}\n\n"
+        await query.edit_message_text(message, parse_mode="HTML", reply_markup=keyboard)
+
+    async def _build_guests_page(self, cursor_id: Optional[int] = None, direction: str = "next"):
+        """
+        Build one guest list message that fits into a single Telegram message
+
+        Returns:
+            Tuple of (message, keyboard), message is None when there is nothing to show
+        """
+        guests, has_more = await guest_service.get_guests_page(
+            cursor_id=cursor_id,
+            direction=direction,
+            limit=GUESTS_PAGE_SIZE
+        )
+
+        if not guests:
+            return None, None
+
+        stats = await guest_service.get_stats(days=0)
+
+        header = f"<b>📊 Гости</b>\n\n"
+        header += f"Всего гостей: {stats.total_guests}\n\n"
+        header += "<b>📋 Список гостей:</b>\n\n"
+
+        # Fill the message entry by entry so HTML tags are never cut.
+        # Going backwards the entries closest to the cursor are kept.
+        entries = [(guest, self._format_guest(guest)) for guest in guests]
+        if direction == "prev":
+            entries.reverse()
+
+        shown = []
+        length = len(header)
+        for guest, text in entries:
+            if shown and length + len(text) > MESSAGE_LIMIT:
+                break
+            shown.append((guest, text))
+            length += len(text)
+
+        truncated = len(shown) < len(entries)
+        if direction == "prev":
+            shown.reverse()
+
+        message = header + "".join(text for _, text in shown)
+
+        first_id = shown[0][0].id
+        last_id = shown[-1][0].id
 
-        # Split message if too long
-        if len(message) > 4000:
-            messages = [message[i:i+4000] for i in range(0, len(message), 4000)]
-            for msg in messages:
-                await update.message.reply_text(msg, parse_mode="HTML")
+        if direction == "prev":
+            prev_cursor = first_id if (has_more or truncated) else None
+            next_cursor = last_id
         else:
-            await update.message.reply_text(message, parse_mode="HTML")
+            prev_cursor = first_id if cursor_id is not None else None
+            next_cursor = last_id if (has_more or truncated) else None
 
-    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        return message, get_guests_page_keyboard(prev_cursor, next_cursor)
+
+    def _format_guest(self, guest) -> str:
+        """Format a single guest list entry"""
+        text = f"• <b>{escape(guest.name)}</b> (Гостей: {guest.guest_count})\n"
+
+        if guest.comment:
+            comment = guest.comment
+            if len(comment) > COMMENT_PREVIEW_LIMIT:
+                comment = comment[:COMMENT_PREVIEW_LIMIT] + "..."
+            text += f"   💬 {escape(comment)}\n"
+
+        # Convert to Moscow timezone
+        if guest.created_at:
+            created_at_msk = guest.created_at.replace(tzinfo=timezone.utc).astimezone(MSK_ZONE)
+            text += f"   🕐 {created_at_msk.strftime('%d.%m.%Y %H:%M')}\n"
+
+        return text + "\n"
+
+    async def stats_command(self, update: Update, context: RoleContext):
         """Handle /stats command - show quick statistics"""
-        user_id = update.effective_user.id
+        if not context.is_admin:
+            await update.message.reply_text("⛔ У вас нет прав для выполнения этой команды.")
+            return
+
+        stats = await guest_service.get_stats()
+
+        message = f"<b>📊 Статистика</b>\n\n"
+        message += f"👥 Всего гостей: {stats.total_guests}\n"
+        message += f"📝 Всего анкет: {stats.total_registrations}\n"
+
+        if stats.total_registrations:
+            message += "\n<b>По статусу:</b>\n"
+            for status, label in STATUS_LABELS.items():
+                if status in stats.registrations_by_status:
+                    message += (
+                        f"{label}: {stats.guests_by_status[status]} "
+                        f"(анкет: {stats.registrations_by_status[status]})\n"
+                    )
+
+        if stats.registrations_by_day:
+            message += "\n<b>Регистрации по дням:</b>\n"
+            for registered_on, registrations in stats.registrations_by_day.items():
+                message += f"📅 {registered_on.strftime('%d.%m.%Y')}: {registrations}\n"
 
-        if not Config.is_admin(user_id):
+        await update.message.reply_text(message, parse_mode="HTML")
+
+    async def reminders_command(self, update: Update, context: RoleContext):
+        """Handle /reminders command - show reminder delivery progress"""
+        if not context.is_admin:
             await update.message.reply_text("⛔ У вас нет прав для выполнения этой команды.")
             return
 
-        guests = await guest_service.get_all_guests()
+        progress = await reminder_ledger.get_progress()
 
-        total_guests = sum(g.guest_count for g in guests)
+        if not progress:
+            await update.message.reply_text("📅 Напоминания ещё не отправлялись.")
+            return
 
-        message = f"<b>📊 Статистика</b>\n\n"
-        message += f"👥 Всего гостей: {total_guests}"
+        message = "<b>📅 Рассылка напоминаний</b>\n"
+        for item in progress:
+            message += f"\n<b>{escape(item.milestone)}</b>\n"
+            message += f"✅ Доставлено: {item.sent}/{item.total}\n"
+            if item.pending:
+                message += f"⏳ В очереди: {item.pending}\n"
+            if item.failed:
+                message += f"❌ Ошибок: {item.failed}\n"
 
         await update.message.reply_text(message, parse_mode="HTML")
 
+    async def export_command(self, update: Update, context: RoleContext):
+        """Handle /export [csv|xlsx] command - send guest list as a file"""
+        if not context.is_admin:
+            await update.message.reply_text("⛔ У вас нет прав для выполнения этой команды.")
+            return
+
+        fmt = context.args[0] if context.args else "csv"
+
+        try:
+            export = await export_service.export_guests(fmt)
+        except ExportError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+
+        try:
+            await update.message.reply_document(
+                document=export.file,
+                filename=export.filename,
+                caption=f"📋 Гостей в выгрузке: {export.rows}"
+            )
+        finally:
+            export.close()
+
 
 admin_handler = AdminHandler()
@@ -1,7 +1,12 @@
 from telegram import Update
-from telegram.ext import ContextTypes
 from config import Config
+from handlers.context import RoleContext
+from handlers.conversation import (
+    conversation_states,
+    FAQ_ADD_QUESTION, FAQ_ADD_ANSWER, FAQ_EDIT_QUESTION, FAQ_EDIT_ANSWER
+)
 from services.faq_service import faq_service
+from utils.state_store import StateStore
 from utils.keyboards import get_faq_management_keyboard, get_faq_list_keyboard
 
 
@@ -9,15 +14,19 @@ class AdminFAQHandler:
     """Handle admin FAQ editing"""
 
     def __init__(self):
-        self.adding_faq = {}  # {user_id: {step: 'question'|'answer', question: '...'}}
-        self.editing_faq = {}  # {user_id: {step: 'question'|'answer', faq_id: id, new_question: '...'}}
-        self.faq_locks = {}  # {faq_id: user_id} - track which FAQ is being edited by whom
+        # {faq_id: user_id} - track which FAQ is being edited by whom
+        self.faq_locks = StateStore(
+            "faq_locks",
+            ttl=Config.FAQ_LOCK_TTL,
+            max_entries=Config.STATE_MAX_ENTRIES
+        )
 
-    async def faq_edit_button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle FAQ edit button click"""
-        user_id = update.effective_user.id
+        # Leaving an edit conversation (finished or replaced) releases its lock
+        conversation_states.on_clear((FAQ_EDIT_QUESTION, FAQ_EDIT_ANSWER), self._release_lock)
 
-        if not Config.is_admin(user_id):
+    async def faq_edit_button_handler(self, update: Update, context: RoleContext):
+        """Handle FAQ edit button click"""
+        if not context.is_admin:
             await update.message.reply_text("⛔ У вас нет прав для редактирования FAQ.")
             return
 
@@ -42,14 +51,12 @@ class AdminFAQHandler:
             reply_markup=keyboard
         )
 
-    async def faq_list_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_list_callback(self, update: Update, context: RoleContext):
         """Handle FAQ list callback"""
         query = update.callback_query
         await query.answer()
 
-        user_id = query.from_user.id
-
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.edit_message_text("⛔ У вас нет прав.")
             return
 
@@ -74,39 +81,31 @@ class AdminFAQHandler:
             reply_markup=keyboard
         )
 
-    async def faq_add_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_add_callback(self, update: Update, context: RoleContext):
         """Handle add FAQ callback"""
         query = update.callback_query
         await query.answer()
 
         user_id = query.from_user.id
 
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.edit_message_text("⛔ У вас нет прав.")
             return
 
-        self.adding_faq[user_id] = {"step": "question"}
+        conversation_states.set(user_id, FAQ_ADD_QUESTION)
 
         await query.edit_message_text(
             "➕ <b>Добавление FAQ</b>\n\nВведите вопрос:",
             parse_mode="HTML"
         )
 
-    async def faq_add_receive_question(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive question text for new FAQ"""
+    async def faq_add_receive_question(self, update: Update, context: RoleContext, entry: dict):
+        """Receive question text for new FAQ (FAQ_ADD_QUESTION state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.adding_faq:
-            return False
-
-        data = self.adding_faq[user_id]
-        if data.get("step") != "question":
-            return False
-
         question_text = update.message.text
 
-        self.adding_faq[user_id]["step"] = "answer"
-        self.adding_faq[user_id]["question"] = question_text
+        conversation_states.advance(user_id, FAQ_ADD_ANSWER, question=question_text)
 
         await update.message.reply_text(
             f"❓ Вопрос: <b>{question_text}</b>\n\nВведите ответ:",
@@ -114,26 +113,19 @@ class AdminFAQHandler:
         )
         return True
 
-    async def faq_add_receive_answer(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive answer text for new FAQ"""
+    async def faq_add_receive_answer(self, update: Update, context: RoleContext, entry: dict):
+        """Receive answer text for new FAQ (FAQ_ADD_ANSWER state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.adding_faq:
-            return False
-
-        data = self.adding_faq[user_id]
-        if data.get("step") != "answer":
-            return False
-
         answer_text = update.message.text
-        question_text = data["question"]
+        question_text = entry["question"]
 
         # Create FAQ
         next_order = await faq_service.get_next_order()
         await faq_service.create_faq(question_text, answer_text, next_order)
 
         # Clean up
-        del self.adding_faq[user_id]
+        conversation_states.clear(user_id)
 
         await update.message.reply_text(
             f"✅ FAQ добавлен!\n\n❓ <b>{question_text}</b>\n📍 {answer_text}",
@@ -144,14 +136,14 @@ class AdminFAQHandler:
         await self.faq_edit_button_handler(update, context)
         return True
 
-    async def faq_edit_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_edit_callback(self, update: Update, context: RoleContext):
         """Handle edit FAQ callback"""
         query = update.callback_query
         await query.answer()
 
         user_id = query.from_user.id
 
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.edit_message_text("⛔ У вас нет прав.")
             return
 
@@ -159,8 +151,8 @@ class AdminFAQHandler:
         data = query.data
         faq_id = int(data.split("_")[2])
 
-        # Check if FAQ is being edited by another admin
-        if faq_id in self.faq_locks and self.faq_locks[faq_id] != user_id:
+        # Take the lock unless the FAQ is being edited by another admin
+        if not self.faq_locks.add(faq_id, user_id) and self.faq_locks.get(faq_id) != user_id:
             await query.edit_message_text(
                 "⛔ Этот FAQ сейчас редактирует другой администратор. Попробуйте позже."
             )
@@ -169,12 +161,13 @@ class AdminFAQHandler:
         faq = await faq_service.get_faq_by_id(faq_id)
 
         if not faq:
+            self.faq_locks.pop(faq_id)
             await query.edit_message_text("❌ FAQ не найден.")
             return
 
-        # Set lock
-        self.faq_locks[faq_id] = user_id
-        self.editing_faq[user_id] = {"step": "question", "faq_id": faq_id}
+        # Replacing a previous conversation may release its lock, so (re)set ours after
+        conversation_states.set(user_id, FAQ_EDIT_QUESTION, faq_id=faq_id)
+        self.faq_locks.set(faq_id, user_id)
 
         message = f"""✏️ <b>Редактирование FAQ #{faq_id}</b>
 
@@ -188,25 +181,16 @@ class AdminFAQHandler:
 
         await query.edit_message_text(message, parse_mode="HTML")
 
-    async def faq_edit_receive_question(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive new question for FAQ"""
+    async def faq_edit_receive_question(self, update: Update, context: RoleContext, entry: dict):
+        """Receive new question for FAQ (FAQ_EDIT_QUESTION state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.editing_faq:
-            return False
-
-        data = self.editing_faq[user_id]
-        if data.get("step") != "question":
-            return False
-
-        faq_id = data["faq_id"]
+        faq_id = entry["faq_id"]
         faq = await faq_service.get_faq_by_id(faq_id)
 
         if not faq:
             # Release lock
-            if faq_id in self.faq_locks:
-                del self.faq_locks[faq_id]
-            del self.editing_faq[user_id]
+            conversation_states.clear(user_id)
             await update.message.reply_text("❌ FAQ не найден.")
             return True
 
@@ -215,9 +199,9 @@ class AdminFAQHandler:
         if question_text == "/skip":
             question_text = faq.question
 
-        # Move to answer step
-        self.editing_faq[user_id]["step"] = "answer"
-        self.editing_faq[user_id]["new_question"] = question_text
+        # Move to answer step and extend the lock
+        conversation_states.advance(user_id, FAQ_EDIT_ANSWER, new_question=question_text)
+        self.faq_locks.set(faq_id, user_id)
 
         await update.message.reply_text(
             f"❓ Новый вопрос: <b>{question_text}</b>\n\nВведите новый ответ (или /skip чтобы оставить без изменения):",
@@ -225,27 +209,18 @@ class AdminFAQHandler:
         )
         return True
 
-    async def faq_edit_receive_answer(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive new answer for FAQ"""
+    async def faq_edit_receive_answer(self, update: Update, context: RoleContext, entry: dict):
+        """Receive new answer for FAQ (FAQ_EDIT_ANSWER state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.editing_faq:
-            return False
-
-        data = self.editing_faq[user_id]
-        if data.get("step") != "answer":
-            return False
-
-        faq_id = data["faq_id"]
-        new_question = data.get("new_question")
+        faq_id = entry["faq_id"]
+        new_question = entry.get("new_question")
 
         faq = await faq_service.get_faq_by_id(faq_id)
 
         if not faq:
             # Release lock
-            if faq_id in self.faq_locks:
-                del self.faq_locks[faq_id]
-            del self.editing_faq[user_id]
+            conversation_states.clear(user_id)
             await update.message.reply_text("❌ FAQ не найден.")
             return True
 
@@ -260,12 +235,8 @@ class AdminFAQHandler:
         # Update FAQ
         await faq_service.update_faq(faq_id, new_question, answer_text)
 
-        # Release lock
-        if faq_id in self.faq_locks:
-            del self.faq_locks[faq_id]
-
-        # Clean up
-        del self.editing_faq[user_id]
+        # Release lock and clean up
+        conversation_states.clear(user_id)
 
         await update.message.reply_text(
             f"✅ FAQ обновлён!\n\n❓ <b>{new_question}</b>\n📍 {answer_text}",
@@ -273,14 +244,12 @@ class AdminFAQHandler:
         )
         return True
 
-    async def faq_delete_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_delete_callback(self, update: Update, context: RoleContext):
         """Handle delete FAQ callback"""
         query = update.callback_query
         await query.answer()
 
-        user_id = query.from_user.id
-
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.edit_message_text("⛔ У вас нет прав.")
             return
 
@@ -300,14 +269,12 @@ class AdminFAQHandler:
         # Show updated FAQ list
         await self.faq_list_callback(update, context)
 
-    async def faq_back_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_back_callback(self, update: Update, context: RoleContext):
         """Handle back button callback - return to FAQ edit menu"""
         query = update.callback_query
         await query.answer()
 
-        user_id = query.from_user.id
-
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.edit_message_text("⛔ У вас нет прав.")
             return
 
@@ -333,14 +300,12 @@ class AdminFAQHandler:
             reply_markup=keyboard
         )
 
-    async def faq_exit_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def faq_exit_callback(self, update: Update, context: RoleContext):
         """Handle exit from FAQ menu - return to admin menu"""
         query = update.callback_query
         await query.answer()
 
-        user_id = query.from_user.id
-
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await query.message.reply_text("⛔ У вас нет прав.")
             return
 
@@ -351,13 +316,11 @@ class AdminFAQHandler:
             reply_markup=get_admin_menu_keyboard()
         )
 
-    def clear_user_locks(self, user_id: int):
-        """Clear all locks for a specific user (useful for cancel operations)"""
-        if user_id in self.editing_faq:
-            faq_id = self.editing_faq[user_id].get("faq_id")
-            if faq_id and faq_id in self.faq_locks:
-                del self.faq_locks[faq_id]
-            del self.editing_faq[user_id]
+    def _release_lock(self, user_id: int, entry: dict):
+        """Release the FAQ lock held by an edit conversation"""
+        faq_id = entry.get("faq_id")
+        if self.faq_locks.get(faq_id) == user_id:
+            self.faq_locks.pop(faq_id)
 
 
 admin_faq_handler = AdminFAQHandler()
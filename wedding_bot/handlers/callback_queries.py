@@ -1,6 +1,9 @@
+from html import escape
+
 from telegram import Update
-from telegram.ext import ContextTypes
-from config import Config
+from handlers.context import RoleContext
+from handlers.conversation import conversation_states, BRIDE_ANSWER
+from handlers.inbox import inbox_handler
 from services.question_service import question_service
 from utils.keyboards import get_main_menu_keyboard
 
@@ -8,10 +11,7 @@ from utils.keyboards import get_main_menu_keyboard
 class CallbackQueryHandler:
     """Handle callback queries from inline keyboards"""
 
-    def __init__(self):
-        self.pending_answers = {}  # Store question_id waiting for answer
-
-    async def answer_button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def answer_button_handler(self, update: Update, context: RoleContext):
         """Handle answer button click from bride"""
         query = update.callback_query
         await query.answer()
@@ -19,7 +19,7 @@ class CallbackQueryHandler:
         user_id = query.from_user.id
 
         # Only bride can answer
-        if user_id != Config.BRIDE_ID:
+        if not context.is_bride:
             await query.edit_message_text("⛔ Только невеста может отвечать на вопросы.")
             return
 
@@ -33,34 +33,35 @@ class CallbackQueryHandler:
         question_id = int(parts[1])
         from_user_id = int(parts[2])
 
-        # Store pending answer
-        self.pending_answers[user_id] = {
-            "question_id": question_id,
-            "from_user_id": from_user_id
-        }
-
         # Get question
         question = await question_service.get_question_by_id(question_id)
 
+        # It may have been answered from the inbox meanwhile
+        if not question or question.answer_text is not None:
+            await query.edit_message_text("✅ На этот вопрос уже ответили.")
+            return
+
+        # Store pending answer
+        conversation_states.set(
+            user_id, BRIDE_ANSWER,
+            question_id=question_id,
+            from_user_id=from_user_id
+        )
+
         await query.edit_message_text(
             f"💬 <b>Вопрос #{question_id}</b>\n\n"
-            f"{question.question_text}\n\n"
+            f"{escape(question.question_text)}\n\n"
             f"Пожалуйста, напишите ваш ответ:",
             parse_mode="HTML"
         )
 
-    async def receive_answer_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive answer text from bride"""
+    async def receive_answer_text(self, update: Update, context: RoleContext, entry: dict):
+        """Receive answer text from bride (BRIDE_ANSWER state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.pending_answers:
-            return False
-
         answer_text = update.message.text
 
-        pending_data = self.pending_answers[user_id]
-        question_id = pending_data["question_id"]
-        from_user_id = pending_data["from_user_id"]
+        question_id = entry["question_id"]
 
         # Save answer to database
         question = await question_service.answer_question(
@@ -70,23 +71,30 @@ class CallbackQueryHandler:
         )
 
         if not question:
-            await update.message.reply_text("❌ Ошибка: вопрос не найден.")
-            del self.pending_answers[user_id]
-            return False
-
-        # Send answer to guest
-        try:
-            await context.bot.send_message(
-                chat_id=from_user_id,
-                text=f"Пришел ответ на твой вопрос\n\n❓ Вопрос:\n{question.question_text}\n\n💬 Ответ:\n{answer_text}",
-                parse_mode="HTML"
-            )
-            await update.message.reply_text("✅ Ответ отправлен гостю!")
-        except Exception as e:
-            await update.message.reply_text(f"❌ Не удалось отправить ответ: {e}")
-
-        # Remove from pending
-        del self.pending_answers[user_id]
+            if not await question_service.get_question_by_id(question_id):
+                await update.message.reply_text("❌ Ошибка: вопрос не найден.")
+                conversation_states.clear(user_id)
+                return False
+
+            # Someone else answered it while this answer was being written
+            await update.message.reply_text("⚠️ На этот вопрос уже ответили, ваш ответ не отправлен.")
+            if entry.get("session"):
+                await inbox_handler.prompt_next(context.bot, user_id, after_id=question_id)
+            else:
+                conversation_states.clear(user_id)
+            return True
+
+        # The answer is queued to the guest together with saving it,
+        # a failed delivery is reported back by question_service
+        await update.message.reply_text(
+            "✅ Ответ сохранён и отправляется гостю. Если доставить его не получится, я сообщу."
+        )
+
+        # In an answering session go on with the next question
+        if entry.get("session"):
+            await inbox_handler.prompt_next(context.bot, user_id, after_id=question_id)
+        else:
+            conversation_states.clear(user_id)
         return True
 
 
@@ -0,0 +1,26 @@
+from functools import cached_property
+
+from telegram.ext import CallbackContext, ExtBot
+
+from config import roles, ROLE_ADMIN
+
+
+class RoleContext(CallbackContext[ExtBot, dict, dict, dict]):
+    """Callback context that knows the role of the update's user
+
+    The application builds one context per update and shares it between
+    handler groups, so the role is resolved at most once per update.
+    """
+
+    @cached_property
+    def role(self) -> str:
+        """Routing role of the user (see config.role_of)"""
+        return roles.role_of(self._user_id)
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == ROLE_ADMIN
+
+    @property
+    def is_bride(self) -> bool:
+        return roles.is_bride(self._user_id)
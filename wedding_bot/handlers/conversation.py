@@ -0,0 +1,74 @@
+from typing import Callable, Optional
+
+from config import Config
+from utils.state_store import StateStore
+
+# Conversation states (one active state per user)
+GUEST_QUESTION = "guest_question"
+FAQ_ADD_QUESTION = "faq_add_question"
+FAQ_ADD_ANSWER = "faq_add_answer"
+FAQ_EDIT_QUESTION = "faq_edit_question"
+FAQ_EDIT_ANSWER = "faq_edit_answer"
+BRIDE_ANSWER = "bride_answer"
+DUPLICATE_OFFERED = "duplicate_offered"
+
+
+class ConversationStates:
+    """Per-user conversation state shared by all text handlers
+
+    Each user has at most one entry: {"state": ..., **data}. Starting a new
+    conversation replaces the previous one; cleanup callbacks registered for
+    the old state run first (e.g. releasing an FAQ edit lock). Entries that
+    stay untouched for STATE_TTL seconds are dropped without cleanup.
+    """
+
+    def __init__(self, store: StateStore):
+        self._states = store  # {user_id: {"state": str, ...}}
+        self._cleanups = {}  # {state: callback(user_id, entry)}
+        # Message routing reads the store directly, without the LRU update
+        self.peek = store.peek
+
+    def on_clear(self, states, callback: Callable):
+        """Register a callback run when a user leaves one of the given states"""
+        for state in states:
+            self._cleanups[state] = callback
+
+    def get(self, user_id: int) -> Optional[dict]:
+        """Get current state entry for user"""
+        return self._states.get(user_id)
+
+    def set(self, user_id: int, state: str, **data) -> dict:
+        """Start a new conversation state, replacing the previous one"""
+        previous = self._states.get(user_id)
+        if previous is not None:
+            self._run_cleanup(user_id, previous)
+
+        entry = {"state": state, **data}
+        self._states.set(user_id, entry)
+        return entry
+
+    def advance(self, user_id: int, state: str, **data) -> dict:
+        """Move to the next step of the same conversation, keeping its data"""
+        entry = self._states.get(user_id, {})
+        entry = {**entry, **data, "state": state}
+        self._states.set(user_id, entry)
+        return entry
+
+    def clear(self, user_id: int) -> Optional[dict]:
+        """Finish the user's conversation"""
+        previous = self._states.pop(user_id, None)
+        if previous is not None:
+            self._run_cleanup(user_id, previous)
+        return previous
+
+    def _run_cleanup(self, user_id: int, entry: dict):
+        callback = self._cleanups.get(entry["state"])
+        if callback:
+            callback(user_id, entry)
+
+
+conversation_states = ConversationStates(StateStore(
+    "conversations",
+    ttl=Config.STATE_TTL,
+    max_entries=Config.STATE_MAX_ENTRIES
+))
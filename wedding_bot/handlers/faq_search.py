@@ -0,0 +1,66 @@
+from html import escape
+
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from config import Config
+from handlers.context import RoleContext
+from services.faq_service import faq_service
+from utils.keyboards import get_main_menu_keyboard, get_admin_menu_keyboard
+
+# Inline results per query (Telegram allows up to 50)
+INLINE_RESULTS_LIMIT = 10
+# FAQ hits shown in reply to free text
+TEXT_RESULTS_LIMIT = 3
+INLINE_CACHE_TIME = 60
+
+
+class FAQSearchHandler:
+    """Answer guests from the FAQ search index"""
+
+    async def inline_query_handler(self, update: Update, context: RoleContext):
+        """Handle inline query: @bot <text>"""
+        query = update.inline_query
+        search_text = query.query.strip()
+
+        if search_text:
+            faqs = await faq_service.search(search_text, limit=INLINE_RESULTS_LIMIT)
+        else:
+            faqs = (await faq_service.get_all_faqs())[:INLINE_RESULTS_LIMIT]
+
+        results = [
+            InlineQueryResultArticle(
+                id=str(faq.id),
+                title=faq.question,
+                description=faq.answer[:100],
+                input_message_content=InputTextMessageContent(
+                    f"❓ <b>{escape(faq.question)}</b>\n\n💬 {escape(faq.answer)}",
+                    parse_mode="HTML"
+                )
+            )
+            for faq in faqs
+        ]
+
+        await query.answer(results, cache_time=INLINE_CACHE_TIME)
+
+    async def free_text_handler(self, update: Update, context: RoleContext):
+        """Reply to unrecognised text with matching FAQ items"""
+        keyboard = get_admin_menu_keyboard() if context.is_admin else get_main_menu_keyboard()
+
+        faqs = await faq_service.search(update.message.text, limit=TEXT_RESULTS_LIMIT)
+
+        if not faqs:
+            await update.message.reply_text(
+                "Пожалуйста, используйте кнопки меню для взаимодействия с ботом.",
+                reply_markup=keyboard
+            )
+            return
+
+        lines = ["🔎 <b>Возможно, ответ уже есть:</b>\n"]
+        for faq in faqs:
+            lines.append(f"\n❓ <b>{escape(faq.question)}</b>")
+            lines.append(f"💬 {escape(faq.answer)}")
+        lines.append(f"\nНе нашли ответ? Нажмите «{Config.GUEST_QUESTION_BUTTON_TEXT}».")
+
+        await update.message.reply_text("\n".join(lines), parse_mode="HTML", reply_markup=keyboard)
+
+
+faq_search_handler = FAQSearchHandler()
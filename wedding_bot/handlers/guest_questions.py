@@ -1,56 +1,53 @@
+from html import escape
+
 from telegram import Update
 from telegram.ext import ContextTypes
 from config import Config
+from handlers.conversation import conversation_states, GUEST_QUESTION, DUPLICATE_OFFERED
 from services.question_service import question_service
-from utils.keyboards import get_main_menu_keyboard, get_answer_keyboard
+from services.similarity_service import similarity_service, KIND_FAQ
+from utils.keyboards import get_main_menu_keyboard, get_duplicate_answer_keyboard
 
 
 class QuestionHandler:
     """Handle guest question button and conversation"""
 
-    def __init__(self):
-        self.user_questions = {}  # Temporary storage for pending questions
-
     async def question_button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle question button click"""
         user = update.effective_user
 
         # Store that user is in question mode
-        self.user_questions[user.id] = {
-            "username": user.username,
-            "waiting_for_text": True
-        }
+        conversation_states.set(user.id, GUEST_QUESTION, username=user.username)
 
         await update.message.reply_text(
             "Пожалуйста, напишите ваш вопрос:"
         )
 
-    async def receive_question_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Receive question text from user"""
+    async def receive_question_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE, entry: dict):
+        """Receive question text from user (GUEST_QUESTION state)"""
         user_id = update.effective_user.id
 
-        if user_id not in self.user_questions:
-            return False
-
-        if not self.user_questions[user_id].get("waiting_for_text"):
-            return False
-
         question_text = update.message.text
 
-        # Save question to database
-        question = await question_service.create_question(
-            from_user_id=user_id,
-            from_username=update.effective_user.username,
-            question_text=question_text
-        )
-
-        # Send question to bride with answer button
-        username = update.effective_user.username or "гостя"
-        await context.bot.send_message(
-            chat_id=Config.BRIDE_ID,
-            text=f"Вопрос от @{username}\n\n{question_text}",
-            reply_markup=get_answer_keyboard(question.id, user_id)
-        )
+        # Offer a stored answer first if the question was already answered
+        match = similarity_service.find_answer(question_text, Config.DUPLICATE_QUESTION_THRESHOLD)
+        if match:
+            conversation_states.set(
+                user_id, DUPLICATE_OFFERED,
+                username=update.effective_user.username,
+                question_text=question_text
+            )
+            source = "Частых вопросах" if match.kind == KIND_FAQ else "ответах на вопросы гостей"
+            await update.message.reply_text(
+                f"🔎 Похожий вопрос уже есть в {source}:\n\n"
+                f"❓ <b>{escape(match.question)}</b>\n"
+                f"💬 {escape(match.answer)}",
+                parse_mode="HTML",
+                reply_markup=get_duplicate_answer_keyboard()
+            )
+            return True
+
+        await self._send_to_bride(context, user_id, update.effective_user.username, question_text)
 
         # Notify guest that question was sent
         await update.message.reply_text(
@@ -59,8 +56,54 @@ class QuestionHandler:
         )
 
         # Remove from pending
-        del self.user_questions[user_id]
+        conversation_states.clear(user_id)
         return True
 
+    async def duplicate_answer_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle guest reaction to an offered stored answer"""
+        query = update.callback_query
+        await query.answer()
+
+        user_id = query.from_user.id
+        entry = conversation_states.get(user_id)
+
+        if not entry or entry["state"] != DUPLICATE_OFFERED:
+            await query.edit_message_reply_markup(reply_markup=None)
+            await query.message.reply_text(
+                "⌛ Вопрос устарел. Нажмите «Задать вопрос», чтобы задать его снова.",
+                reply_markup=get_main_menu_keyboard()
+            )
+            return
+
+        conversation_states.clear(user_id)
+        await query.edit_message_reply_markup(reply_markup=None)
+
+        if query.data == "dupq_ok":
+            await query.message.reply_text(
+                "👍 Отлично! Если появятся другие вопросы — пишите.",
+                reply_markup=get_main_menu_keyboard()
+            )
+            return
+
+        # dupq_send: escalate anyway
+        await self._send_to_bride(context, user_id, entry.get("username"), entry["question_text"])
+        await query.message.reply_text(
+            "Спасибо! Ваш вопрос отправлен. Мы ответим вам в ближайшее время.",
+            reply_markup=get_main_menu_keyboard()
+        )
+
+    async def _send_to_bride(self, context: ContextTypes.DEFAULT_TYPE, user_id: int, username, question_text: str):
+        """Save question and queue it to bride with answer button
+
+        With digests enabled the question is only saved; the digest
+        service delivers it with the other new questions.
+        """
+        await question_service.create_question(
+            from_user_id=user_id,
+            from_username=username,
+            question_text=question_text,
+            notify_bride=Config.QUESTION_DIGEST_INTERVAL <= 0
+        )
+
 
 question_handler = QuestionHandler()
@@ -0,0 +1,187 @@
+from html import escape
+from typing import Optional
+
+from telegram import Bot, Update
+from handlers.context import RoleContext
+from handlers.conversation import conversation_states, BRIDE_ANSWER
+from services.question_service import question_service
+from services.question_digest_service import format_question_entry
+from utils.keyboards import get_inbox_keyboard, get_answer_session_keyboard
+
+INBOX_PAGE_SIZE = 5
+
+
+class InboxHandler:
+    """Pending question inbox and answering sessions for the bride"""
+
+    async def inbox_command(self, update: Update, context: RoleContext):
+        """Handle /inbox command - show unanswered questions"""
+        if not self._can_view(context):
+            await update.message.reply_text("⛔ У вас нет прав для выполнения этой команды.")
+            return
+
+        message, keyboard = await self._build_inbox_page()
+        await update.message.reply_text(message, parse_mode="HTML", reply_markup=keyboard)
+
+    async def inbox_open_callback(self, update: Update, context: RoleContext):
+        """Handle "all questions" button under a digest - send the inbox"""
+        query = update.callback_query
+        await query.answer()
+
+        if not self._can_view(context):
+            return
+
+        message, keyboard = await self._build_inbox_page()
+        await query.message.reply_text(message, parse_mode="HTML", reply_markup=keyboard)
+
+    async def inbox_page_callback(self, update: Update, context: RoleContext):
+        """Handle inbox navigation callback"""
+        query = update.callback_query
+        await query.answer()
+
+        if not self._can_view(context):
+            return
+
+        # Parse: inbox_{next|prev}_{question_id}
+        _, direction, cursor = query.data.split("_")
+        message, keyboard = await self._build_inbox_page(int(cursor), direction)
+        await query.edit_message_text(message, parse_mode="HTML", reply_markup=keyboard)
+
+    def _can_view(self, context: RoleContext) -> bool:
+        """Inbox is available to the bride and admins"""
+        return context.is_bride or context.is_admin
+
+    async def _build_inbox_page(self, cursor_id: Optional[int] = None, direction: str = "next"):
+        """Build one inbox page: (message, keyboard)"""
+        questions, has_more = await question_service.get_pending_page(
+            cursor_id=cursor_id,
+            direction=direction,
+            limit=INBOX_PAGE_SIZE
+        )
+
+        if not questions:
+            if cursor_id is None:
+                return "📭 Все вопросы отвечены!", None
+            # The page emptied (questions were answered meanwhile), start over
+            return await self._build_inbox_page()
+
+        total = await question_service.count_pending()
+        message = f"<b>📥 Вопросы без ответа: {total}</b>\n\n"
+        message += "".join(format_question_entry(question) for question in questions)
+
+        first_id = questions[0].id
+        last_id = questions[-1].id
+        if direction == "prev":
+            prev_cursor = first_id if has_more else None
+            next_cursor = last_id
+        else:
+            prev_cursor = first_id if cursor_id is not None else None
+            next_cursor = last_id if has_more else None
+
+        return message, get_inbox_keyboard(questions, prev_cursor, next_cursor)
+
+    async def answer_callback(self, update: Update, context: RoleContext):
+        """Handle answer button in the inbox or a digest"""
+        query = update.callback_query
+        user_id = query.from_user.id
+
+        if not context.is_bride:
+            await query.answer("⛔ Только невеста может отвечать на вопросы.", show_alert=True)
+            return
+
+        # Parse: inbox_answer_{question_id}
+        question_id = int(query.data.split("_")[2])
+        question = await question_service.get_question_by_id(question_id)
+
+        if not question or question.answer_text is not None:
+            await query.answer("✅ На этот вопрос уже ответили.", show_alert=True)
+            return
+
+        await query.answer()
+
+        # A new message, so the list stays usable for the next question
+        await self._prompt(context.bot, user_id, question, session=False)
+
+    async def session_callback(self, update: Update, context: RoleContext):
+        """Start answering pending questions one after another"""
+        query = update.callback_query
+        user_id = query.from_user.id
+
+        if not context.is_bride:
+            await query.answer("⛔ Только невеста может отвечать на вопросы.", show_alert=True)
+            return
+
+        await query.answer()
+        await self.prompt_next(context.bot, user_id)
+
+    async def skip_callback(self, update: Update, context: RoleContext):
+        """Skip the current question in an answering session"""
+        query = update.callback_query
+        await query.answer()
+
+        user_id = query.from_user.id
+        entry = conversation_states.get(user_id)
+
+        await query.edit_message_reply_markup(reply_markup=None)
+
+        if not entry or entry["state"] != BRIDE_ANSWER or not entry.get("session"):
+            return
+
+        await self.prompt_next(context.bot, user_id, after_id=entry["question_id"])
+
+    async def stop_callback(self, update: Update, context: RoleContext):
+        """Finish an answering session"""
+        query = update.callback_query
+        await query.answer()
+
+        user_id = query.from_user.id
+        entry = conversation_states.get(user_id)
+        if entry and entry["state"] == BRIDE_ANSWER:
+            conversation_states.clear(user_id)
+
+        await query.edit_message_reply_markup(reply_markup=None)
+
+        remaining = await question_service.count_pending()
+        await query.message.reply_text(f"⏹ Готово! Вопросов без ответа: {remaining}. Открыть список: /inbox")
+
+    async def prompt_next(self, bot: Bot, user_id: int, after_id: Optional[int] = None) -> bool:
+        """Ask the next pending question of an answering session
+
+        Returns:
+            False when no questions are left (the session is finished)
+        """
+        questions, _ = await question_service.get_pending_page(cursor_id=after_id, limit=1)
+
+        if not questions:
+            conversation_states.clear(user_id)
+            remaining = await question_service.count_pending()
+            if remaining:
+                text = f"✅ Это был последний вопрос. Без ответа осталось: {remaining}. Открыть список: /inbox"
+            else:
+                text = "🎉 Все вопросы отвечены!"
+            await bot.send_message(chat_id=user_id, text=text)
+            return False
+
+        await self._prompt(bot, user_id, questions[0], session=True)
+        return True
+
+    async def _prompt(self, bot: Bot, user_id: int, question, session: bool):
+        """Ask bride for an answer to the question"""
+        conversation_states.set(
+            user_id, BRIDE_ANSWER,
+            question_id=question.id,
+            from_user_id=question.from_user_id,
+            session=session
+        )
+
+        await bot.send_message(
+            chat_id=user_id,
+            text=f"💬 <b>Вопрос #{question.id}</b>\n\n"
+                 f"{escape(question.question_text)}\n\n"
+                 f"Пожалуйста, напишите ваш ответ:",
+            parse_mode="HTML",
+            reply_markup=get_answer_session_keyboard() if session else None
+        )
+
+
+inbox_handler = InboxHandler()
@@ -0,0 +1,70 @@
+from typing import Awaitable, Callable, Optional
+
+from telegram import Update
+from config import role_of, ROLE_WEBSITE, ROLE_ADMIN, ROLE_GUEST
+from handlers.context import RoleContext
+from handlers.conversation import conversation_states
+
+Handler = Callable[..., Awaitable]
+
+
+class MessageRouter:
+    """Route text messages with dict lookups instead of an if-chain
+
+    Priority: role handler (website form) > menu button for the role >
+    handler for the user's conversation state > fallback.
+    """
+
+    def __init__(self):
+        self._role_handlers = {}  # {role: handler(update, context)}
+        self._buttons = {ROLE_WEBSITE: {}, ROLE_ADMIN: {}, ROLE_GUEST: {}}  # {role: {text: handler(update, context)}}
+        self._states = {}  # {state: handler(update, context, entry)}
+        self._fallback: Optional[Handler] = None
+
+    def add_role(self, role: str, handler: Handler):
+        """Send every text message from the role to one handler"""
+        self._role_handlers[role] = handler
+
+    def add_button(self, text: str, handler: Handler, roles=(ROLE_GUEST, ROLE_ADMIN)):
+        """Route a menu button press for the given roles"""
+        for role in roles:
+            self._buttons[role][text] = handler
+
+    def add_state(self, state: str, handler: Handler):
+        """Route free text while the user is in a conversation state"""
+        self._states[state] = handler
+
+    def set_fallback(self, handler: Handler):
+        """Handle messages nothing else matched"""
+        self._fallback = handler
+
+    def resolve(self, user_id: int, text: str, role: Optional[str] = None):
+        """Find handler for a message: (handler, state entry or None)"""
+        if role is None:
+            role = role_of(user_id)
+
+        handler = self._role_handlers.get(role) or self._buttons[role].get(text)
+        if handler is not None:
+            return handler, None
+
+        # No LRU update: text without a conversation state costs one dict lookup
+        entry = conversation_states.peek(user_id)
+        if entry is not None:
+            handler = self._states.get(entry["state"])
+            if handler is not None:
+                return handler, entry
+
+        return self._fallback, None
+
+    async def dispatch(self, update: Update, context: RoleContext):
+        """Handle a text message"""
+        handler, entry = self.resolve(update.effective_user.id, update.message.text, context.role)
+        if handler is None:
+            return
+        if entry is not None:
+            await handler(update, context, entry)
+        else:
+            await handler(update, context)
+
+
+message_router = MessageRouter()
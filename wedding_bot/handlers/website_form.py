@@ -1,27 +1,17 @@
 import json
 from telegram import Update
-from telegram.ext import ContextTypes
-from config import Config
+from config import ROLE_WEBSITE
+from handlers.context import RoleContext
 from services.guest_service import guest_service
-from services.notification_service import NotificationService
 
 
 class WebsiteFormHandler:
     """Handle messages from website form sent via Telegram API"""
 
-    def __init__(self):
-        self.notification_service = None  # Will be set with bot instance
-
-    def set_bot(self, bot):
-        """Set bot instance for notifications"""
-        self.notification_service = NotificationService(bot)
-
-    async def handle_website_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    async def handle_website_message(self, update: Update, context: RoleContext):
         """Process JSON message from website"""
-        user_id = update.effective_user.id
-
         # Verify message is from website
-        if not Config.is_website_sender(user_id):
+        if context.role != ROLE_WEBSITE:
             return False
 
         try:
@@ -51,7 +41,7 @@ class WebsiteFormHandler:
                 )
                 return True
 
-            # Create guest in database
+            # Create guest in database (owners are notified via the outbox)
             guest = await guest_service.create_guest(
                 name=name,
                 guest_count=guest_count,
@@ -59,9 +49,6 @@ class WebsiteFormHandler:
                 comment=comment
             )
 
-            # Notify bride and groom
-            await self.notification_service.notify_about_new_guest(guest)
-
             # Send success confirmation
             await update.message.reply_text(
                 f"✅ Гость успешно зарегистрирован!\n"
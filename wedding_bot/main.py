@@ -3,7 +3,6 @@ import signal
 import sys
 import io
 import time
-from datetime import datetime
 
 # Fix Windows console encoding for emoji
 if sys.platform == "win32":
@@ -13,17 +12,29 @@ if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
+from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters
 from telegram.error import TimedOut, NetworkError
-from config import Config
+from config import Config, roles, ROLE_WEBSITE, ROLE_ADMIN
 from database.database import db
-from database.models import BotUser
+from services.bot_user_service import bot_user_service
+from services.question_digest_service import question_digest_service
+from services.outbox_service import outbox_service
+from services.similarity_service import similarity_service
 from handlers.guest_questions import question_handler
 from handlers.admin_commands import admin_handler
 from handlers.callback_queries import callback_query_handler
 from handlers.website_form import website_form_handler
 from handlers.admin_faq import admin_faq_handler
+from handlers.faq_search import faq_search_handler
+from handlers.inbox import inbox_handler
+from handlers import conversation
+from handlers.context import RoleContext
+from handlers.router import message_router
 from utils.keyboards import get_main_menu_keyboard, get_admin_menu_keyboard
+from utils.metrics import timed_handler
+from utils.state_store import attach_backend, create_backend, purge_expired_loop
+from utils.timed_request import TimedHTTPXRequest
+from utils.update_processor import PerUserUpdateProcessor
 from services.reminder_service import ReminderService
 
 
@@ -35,36 +46,80 @@ class WeddingBot:
         self.running = False
         self.http_runner = None
         self.reminder_service = None
+        self.roles_watcher = None
+        self.state_purger = None
+        self.state_backend = None
 
     async def init(self):
         """Initialize the bot"""
+        Config.check_modes()
+
         print("📦 Initializing database...", flush=True)
         # Initialize database
         await db.init_db()
         print("✅ Database initialized!", flush=True)
 
+        # Restore conversation states and FAQ edit locks (STATE_BACKEND)
+        self.state_backend = create_backend()
+        attach_backend(self.state_backend)
+
+        # Index FAQ and past answers for duplicate question detection
+        await similarity_service.load()
+
         print("🤖 Creating Telegram application...", flush=True)
-        # Create application with extended timeouts for network stability
-        self.application = (
+        # Create application with extended timeouts for network stability;
+        # Bot API calls go through a request class that records their latency
+        builder = (
             Application.builder()
             .token(Config.BOT_TOKEN)
-            .connect_timeout(30.0)      # таймаут подключения
-            .read_timeout(60.0)         # таймаут чтения (long polling)
-            .write_timeout(30.0)        # таймаут записи
-            .pool_timeout(30.0)         # таймаут пула соединений
-            .build()
+            # Handlers read the user's role from the context, resolved once per update
+            .context_types(ContextTypes(context=RoleContext))
+            .request(TimedHTTPXRequest(
+                connection_pool_size=256,
+                connect_timeout=30.0,   # таймаут подключения
+                read_timeout=60.0,      # таймаут чтения
+                write_timeout=30.0,     # таймаут записи
+                pool_timeout=30.0,      # таймаут пула соединений
+            ))
         )
+        if Config.CONCURRENT_UPDATES > 0:
+            # Different users in parallel, each user's updates in order
+            builder = builder.concurrent_updates(PerUserUpdateProcessor(Config.CONCURRENT_UPDATES))
+        if Config.use_webhook():
+            # Updates come from the HTTP API server, no getUpdates loop
+            builder = builder.updater(None)
+        else:
+            # Long polling has its own connection; without it getUpdates uses PTB's short defaults
+            builder = builder.get_updates_request(TimedHTTPXRequest(
+                connection_pool_size=1,
+                connect_timeout=30.0,
+                read_timeout=60.0,      # таймаут чтения (long polling)
+                write_timeout=30.0,
+                pool_timeout=30.0,
+            ))
+        self.application = builder.build()
         print("✅ Application created!", flush=True)
 
-        # Set bot instance for website form handler
-        website_form_handler.set_bot(self.application.bot)
+        # Start background saving of bot users and sending of outbox messages
+        bot_user_service.start()
+        outbox_service.start(self.application.bot)
+
+        # Reload admin/owner IDs on SIGHUP or when the roles file changes
+        self._setup_roles_reload()
+
+        # Drop expired conversation states and FAQ edit locks
+        if Config.STATE_PURGE_INTERVAL > 0:
+            self.state_purger = asyncio.create_task(purge_expired_loop(Config.STATE_PURGE_INTERVAL))
 
         # Initialize reminder service
         print("📅 Initializing reminder service...", flush=True)
-        self.reminder_service = ReminderService(self.application.bot)
+        self.reminder_service = ReminderService()
         self.reminder_service.start()
         print("✅ Reminder service initialized!", flush=True)
 
+        # Send new guest questions to the bride in digests
+        question_digest_service.start()
+
         print("📝 Registering handlers...", flush=True)
         # Register handlers
         self._register_handlers()
@@ -72,93 +127,143 @@ class WeddingBot:
 
         print("✅ Bot initialized successfully!", flush=True)
 
+    def _setup_roles_reload(self):
+        """Watch for role changes without a restart"""
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGHUP"):
+            loop.add_signal_handler(signal.SIGHUP, roles.reload)
+        if Config.ROLES_RELOAD_INTERVAL > 0:
+            self.roles_watcher = loop.create_task(roles.watch(Config.ROLES_RELOAD_INTERVAL))
+
     def _register_handlers(self):
         """Register all command and message handlers"""
 
         # Command handlers
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("guests", admin_handler.guests_command))
-        self.application.add_handler(CommandHandler("stats", admin_handler.stats_command))
-        self.application.add_handler(CommandHandler("test_reminder", self.test_reminder_command))
+        self.application.add_handler(CommandHandler("start", timed_handler(self.start_command)))
+        self.application.add_handler(CommandHandler("help", timed_handler(self.help_command)))
+        self.application.add_handler(CommandHandler("guests", timed_handler(admin_handler.guests_command)))
+        self.application.add_handler(CommandHandler("stats", timed_handler(admin_handler.stats_command)))
+        self.application.add_handler(CommandHandler("test_reminder", timed_handler(self.test_reminder_command)))
+        self.application.add_handler(CommandHandler("reminders", timed_handler(admin_handler.reminders_command)))
+        self.application.add_handler(CommandHandler("export", timed_handler(admin_handler.export_command)))
+        self.application.add_handler(CommandHandler("inbox", timed_handler(inbox_handler.inbox_command)))
 
         # Callback query handlers
         self.application.add_handler(CallbackQueryHandler(
-            callback_query_handler.answer_button_handler,
+            timed_handler(callback_query_handler.answer_button_handler),
             pattern="^answer_"
         ))
 
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(question_handler.duplicate_answer_callback),
+            pattern="^dupq_(ok|send)$"
+        ))
+
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(admin_handler.guests_page_callback),
+            pattern="^guests_(next|prev)_"
+        ))
+
+        # Question inbox and answering sessions
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.inbox_page_callback),
+            pattern=r"^inbox_(next|prev)_\d+$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.answer_callback),
+            pattern=r"^inbox_answer_\d+$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.inbox_open_callback),
+            pattern="^inbox_open$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.session_callback),
+            pattern="^inbox_session$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.skip_callback),
+            pattern="^inbox_skip$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler(inbox_handler.stop_callback),
+            pattern="^inbox_stop$"
+        ))
+
         # FAQ callback handlers
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_list_callback,
+            timed_handler(admin_faq_handler.faq_list_callback),
             pattern="^faq_list$"
         ))
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_add_callback,
+            timed_handler(admin_faq_handler.faq_add_callback),
             pattern="^faq_add$"
         ))
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_edit_callback,
+            timed_handler(admin_faq_handler.faq_edit_callback),
             pattern="^faq_edit_"
         ))
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_delete_callback,
+            timed_handler(admin_faq_handler.faq_delete_callback),
             pattern="^faq_delete_"
         ))
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_back_callback,
+            timed_handler(admin_faq_handler.faq_back_callback),
             pattern="^faq_back$"
         ))
         self.application.add_handler(CallbackQueryHandler(
-            admin_faq_handler.faq_exit_callback,
+            timed_handler(admin_faq_handler.faq_exit_callback),
             pattern="^faq_exit$"
         ))
 
+        # Inline FAQ search: @bot <question>
+        self.application.add_handler(InlineQueryHandler(timed_handler(faq_search_handler.inline_query_handler)))
+
+        # Text routing: website form data, menu buttons, conversation steps
+        self._register_routes()
+
         # Message handlers for receiving questions, answers and website form data
         self.application.add_handler(MessageHandler(
             filters.TEXT & ~filters.COMMAND,
-            self.handle_text_message
+            timed_handler(self.handle_text_message)
         ))
 
-    async def _save_bot_user(self, user):
-        """Save or update bot user in database"""
-        async with db.get_session() as session:
-            from sqlalchemy import select
-            result = await session.execute(
-                select(BotUser).where(BotUser.user_id == user.id)
-            )
-            bot_user = result.scalar_one_or_none()
-
-            if bot_user:
-                # Update existing user
-                bot_user.username = user.username
-                bot_user.first_name = user.first_name
-                bot_user.last_name = user.last_name
-                bot_user.last_interaction = datetime.utcnow()
-            else:
-                # Create new user
-                bot_user = BotUser(
-                    user_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name,
-                    last_name=user.last_name,
-                    subscribed_to_reminders=True  # Default to subscribed
-                )
-                session.add(bot_user)
-
-            await session.commit()
+    def _register_routes(self):
+        """Build the text message dispatch table"""
+        router = message_router
+
+        router.add_role(ROLE_WEBSITE, website_form_handler.handle_website_message)
+
+        # Menu buttons
+        router.add_button(Config.GUEST_QUESTION_BUTTON_TEXT, question_handler.question_button_handler)
+        router.add_button(Config.FAQ_BUTTON_TEXT, self.faq_handler)
+        router.add_button(Config.ADMIN_GUESTS_BUTTON_TEXT, admin_handler.guests_command, roles=(ROLE_ADMIN,))
+        router.add_button(Config.ADMIN_STATS_BUTTON_TEXT, admin_handler.stats_command, roles=(ROLE_ADMIN,))
+        router.add_button(Config.ADMIN_EDIT_FAQ_BUTTON_TEXT, admin_faq_handler.faq_edit_button_handler, roles=(ROLE_ADMIN,))
+
+        # Conversation steps
+        router.add_state(conversation.GUEST_QUESTION, question_handler.receive_question_text)
+        # No route for DUPLICATE_OFFERED: text after a stored answer was offered
+        # goes to the fallback, only the "send anyway" button escalates it
+        router.add_state(conversation.FAQ_ADD_QUESTION, admin_faq_handler.faq_add_receive_question)
+        router.add_state(conversation.FAQ_ADD_ANSWER, admin_faq_handler.faq_add_receive_answer)
+        router.add_state(conversation.FAQ_EDIT_QUESTION, admin_faq_handler.faq_edit_receive_question)
+        router.add_state(conversation.FAQ_EDIT_ANSWER, admin_faq_handler.faq_edit_receive_answer)
+        router.add_state(conversation.BRIDE_ANSWER, callback_query_handler.receive_answer_text)
+
+        # Unrecognised text: answer from FAQ search, or point to the menu
+        router.set_fallback(faq_search_handler.free_text_handler)
 
     async def start_command(self, update, context):
         """Handle /start command"""
         print(f"🔔 Received /start from {update.effective_user.id}", flush=True)
         user = update.effective_user
-        user_id = user.id
 
-        # Save or update bot user
-        await self._save_bot_user(user)
+        # Save or update bot user (written in the background)
+        bot_user_service.touch(user)
 
         # Check if user is admin
-        is_admin = Config.is_admin(user_id)
+        is_admin = context.is_admin
 
         if is_admin:
             welcome_message = f"""👋 <b>Добро пожаловать, {user.first_name}!</b>
@@ -195,8 +300,7 @@ class WeddingBot:
 
     async def help_command(self, update, context):
         """Handle /help command"""
-        user_id = update.effective_user.id
-        is_admin = Config.is_admin(user_id)
+        is_admin = context.is_admin
 
         if is_admin:
             help_text = """<b>📖 Справка (Админ)</b>
@@ -210,6 +314,9 @@ class WeddingBot:
 <b>Команды (все также работают):</b>
 • /guests - Список гостей
 • /stats - Статистика
+• /reminders - Статус рассылки напоминаний
+• /export [csv|xlsx] - Выгрузить список гостей файлом
+• /inbox - Вопросы гостей без ответа
 
 Используйте кнопки для быстрого доступа! 👇
 """
@@ -220,6 +327,7 @@ class WeddingBot:
 <b>Для гостей:</b>
 • Нажмите кнопку "Задать вопрос" чтобы задать вопрос
 • Нажмите кнопку "Частые вопросы" для просмотра FAQ
+• Или просто напишите вопрос — бот поищет ответ в FAQ
 
 Если у вас есть вопросы, просто нажмите кнопку ниже! 👇
 """
@@ -233,10 +341,8 @@ class WeddingBot:
 
     async def test_reminder_command(self, update, context):
         """Test sending reminders to all subscribed bot users"""
-        user_id = update.effective_user.id
-
         # Only admins can test reminders
-        if not Config.is_admin(user_id):
+        if not context.is_admin:
             await update.message.reply_text("❌ Эта команда доступна только администраторам.")
             return
 
@@ -244,139 +350,38 @@ class WeddingBot:
             await update.message.reply_text("❌ Сервис напоминаний не инициализирован.")
             return
 
-        await update.message.reply_text("📅 Отправка тестовых уведомлений всем пользователям...")
-
         # Send test reminders to all subscribed users
-        from datetime import date
+        from services.reminder_service import days_until_wedding
 
         message = f"""📅 **Тестовое напоминание**
 
 Это тестовое сообщение для проверки системы напоминаний.
 
-💍 До свадьбы осталось **{(Config.WEDDING_DATE - date.today()).days} дней**!
+💍 До свадьбы осталось **{days_until_wedding()} дней**!
 
 📆 **Дата:** {Config.WEDDING_DATE.strftime('%d.%m.%Y')}
 🕐 **Время:** {Config.WEDDING_TIME}
 """
 
-        async with db.get_session() as session:
-            from sqlalchemy import select
-            result = await session.execute(
-                select(BotUser).where(
-                    BotUser.subscribed_to_reminders == True,
-                    BotUser.is_active == True
-                )
-            )
-            users = result.scalars().all()
-
-        sent_count = 0
-        failed_count = 0
-
-        for user in users:
-            try:
-                await self.application.bot.send_message(
-                    chat_id=user.user_id,
-                    text=message,
-                    parse_mode="Markdown"
-                )
-                sent_count += 1
-                print(f"✅ Test reminder sent to {user.first_name or user.username or user.user_id}")
-            except Exception as e:
-                failed_count += 1
-                print(f"❌ Failed to send test reminder to {user.user_id}: {e}")
+        recipients = await self.reminder_service.broadcast(message)
 
         await update.message.reply_text(
-            f"✅ Рассылка завершена!\n\n"
-            f"📊 Отправлено: {sent_count}\n"
-            f"❌ Ошибок: {failed_count}\n"
-            f"👥 Всего пользователей: {len(users)}"
+            f"✅ Тестовое напоминание поставлено в очередь!\n\n"
+            f"👥 Получателей: {recipients}"
         )
 
     async def handle_text_message(self, update, context):
         """Handle text messages"""
-        user_id = update.effective_user.id
-        message_text = update.message.text
-
-        # Check if message is from website
-        if Config.is_website_sender(user_id):
-            await website_form_handler.handle_website_message(update, context)
-            return
-
-        # Check if user pressed "Задать вопрос" button
-        if message_text == Config.GUEST_QUESTION_BUTTON_TEXT:
-            await question_handler.question_button_handler(update, context)
-            return
-
-        # Check if user pressed "Частые вопросы" button
-        if message_text == Config.FAQ_BUTTON_TEXT:
-            await self.faq_handler(update, context)
-            return
-
-        # Admin buttons
-        if Config.is_admin(user_id):
-            if message_text == Config.ADMIN_GUESTS_BUTTON_TEXT:
-                await admin_handler.guests_command(update, context)
-                return
-            if message_text == Config.ADMIN_STATS_BUTTON_TEXT:
-                await admin_handler.stats_command(update, context)
-                return
-            if message_text == Config.ADMIN_EDIT_FAQ_BUTTON_TEXT:
-                await admin_faq_handler.faq_edit_button_handler(update, context)
-                return
-
-        # Check if admin is adding FAQ
-        if user_id in admin_faq_handler.adding_faq:
-            handled = await admin_faq_handler.faq_add_receive_question(update, context)
-            if handled:
-                return
-            handled = await admin_faq_handler.faq_add_receive_answer(update, context)
-            if handled:
-                return
-
-        # Check if admin is editing FAQ
-        if user_id in admin_faq_handler.editing_faq:
-            handled = await admin_faq_handler.faq_edit_receive_question(update, context)
-            if handled:
-                return
-            handled = await admin_faq_handler.faq_edit_receive_answer(update, context)
-            if handled:
-                return
-
-        # Check if user is sending a question
-        if user_id in question_handler.user_questions:
-            await question_handler.receive_question_text(update, context)
-            return
-
-        # Check if user (bride) is sending an answer
-        if user_id in callback_query_handler.pending_answers:
-            await callback_query_handler.receive_answer_text(update, context)
-            return
-
-        # Otherwise, send help message
-        keyboard = get_admin_menu_keyboard() if Config.is_admin(user_id) else get_main_menu_keyboard()
-        await update.message.reply_text(
-            "Пожалуйста, используйте кнопки меню для взаимодействия с ботом.",
-            reply_markup=keyboard
-        )
+        await message_router.dispatch(update, context)
 
     async def faq_handler(self, update, context):
         """Handle FAQ button click"""
         from services.faq_service import faq_service
 
-        user_id = update.effective_user.id
-        is_admin = Config.is_admin(user_id)
+        is_admin = context.is_admin
         keyboard = get_admin_menu_keyboard() if is_admin else get_main_menu_keyboard()
 
-        faqs = await faq_service.get_all_faqs()
-
-        if not faqs:
-            faq_message = "📚 <b>Частые вопросы</b>\n\nПока нет вопросов."
-        else:
-            lines = ["📚 <b>Частые вопросы</b>\n"]
-            for faq in faqs:
-                lines.append(f"\n❓ <b>{faq.question}</b>")
-                lines.append(f"💬 {faq.answer}")
-            faq_message = "\n".join(lines)
+        faq_message = await faq_service.get_faq_message()
 
         await update.message.reply_text(
             faq_message,
@@ -390,8 +395,16 @@ class WeddingBot:
 
         # Setup HTTP server first
         from api.server import create_http_server, setup_http_server
-        self.http_runner = create_http_server(self.application.bot)
-        await setup_http_server(self.http_runner)
+        # With API_MODE=standalone the website API runs in api_main.py
+        standalone_api = Config.API_MODE == "standalone"
+        self.http_runner = create_http_server(
+            application=self.application if Config.use_webhook() else None,
+            serve_api=not standalone_api
+        )
+        await setup_http_server(
+            self.http_runner,
+            port=Config.BOT_HTTP_PORT if standalone_api else Config.API_PORT
+        )
 
         print("🌐 HTTP API server started!")
 
@@ -399,14 +412,28 @@ class WeddingBot:
         await self.application.initialize()
         await self.application.start()
 
-        print("🚀 Starting polling...")
+        if Config.use_webhook():
+            print("🚀 Setting webhook...")
 
-        # Start polling
-        await self.application.updater.start_polling(
-            drop_pending_updates=True
-        )
+            # Updates are POSTed to Config.WEBHOOK_PATH on the HTTP API server
+            await self.application.bot.set_webhook(
+                url=Config.WEBHOOK_URL,
+                secret_token=Config.WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+                drop_pending_updates=True
+            )
+
+            print(f"✅ Webhook is set: {Config.WEBHOOK_URL}")
+        else:
+            print("🚀 Starting polling...")
 
-        print("✅ Polling is running!")
+            # Start polling (removes a webhook left from webhook mode)
+            await self.application.updater.start_polling(
+                drop_pending_updates=True
+            )
+
+            print("✅ Polling is running!")
 
         # Keep bot running
         try:
@@ -434,16 +461,37 @@ class WeddingBot:
         if self.reminder_service:
             self.reminder_service.stop()
 
+        if self.roles_watcher:
+            self.roles_watcher.cancel()
+
+        if self.state_purger:
+            self.state_purger.cancel()
+
+        await question_digest_service.stop()
+
         # Cleanup HTTP server
         if self.http_runner:
             await self.http_runner.cleanup()
 
+        # Finish the outbox batch in progress, the rest is sent after restart
+        await outbox_service.stop(timeout=Config.NOTIFICATION_DRAIN_TIMEOUT)
+
+        # Save buffered bot users
+        await bot_user_service.stop()
+
         # Cleanup Telegram bot
         if self.application:
-            await self.application.updater.stop()
+            # No updater in webhook mode; polling may not have started
+            if self.application.updater and self.application.updater.running:
+                await self.application.updater.stop()
             await self.application.stop()
             await self.application.shutdown()
 
+        # Close database connections
+        await db.close()
+        if self.state_backend:
+            self.state_backend.close()
+
         print("✅ Shutdown complete!")
 
 
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+from config import Config
+from database.database import db
+from database.models import BotUser
+
+
+class BotUserService:
+    """Service for bot user operations
+
+    Profile and last_interaction updates are buffered in memory and written
+    in one bulk upsert every flush_interval seconds and on shutdown, so
+    handlers never wait on a database write.
+    """
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, dict] = {}  # {user_id: row values}, latest update wins
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def touch(self, user):
+        """Record that a Telegram user interacted with the bot"""
+        self._pending[user.id] = {
+            "user_id": user.id,
+            "username": user.username,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "last_interaction": datetime.utcnow()
+        }
+
+    async def flush(self) -> int:
+        """
+        Write buffered updates to the database
+
+        Returns:
+            Number of users written
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            batch, self._pending = self._pending, {}
+
+            rows = [
+                {
+                    **values,
+                    # Only used when the user is inserted for the first time
+                    "is_active": True,
+                    "subscribed_to_reminders": True,  # Default to subscribed
+                    "created_at": values["last_interaction"]
+                }
+                for values in batch.values()
+            ]
+
+            statement = db.insert(BotUser)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={
+                    "username": statement.excluded.username,
+                    "first_name": statement.excluded.first_name,
+                    "last_name": statement.excluded.last_name,
+                    "last_interaction": statement.excluded.last_interaction
+                }
+            )
+
+            try:
+                async with db.get_session() as session:
+                    await session.execute(statement, rows)
+            except Exception:
+                # Put the batch back unless newer updates arrived meanwhile
+                for user_id, values in batch.items():
+                    self._pending.setdefault(user_id, values)
+                raise
+
+            return len(rows)
+
+    async def _flush_loop(self):
+        """Flush buffered updates periodically"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Failed to save bot users: {e}")
+
+    def start(self):
+        """Start periodic flushing"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop periodic flushing and write what is left"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+
+bot_user_service = BotUserService(flush_interval=Config.BOT_USER_FLUSH_INTERVAL)
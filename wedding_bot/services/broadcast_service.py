@@ -0,0 +1,196 @@
+"""Rate-limited concurrent delivery of Telegram messages"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from config import Config
+
+
+@dataclass
+class OutgoingMessage:
+    """Message to deliver to a single chat"""
+    chat_id: int
+    text: str
+    parse_mode: Optional[str] = None
+    reply_markup: Optional[Any] = None
+
+
+@dataclass
+class DeliveryResult:
+    """Delivery outcome for a single recipient"""
+    message: OutgoingMessage
+    success: bool
+    attempts: int
+    error: Optional[str] = None
+    permanent: bool = False  # Retrying won't help (blocked bot, bad request)
+
+    @property
+    def chat_id(self) -> int:
+        return self.message.chat_id
+
+
+@dataclass
+class BroadcastReport:
+    """Summary of a broadcast"""
+    results: List[DeliveryResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.results)
+
+    @property
+    def sent_count(self) -> int:
+        return sum(1 for r in self.results if r.success)
+
+    @property
+    def failed_count(self) -> int:
+        return self.total - self.sent_count
+
+
+class TokenBucket:
+    """Token bucket rate limiter shared by all senders of one bot"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for a while (Telegram flood control)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Wait until a token is available"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Telegram limits are per bot, so every BroadcastService shares one bucket
+telegram_rate_limiter = TokenBucket(Config.BROADCAST_RATE)
+
+
+class BroadcastService:
+    """Send messages through a bounded worker pool with rate limiting and retries"""
+
+    def __init__(
+        self,
+        bot: Bot,
+        concurrency: int = Config.BROADCAST_CONCURRENCY,
+        max_retries: int = Config.BROADCAST_MAX_RETRIES,
+        base_delay: float = 1.0,
+        rate_limiter: Optional[TokenBucket] = None
+    ):
+        self.bot = bot
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.rate_limiter = rate_limiter or telegram_rate_limiter
+
+    async def send_all(
+        self,
+        messages: Iterable[OutgoingMessage],
+        on_result: Optional[Callable[[DeliveryResult], Awaitable[None]]] = None
+    ) -> BroadcastReport:
+        """
+        Deliver messages concurrently
+
+        Args:
+            messages: Messages to deliver
+            on_result: Optional coroutine called with each DeliveryResult as soon as it is known
+
+        Returns:
+            BroadcastReport with per-recipient results
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in messages:
+            queue.put_nowait(message)
+
+        report = BroadcastReport()
+        started_at = time.monotonic()
+
+        async def worker():
+            while True:
+                try:
+                    message = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                result = await self._deliver(message)
+                report.results.append(result)
+
+                if on_result:
+                    try:
+                        await on_result(result)
+                    except Exception as e:
+                        print(f"❌ Broadcast result callback failed for {message.chat_id}: {e}")
+
+        workers = min(self.concurrency, queue.qsize())
+        if workers:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+
+        report.duration = time.monotonic() - started_at
+        return report
+
+    async def _deliver(self, message: OutgoingMessage) -> DeliveryResult:
+        """Send one message, retrying flood control and network errors"""
+        attempts = 0
+
+        while True:
+            attempts += 1
+            await self.rate_limiter.acquire()
+
+            try:
+                await self.bot.send_message(
+                    chat_id=message.chat_id,
+                    text=message.text,
+                    parse_mode=message.parse_mode,
+                    reply_markup=message.reply_markup
+                )
+                return DeliveryResult(message, True, attempts)
+
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                # Flood control applies to the whole bot, pause every worker
+                self.rate_limiter.pause(float(retry_after))
+                error = str(e)
+
+            except (Forbidden, BadRequest) as e:
+                # Blocked bot, deleted chat, bad markup - retrying won't help
+                return DeliveryResult(message, False, attempts, str(e), permanent=True)
+
+            except NetworkError as e:
+                error = str(e)
+                if attempts <= self.max_retries:
+                    delay = self.base_delay * (2 ** (attempts - 1))
+                    await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+            except Exception as e:
+                return DeliveryResult(message, False, attempts, str(e))
+
+            if attempts > self.max_retries:
+                return DeliveryResult(message, False, attempts, error)
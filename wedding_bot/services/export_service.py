@@ -0,0 +1,134 @@
+import asyncio
+import csv
+import io
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO
+from zoneinfo import ZoneInfo
+
+from services.guest_service import guest_service
+
+# Exports up to this size stay in memory, larger ones roll over to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+EXPORT_BATCH_SIZE = 500
+
+# Moscow timezone, as in the admin guest list
+MSK_ZONE = ZoneInfo("Europe/Moscow")
+
+EXPORT_COLUMNS = ["ID", "Имя", "Количество", "Статус", "Комментарий", "Дата регистрации (МСК)"]
+
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class ExportError(Exception):
+    """Export format is unknown or unavailable"""
+
+
+@dataclass
+class ExportFile:
+    """Finished export, rewound and ready to be read"""
+    file: BinaryIO
+    filename: str
+    content_type: str
+    rows: int
+
+    def close(self):
+        self.file.close()
+
+
+class ExportService:
+    """Write the guest list to CSV or XLSX without loading it into memory"""
+
+    def __init__(self, batch_size: int = EXPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    async def export_guests(self, fmt: str = "csv") -> ExportFile:
+        """Export all guests; the caller must close() the result"""
+        fmt = fmt.lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ExportError(f"Unknown export format: {fmt}. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            if fmt == "csv":
+                rows = await self._write_csv(spool)
+            else:
+                rows = await self._write_xlsx(spool)
+        except Exception:
+            spool.close()
+            raise
+
+        spool.seek(0)
+        filename = f"guests_{datetime.now().strftime('%Y%m%d_%H%M')}.{fmt}"
+        return ExportFile(spool, filename, EXPORT_FORMATS[fmt], rows)
+
+    async def _write_csv(self, spool: BinaryIO) -> int:
+        # utf-8-sig so Excel opens Cyrillic text correctly
+        text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+
+        rows = 0
+        async for batch in guest_service.stream_guest_batches(self.batch_size):
+            writer.writerows(self._format_row(row) for row in batch)
+            rows += len(batch)
+
+        # Keep the spool open when the wrapper is garbage collected
+        text.flush()
+        text.detach()
+        return rows
+
+    async def _write_xlsx(self, spool: BinaryIO) -> int:
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ExportError("XLSX export requires openpyxl")
+
+        # Write-only mode streams rows to a temporary file instead of keeping cells
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Гости")
+        sheet.append(EXPORT_COLUMNS)
+
+        def append_rows(batch):
+            for row in batch:
+                sheet.append(self._format_row(row))
+
+        # openpyxl is slow per row; keep it off the event loop
+        rows = 0
+        async for batch in guest_service.stream_guest_batches(self.batch_size):
+            await asyncio.to_thread(append_rows, batch)
+            rows += len(batch)
+
+        await asyncio.to_thread(workbook.save, spool)
+        return rows
+
+    def _format_row(self, row: tuple) -> list:
+        guest_id, name, guest_count, status, comment, created_at = row
+        if created_at:
+            created_at_msk = created_at.replace(tzinfo=timezone.utc).astimezone(MSK_ZONE)
+            created_at = created_at_msk.strftime("%Y-%m-%d %H:%M")
+        return [
+            guest_id,
+            _escape_formula(name),
+            guest_count,
+            status,
+            _escape_formula(comment or ""),
+            created_at or ""
+        ]
+
+
+def _escape_formula(value: str) -> str:
+    """Keep text from the public form from being run as a formula (CSV/formula injection)"""
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+export_service = ExportService()
@@ -1,19 +1,187 @@
-from typing import List, Optional
-from sqlalchemy import select, delete
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from sqlalchemy import select, delete, func, text
+from config import Config
 from database.database import db
 from database.models import FAQ
+from services.similarity_service import similarity_service
+from utils.metrics import registry, CallbackMetric
+from utils.text import stem_text, stem_words
+
+# bm25 weights: a match in the question counts twice as much as in the answer
+FTS_QUESTION_WEIGHT = 2.0
+FTS_ANSWER_WEIGHT = 1.0
 
 
 class FAQService:
     """Service for FAQ operations"""
 
+    def __init__(self, cache_ttl: float = 0):
+        # Cached (faqs, rendered message, loaded_at), replaced as a whole
+        self.cache_ttl = cache_ttl
+        self._cache: Optional[Tuple[Tuple[FAQ, ...], str, float]] = None
+        self._generation = 0  # Bumped on every write, stale loads are discarded
+        self._load_lock = asyncio.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._fts_enabled: Optional[bool] = None  # Detected on first use
+
+    def _get_fresh_cache(self):
+        """Get cached snapshot if it has not expired"""
+        cache = self._cache
+        if cache is None:
+            return None
+        if self.cache_ttl and time.monotonic() - cache[2] > self.cache_ttl:
+            return None
+        return cache
+
+    async def _get_snapshot(self) -> Tuple[Tuple[FAQ, ...], str, float]:
+        """Get ordered FAQ snapshot with pre-rendered message, loading it on a miss"""
+        cache = self._get_fresh_cache()
+        if cache is not None:
+            self.cache_hits += 1
+            return cache
+
+        async with self._load_lock:
+            # Another request may have loaded it while we waited
+            cache = self._get_fresh_cache()
+            if cache is not None:
+                self.cache_hits += 1
+                return cache
+
+            self.cache_misses += 1
+            generation = self._generation
+
+            async with db.get_session() as session:
+                result = await session.execute(
+                    select(FAQ).order_by(FAQ.order.asc())
+                )
+                faqs = tuple(result.scalars().all())
+
+            cache = (faqs, self._render_faq_message(faqs), time.monotonic())
+
+            # Don't store a snapshot that a concurrent write has already invalidated
+            if generation == self._generation:
+                self._cache = cache
+
+            return cache
+
+    def invalidate_cache(self):
+        """Drop cached FAQ snapshot"""
+        self._generation += 1
+        self._cache = None
+
+    def get_cache_stats(self) -> dict:
+        """Get FAQ cache counters"""
+        cache = self._cache
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "cached_items": len(cache[0]) if cache else 0,
+            "age_seconds": time.monotonic() - cache[2] if cache else None
+        }
+
+    @staticmethod
+    def _render_faq_message(faqs) -> str:
+        """Render FAQ message for guests"""
+        if not faqs:
+            return "📚 <b>Частые вопросы</b>\n\nПока нет вопросов."
+
+        lines = ["📚 <b>Частые вопросы</b>\n"]
+        for faq in faqs:
+            lines.append(f"\n❓ <b>{faq.question}</b>")
+            lines.append(f"💬 {faq.answer}")
+        return "\n".join(lines)
+
     async def get_all_faqs(self) -> List[FAQ]:
         """Get all FAQ items ordered by order field"""
+        faqs, _, _ = await self._get_snapshot()
+        return list(faqs)
+
+    async def get_faq_message(self) -> str:
+        """Get pre-rendered FAQ message"""
+        _, message, _ = await self._get_snapshot()
+        return message
+
+    async def search(self, query: str, limit: int = 5) -> List[FAQ]:
+        """Find FAQ items matching free text, best matches first"""
+        stems = list(dict.fromkeys(stem_words(query)))
+        # Skip short words ("ли", "с") unless nothing else is left
+        stems = [s for s in stems if len(s) > 2] or stems
+        if not stems or limit <= 0:
+            return []
+
+        faqs, _, _ = await self._get_snapshot()
+        by_id = {faq.id: faq for faq in faqs}
+
         async with db.get_session() as session:
-            result = await session.execute(
-                select(FAQ).order_by(FAQ.order.asc())
-            )
-            return result.scalars().all()
+            if await self._has_search_index(session):
+                # Prefix terms: stems are \w+ only, so quoting is safe
+                match = " OR ".join(f'"{s}"*' for s in stems)
+                result = await session.execute(
+                    text(
+                        "SELECT rowid FROM faq_fts WHERE faq_fts MATCH :match "
+                        "ORDER BY bm25(faq_fts, :question_weight, :answer_weight) LIMIT :limit"
+                    ),
+                    {
+                        "match": match,
+                        "question_weight": FTS_QUESTION_WEIGHT,
+                        "answer_weight": FTS_ANSWER_WEIGHT,
+                        "limit": limit
+                    }
+                )
+                ids = result.scalars().all()
+            else:
+                ids = self._search_snapshot(stems, faqs, limit)
+
+        # The index may briefly be ahead of the cached snapshot
+        return [by_id[faq_id] for faq_id in ids if faq_id in by_id]
+
+    @staticmethod
+    def _search_snapshot(stems: List[str], faqs, limit: int) -> List[int]:
+        """Python fallback for databases without FTS5: weighted prefix matches"""
+        scored = []
+        for faq in faqs:
+            question_words = stem_words(faq.question)
+            answer_words = stem_words(faq.answer)
+            score = 0.0
+            for s in stems:
+                if any(word.startswith(s) for word in question_words):
+                    score += FTS_QUESTION_WEIGHT
+                if any(word.startswith(s) for word in answer_words):
+                    score += FTS_ANSWER_WEIGHT
+            if score:
+                scored.append((-score, faq.order, faq.id))
+        scored.sort()
+        return [faq_id for _, _, faq_id in scored[:limit]]
+
+    async def _has_search_index(self, session) -> bool:
+        """Check once whether the FTS5 index exists"""
+        if self._fts_enabled is None:
+            if db.engine.dialect.name != "sqlite":
+                self._fts_enabled = False
+            else:
+                result = await session.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'faq_fts'"
+                ))
+                self._fts_enabled = result.scalar() is not None
+        return self._fts_enabled
+
+    async def _index_faq(self, session, faq: FAQ):
+        """Write FAQ into the search index in the caller's transaction"""
+        if not await self._has_search_index(session):
+            return
+        await session.execute(text("DELETE FROM faq_fts WHERE rowid = :id"), {"id": faq.id})
+        await session.execute(
+            text("INSERT INTO faq_fts (rowid, question, answer) VALUES (:id, :question, :answer)"),
+            {"id": faq.id, "question": stem_text(faq.question), "answer": stem_text(faq.answer)}
+        )
+
+    async def _unindex_faq(self, session, faq_id: int):
+        """Remove FAQ from the search index in the caller's transaction"""
+        if await self._has_search_index(session):
+            await session.execute(text("DELETE FROM faq_fts WHERE rowid = :id"), {"id": faq_id})
 
     async def get_faq_by_id(self, faq_id: int) -> Optional[FAQ]:
         """Get FAQ by ID"""
@@ -30,16 +198,21 @@ class FAQService:
         order: int
     ) -> FAQ:
         """Create a new FAQ item"""
-        async with db.get_session() as session:
-            faq = FAQ(
-                question=question,
-                answer=answer,
-                order=order
-            )
-            session.add(faq)
-            await session.flush()
-            await session.refresh(faq)
-            return faq
+        try:
+            async with db.get_session() as session:
+                faq = FAQ(
+                    question=question,
+                    answer=answer,
+                    order=order
+                )
+                session.add(faq)
+                await session.flush()
+                await session.refresh(faq)
+                await self._index_faq(session, faq)
+        finally:
+            self.invalidate_cache()
+        similarity_service.faq_changed(faq.id, faq.question, faq.answer)
+        return faq
 
     async def update_faq(
         self,
@@ -48,44 +221,54 @@ class FAQService:
         answer: str
     ) -> Optional[FAQ]:
         """Update an FAQ item"""
-        async with db.get_session() as session:
-            result = await session.execute(
-                select(FAQ).where(FAQ.id == faq_id)
-            )
-            faq = result.scalar_one_or_none()
-
-            if faq:
-                faq.question = question
-                faq.answer = answer
-                await session.flush()
-                await session.refresh(faq)
+        try:
+            async with db.get_session() as session:
+                result = await session.execute(
+                    select(FAQ).where(FAQ.id == faq_id)
+                )
+                faq = result.scalar_one_or_none()
 
-            return faq
+                if faq:
+                    faq.question = question
+                    faq.answer = answer
+                    await session.flush()
+                    await session.refresh(faq)
+                    await self._index_faq(session, faq)
+        finally:
+            self.invalidate_cache()
+        if faq:
+            similarity_service.faq_changed(faq.id, faq.question, faq.answer)
+        return faq
 
     async def delete_faq(self, faq_id: int) -> bool:
         """Delete an FAQ item"""
-        async with db.get_session() as session:
-            result = await session.execute(
-                select(FAQ).where(FAQ.id == faq_id)
-            )
-            faq = result.scalar_one_or_none()
-
-            if faq:
-                await session.execute(
+        try:
+            async with db.get_session() as session:
+                result = await session.execute(
                     delete(FAQ).where(FAQ.id == faq_id)
                 )
-                return True
-
-            return False
+                deleted = result.rowcount > 0
+                await self._unindex_faq(session, faq_id)
+        finally:
+            self.invalidate_cache()
+        similarity_service.faq_changed(faq_id)
+        return deleted
 
     async def get_next_order(self) -> int:
         """Get the next order number"""
         async with db.get_session() as session:
             result = await session.execute(
-                select(FAQ).order_by(FAQ.order.desc()).limit(1)
+                select(func.max(FAQ.order))
             )
-            faq = result.scalar_one_or_none()
-            return (faq.order + 1) if faq else 0
+            max_order = result.scalar()
+            return (max_order + 1) if max_order is not None else 0
+
 
+faq_service = FAQService(cache_ttl=Config.FAQ_CACHE_TTL)
 
-faq_service = FAQService()
+registry.register(CallbackMetric(
+    "faq_cache_hits_total", "FAQ cache hits", "counter", lambda: faq_service.cache_hits
+))
+registry.register(CallbackMetric(
+    "faq_cache_misses_total", "FAQ cache misses", "counter", lambda: faq_service.cache_misses
+))
@@ -1,7 +1,21 @@
-from typing import List, Optional
-from sqlalchemy import select
+from dataclasses import dataclass, field
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, and_, or_
 from database.database import db
 from database.models import Guest
+from services.notification_service import notification_service
+from services.outbox_service import outbox_service
+
+
+@dataclass
+class GuestStats:
+    """Aggregated guest statistics computed in the database"""
+    total_registrations: int = 0
+    total_guests: int = 0
+    registrations_by_status: Dict[str, int] = field(default_factory=dict)
+    guests_by_status: Dict[str, int] = field(default_factory=dict)
+    registrations_by_day: Dict[date, int] = field(default_factory=dict)
 
 
 class GuestService:
@@ -14,7 +28,7 @@ class GuestService:
         confirmation_status: str,
         comment: Optional[str] = None
     ) -> Guest:
-        """Create a new guest"""
+        """Create a new guest and queue the owner notification in the same transaction"""
         async with db.get_session() as session:
             guest = Guest(
                 name=name,
@@ -25,7 +39,42 @@ class GuestService:
             session.add(guest)
             await session.flush()
             await session.refresh(guest)
-            return guest
+            notification_service.add_new_guest(session, guest)
+
+        outbox_service.wake()
+        return guest
+
+    async def create_guests(self, guests_data: List[dict]) -> List[Guest]:
+        """
+        Create several guests in a single transaction, with one owner notification
+
+        Args:
+            guests_data: Dicts with name, guest_count, confirmation_status and comment
+
+        Returns:
+            Created guests in input order
+        """
+        if not guests_data:
+            return []
+
+        async with db.get_session() as session:
+            guests = [
+                Guest(
+                    name=data["name"],
+                    guest_count=data["guest_count"],
+                    confirmation_status=data["confirmation_status"],
+                    comment=data.get("comment")
+                )
+                for data in guests_data
+            ]
+            # Flushed as one multi-row INSERT ... RETURNING
+            session.add_all(guests)
+            await session.flush()
+            # One summary notification instead of one per guest
+            notification_service.add_guest_batch(session, guests)
+
+        outbox_service.wake()
+        return guests
 
     async def get_all_guests(self) -> List[Guest]:
         """Get all guests"""
@@ -33,6 +82,85 @@ class GuestService:
             result = await session.execute(select(Guest).order_by(Guest.created_at.desc()))
             return result.scalars().all()
 
+    async def stream_guest_batches(self, batch_size: int = 500) -> AsyncIterator[List[tuple]]:
+        """Yield guests oldest first in batches of plain row tuples
+
+        Rows come from a server-side cursor (yield_per) and are not added to
+        the session identity map, so memory stays flat.
+        """
+        stmt = (
+            select(
+                Guest.id,
+                Guest.name,
+                Guest.guest_count,
+                Guest.confirmation_status,
+                Guest.comment,
+                Guest.created_at
+            )
+            .order_by(Guest.created_at, Guest.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async with db.get_session() as session:
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+
+    async def get_guests_page(
+        self,
+        cursor_id: Optional[int] = None,
+        direction: str = "next",
+        limit: int = 25
+    ) -> Tuple[List[Guest], bool]:
+        """
+        Get one page of guests using keyset pagination
+
+        Guests are ordered newest first by (created_at, id). The cursor is the
+        id of the boundary guest: "next" returns older guests after it, "prev"
+        returns newer guests before it.
+
+        Args:
+            cursor_id: Boundary guest id, None for the first page
+            direction: "next" or "prev"
+            limit: Maximum number of guests to return
+
+        Returns:
+            Tuple of (guests in display order, whether more guests exist in that direction)
+        """
+        query = select(Guest)
+
+        if cursor_id is not None:
+            cursor_created_at = (
+                select(Guest.created_at).where(Guest.id == cursor_id).scalar_subquery()
+            )
+            if direction == "prev":
+                query = query.where(or_(
+                    Guest.created_at > cursor_created_at,
+                    and_(Guest.created_at == cursor_created_at, Guest.id > cursor_id)
+                ))
+            else:
+                query = query.where(or_(
+                    Guest.created_at < cursor_created_at,
+                    and_(Guest.created_at == cursor_created_at, Guest.id < cursor_id)
+                ))
+
+        if direction == "prev":
+            query = query.order_by(Guest.created_at.asc(), Guest.id.asc())
+        else:
+            query = query.order_by(Guest.created_at.desc(), Guest.id.desc())
+
+        # Fetch one extra row to know whether another page exists
+        async with db.get_session() as session:
+            result = await session.execute(query.limit(limit + 1))
+            guests = list(result.scalars().all())
+
+        has_more = len(guests) > limit
+        guests = guests[:limit]
+
+        if direction == "prev":
+            guests.reverse()
+
+        return guests, has_more
+
     async def get_guest_by_id(self, guest_id: int) -> Optional[Guest]:
         """Get guest by ID"""
         async with db.get_session() as session:
@@ -43,9 +171,55 @@ class GuestService:
         """Get count of confirmed guests"""
         async with db.get_session() as session:
             result = await session.execute(
-                select(Guest).where(Guest.confirmation_status == 'confirmed')
+                select(func.count(Guest.id)).where(Guest.confirmation_status == 'confirmed')
             )
-            return len(result.scalars().all())
+            return result.scalar_one()
+
+    async def get_stats(self, days: int = 7) -> GuestStats:
+        """
+        Get guest statistics aggregated by the database
+
+        Args:
+            days: How many most recent registration days to include (0 to skip)
+
+        Returns:
+            GuestStats with totals, headcount per status and registrations per day
+        """
+        stats = GuestStats()
+
+        async with db.get_session() as session:
+            # Totals per confirmation status
+            result = await session.execute(
+                select(
+                    Guest.confirmation_status,
+                    func.count(Guest.id),
+                    func.coalesce(func.sum(Guest.guest_count), 0)
+                ).group_by(Guest.confirmation_status)
+            )
+            for status, registrations, guests in result.all():
+                stats.registrations_by_status[status] = registrations
+                stats.guests_by_status[status] = guests
+                stats.total_registrations += registrations
+                stats.total_guests += guests
+
+            # Registrations per day (most recent days first)
+            if days > 0:
+                day = func.date(Guest.created_at)
+                result = await session.execute(
+                    select(day, func.count(Guest.id))
+                    .group_by(day)
+                    .order_by(day.desc())
+                    .limit(days)
+                )
+                for registered_on, registrations in result.all():
+                    if registered_on is None:
+                        continue
+                    if isinstance(registered_on, str):
+                        # SQLite returns date() as ISO string
+                        registered_on = date.fromisoformat(registered_on)
+                    stats.registrations_by_day[registered_on] = registrations
+
+        return stats
 
 
 guest_service = GuestService()
@@ -1,47 +1,65 @@
 from datetime import timezone
+from html import escape
+from typing import List
 from zoneinfo import ZoneInfo
 
-from telegram import Bot
 from config import Config
 from database.models import Guest
+from services.outbox_service import outbox_service
 
 # Московский часовой пояс
 MSK_ZONE = ZoneInfo("Europe/Moscow")
 
 
 class NotificationService:
-    """Service for sending notifications"""
+    """Service for owner notifications
 
-    def __init__(self, bot: Bot):
-        self.bot = bot
+    Notifications are added to the outbox in the caller's transaction and
+    sent by the bot process, so the API can run without a bot.
+    """
 
-    async def notify_about_new_guest(self, guest: Guest):
-        """Notify bride and groom about new guest"""
-        message = self._format_guest_message(guest)
+    def add_new_guest(self, session, guest: Guest):
+        """Queue notification about new guest (guest must be flushed)"""
+        outbox_service.add(session, Config.get_owners(), self._format_guest_message(guest), parse_mode="HTML")
 
-        for user_id in Config.get_owners():
-            try:
-                await self.bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                print(f"Failed to notify user {user_id}: {e}")
+    def add_guest_batch(self, session, guests: List[Guest]):
+        """Queue one summary notification about several new guests"""
+        if guests:
+            outbox_service.add(
+                session, Config.get_owners(), self._format_guest_batch_message(guests), parse_mode="HTML"
+            )
 
     def _format_guest_message(self, guest: Guest) -> str:
         """Format guest notification message"""
         message = f"""<b>🎉 Новый гость!</b>
 
-👤 <b>Имя:</b> {guest.name}
+👤 <b>Имя:</b> {escape(guest.name)}
 👥 <b>Количество гостей:</b> {guest.guest_count}
 """
 
         if guest.comment:
-            message += f"💬 <b>Комментарий:</b> {guest.comment}\n"
+            message += f"💬 <b>Комментарий:</b> {escape(guest.comment)}\n"
 
         # Convert to Moscow timezone
         created_at_msk = guest.created_at.replace(tzinfo=timezone.utc).astimezone(MSK_ZONE)
         message += f"🕐 <b>Дата:</b> {created_at_msk.strftime('%d.%m.%Y %H:%M')}"
 
         return message
+
+    def _format_guest_batch_message(self, guests: List[Guest], max_names: int = 30) -> str:
+        """Format summary notification for a batch of guests"""
+        message = f"""<b>🎉 Новые гости: {len(guests)}</b>
+
+👥 <b>Количество гостей:</b> {sum(g.guest_count for g in guests)}
+"""
+
+        for guest in guests[:max_names]:
+            message += f"\n• {escape(guest.name)} ({guest.guest_count})"
+
+        if len(guests) > max_names:
+            message += f"\n… и ещё {len(guests) - max_names}"
+
+        return message
+
+
+notification_service = NotificationService()
@@ -0,0 +1,251 @@
+"""Database outbox for outgoing Telegram messages
+
+Any process (bot or API worker) adds messages to the outbox table inside
+its own transaction; only the bot process sends them. Messages survive a
+restart and API workers need no Telegram connection.
+"""
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, or_, and_
+from telegram import Bot, InlineKeyboardMarkup
+
+from config import Config
+from database.database import db
+from database.models import OutboxMessage
+from services.broadcast_service import BroadcastService, OutgoingMessage, DeliveryResult
+from utils.metrics import registry, Counter
+
+outbox_messages_total = registry.register(Counter(
+    "outbox_messages_total", "Outbox messages processed", ("result",)
+))
+
+# Called with (ref, result) once a message of a kind is sent or finally failed
+DeliveryListener = Callable[[str, DeliveryResult], Awaitable[None]]
+
+
+class OutboxService:
+    """Write messages to the outbox and send them from the bot process
+
+    Delivery is at-least-once: a dispatcher claims a batch for
+    claim_timeout seconds, and a batch left unfinished (crash, restart) is
+    claimed again once the claim expires. Network errors and flood control
+    are retried with exponential backoff until max_attempts; a blocked bot
+    or a bad request fails the message at once.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float,
+        batch_size: int,
+        max_attempts: int = 8,
+        retry_base_delay: float = 5,
+        retry_max_delay: float = 3600,
+        claim_timeout: float = 300
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.claim_timeout = claim_timeout
+        self.broadcast_service: Optional[BroadcastService] = None
+        self._listeners: Dict[str, DeliveryListener] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(
+        self,
+        session,
+        chat_ids: Iterable[int],
+        text: str,
+        parse_mode: Optional[str] = None,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+        kind: Optional[str] = None,
+        ref: Optional[str] = None
+    ):
+        """Add a message for each chat to the caller's session (sent after commit)
+
+        kind/ref pick the listener told about the final outcome, see on_delivered.
+        """
+        markup = reply_markup.to_json() if reply_markup else None
+        session.add_all([
+            OutboxMessage(
+                chat_id=chat_id,
+                text=text,
+                parse_mode=parse_mode,
+                reply_markup=markup,
+                kind=kind,
+                ref=ref,
+                next_attempt_at=datetime.utcnow()
+            )
+            for chat_id in chat_ids
+        ])
+
+    def on_delivered(self, kind: str, listener: DeliveryListener):
+        """Register a listener for the final outcome of messages of a kind"""
+        self._listeners[kind] = listener
+
+    def wake(self):
+        """Send new messages now instead of at the next poll (same process only)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt, with jitter so retries don't arrive together"""
+        delay = min(self.retry_base_delay * 2 ** (attempts - 1), self.retry_max_delay)
+        return delay + random.uniform(0, delay / 10)
+
+    async def claim_batch(self) -> List[OutboxMessage]:
+        """Claim due messages for this dispatcher, oldest first"""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+
+        async with db.get_session() as session:
+            due = (
+                select(OutboxMessage.id)
+                .where(or_(
+                    and_(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now),
+                    # Claimed by a dispatcher that never finished the batch
+                    and_(OutboxMessage.status == "sending", OutboxMessage.claimed_until < now)
+                ))
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+            )
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(due))
+                .values(
+                    status="sending",
+                    claimed_by=token,
+                    claimed_until=now + timedelta(seconds=self.claim_timeout)
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.claimed_by == token, OutboxMessage.status == "sending")
+                .order_by(OutboxMessage.id)
+            )
+            return list(result.scalars().all())
+
+    async def dispatch_pending(self) -> int:
+        """
+        Send one batch of due messages
+
+        Returns:
+            Number of messages processed
+        """
+        rows = await self.claim_batch()
+        if not rows:
+            return 0
+
+        messages = [
+            OutgoingMessage(
+                row.chat_id,
+                row.text,
+                row.parse_mode,
+                InlineKeyboardMarkup.de_json(json.loads(row.reply_markup), None) if row.reply_markup else None
+            )
+            for row in rows
+        ]
+        rows_by_message = {id(message): row for message, row in zip(messages, rows)}
+
+        async def record(delivery: DeliveryResult):
+            await self._record(rows_by_message[id(delivery.message)], delivery)
+
+        await self.broadcast_service.send_all(messages, on_result=record)
+        return len(rows)
+
+    async def _record(self, row: OutboxMessage, delivery: DeliveryResult):
+        """Store the delivery outcome of one message"""
+        attempts = row.attempts + delivery.attempts
+        values = {"attempts": attempts, "claimed_by": None, "claimed_until": None}
+
+        if delivery.success:
+            values.update(status="sent", sent_at=datetime.utcnow(), last_error=None)
+        elif delivery.permanent or attempts >= self.max_attempts:
+            print(f"❌ Failed to send message to {delivery.chat_id} after {attempts} attempts: {delivery.error}")
+            values.update(status="failed", last_error=delivery.error)
+        else:
+            values.update(
+                status="pending",
+                last_error=delivery.error,
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=self.retry_delay(attempts))
+            )
+
+        async with db.get_session() as session:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == row.id, OutboxMessage.claimed_by == row.claimed_by)
+                .values(**values)
+            )
+        outbox_messages_total.inc(result=values["status"])
+
+        listener = self._listeners.get(row.kind)
+        if listener and values["status"] != "pending":
+            try:
+                await listener(row.ref, DeliveryResult(
+                    delivery.message, delivery.success, attempts, delivery.error, delivery.permanent
+                ))
+            except Exception as e:
+                print(f"❌ Outbox listener '{row.kind}' failed: {e}")
+
+    async def _dispatch_loop(self):
+        """Send due messages until stopped"""
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                # Keep going while full batches come back
+                while await self.dispatch_pending() == self.batch_size and not self._stopping:
+                    pass
+            except Exception as e:
+                print(f"❌ Outbox dispatch failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot):
+        """Start sending outbox messages (bot process only)"""
+        if self._task is None:
+            # Retries are scheduled through the table, not inside a batch
+            self.broadcast_service = BroadcastService(bot, max_retries=0)
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Stop sending; a batch in progress may finish within timeout
+
+        Unsent messages are sent after the next start.
+        """
+        if self._task is None:
+            return
+
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self._task = None
+        self._wakeup = None
+
+
+outbox_service = OutboxService(
+    poll_interval=Config.OUTBOX_POLL_INTERVAL,
+    batch_size=Config.OUTBOX_BATCH_SIZE,
+    max_attempts=Config.OUTBOX_MAX_ATTEMPTS,
+    retry_base_delay=Config.OUTBOX_RETRY_BASE_DELAY,
+    retry_max_delay=Config.OUTBOX_RETRY_MAX_DELAY,
+    claim_timeout=Config.OUTBOX_CLAIM_TIMEOUT
+)
@@ -0,0 +1,107 @@
+import asyncio
+from html import escape
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from config import Config
+from database.database import db
+from services.outbox_service import outbox_service
+from services.question_service import question_service
+from utils.keyboards import get_inbox_keyboard
+
+# Московский часовой пояс
+MSK_ZONE = ZoneInfo("Europe/Moscow")
+
+# Questions listed in one digest; the rest stay in /inbox
+DIGEST_MAX_QUESTIONS = 10
+QUESTION_PREVIEW_LIMIT = 300
+
+
+def format_question_entry(question) -> str:
+    """Format a question for the inbox and digests"""
+    username = escape(question.from_username or "гостя")
+    text = question.question_text
+    if len(text) > QUESTION_PREVIEW_LIMIT:
+        text = text[:QUESTION_PREVIEW_LIMIT] + "..."
+
+    entry = f"<b>#{question.id}</b> от @{username}"
+    if question.created_at:
+        created_at = question.created_at.replace(tzinfo=ZoneInfo("UTC")).astimezone(MSK_ZONE)
+        entry += f" ({created_at.strftime('%d.%m %H:%M')})"
+    return entry + f"\n{escape(text)}\n\n"
+
+
+class QuestionDigestService:
+    """Send new guest questions to the bride as one message every interval
+
+    Questions are read from the database (digest_sent_at IS NULL), so
+    nothing is lost if the bot restarts between digests.
+    """
+
+    def __init__(self, interval_minutes: float):
+        self.interval = interval_minutes * 60
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    async def send_digest(self) -> int:
+        """
+        Queue one digest with questions the bride has not seen yet
+
+        The questions are marked in the same transaction as the outbox
+        message, so each question is in exactly one digest.
+
+        Returns:
+            Number of questions included
+        """
+        questions = await question_service.get_undigested_questions(limit=DIGEST_MAX_QUESTIONS)
+        if not questions:
+            return 0
+
+        total = await question_service.count_pending()
+        message = f"<b>📬 Новые вопросы гостей: {len(questions)}</b>\n\n"
+        message += "".join(format_question_entry(question) for question in questions)
+        if total > len(questions):
+            message += f"Всего без ответа: {total}"
+
+        async with db.get_session() as session:
+            await question_service.mark_digest_sent(session, [question.id for question in questions])
+            outbox_service.add(
+                session, [Config.BRIDE_ID], message,
+                parse_mode="HTML",
+                reply_markup=get_inbox_keyboard(questions, show_open=True)
+            )
+
+        outbox_service.wake()
+        return len(questions)
+
+    async def _digest_loop(self):
+        """Send digests periodically"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # Keep sending while there is a backlog larger than one digest
+                while await self.send_digest() == DIGEST_MAX_QUESTIONS:
+                    pass
+            except Exception as e:
+                print(f"❌ Failed to send question digest: {e}")
+
+    def start(self):
+        """Start periodic digests"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._digest_loop())
+
+    async def stop(self):
+        """Stop periodic digests"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+question_digest_service = QuestionDigestService(interval_minutes=Config.QUESTION_DIGEST_INTERVAL)
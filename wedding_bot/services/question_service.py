@@ -1,30 +1,59 @@
-from typing import List, Optional
-from sqlalchemy import select
+from html import escape
+from typing import List, Optional, Tuple
+from sqlalchemy import select, update, func, and_, or_
 from datetime import datetime
+from config import Config
 from database.database import db
 from database.models import Question
+from services.broadcast_service import DeliveryResult
+from services.outbox_service import outbox_service
+from services.similarity_service import similarity_service
+from utils.keyboards import get_answer_keyboard
+
+
+# Outbox kind of answers sent to guests, ref is the question id
+OUTBOX_KIND = "answer"
 
 
 class QuestionService:
     """Service for question operations"""
 
+    def __init__(self):
+        outbox_service.on_delivered(OUTBOX_KIND, self._answer_delivered)
+
     async def create_question(
         self,
         from_user_id: int,
         from_username: Optional[str],
-        question_text: str
+        question_text: str,
+        notify_bride: bool = False
     ) -> Question:
-        """Create a new question"""
+        """Create a new question
+
+        notify_bride=True queues the question to the bride right away and
+        marks it as digested, so the digest does not include it again.
+        """
         async with db.get_session() as session:
             question = Question(
                 from_user_id=from_user_id,
                 from_username=from_username,
-                question_text=question_text
+                question_text=question_text,
+                digest_sent_at=datetime.utcnow() if notify_bride else None
             )
             session.add(question)
             await session.flush()
             await session.refresh(question)
-            return question
+
+            if notify_bride:
+                outbox_service.add(
+                    session, [Config.BRIDE_ID],
+                    f"Вопрос от @{from_username or 'гостя'}\n\n{question_text}",
+                    reply_markup=get_answer_keyboard(question.id, from_user_id)
+                )
+
+        if notify_bride:
+            outbox_service.wake()
+        return question
 
     async def answer_question(
         self,
@@ -32,21 +61,66 @@ class QuestionService:
         answer_text: str,
         answered_by_user_id: int
     ) -> Optional[Question]:
-        """Answer a question"""
+        """
+        Answer a question and queue the answer to the guest
+
+        The answer is only stored if the question has none yet, so two
+        admins answering at once do not overwrite each other or notify
+        the guest twice. If the answer finally cannot be delivered, the
+        one who answered gets a message about it.
+
+        Returns:
+            The answered question, or None if it does not exist or was
+            already answered
+        """
         async with db.get_session() as session:
+            result = await session.execute(
+                update(Question)
+                .where(Question.id == question_id, Question.answer_text.is_(None))
+                .values(
+                    answer_text=answer_text,
+                    answered_at=datetime.utcnow(),
+                    answered_by_user_id=answered_by_user_id
+                )
+            )
+            if result.rowcount == 0:
+                return None
+
             result = await session.execute(
                 select(Question).where(Question.id == question_id)
             )
-            question = result.scalar_one_or_none()
+            question = result.scalar_one()
 
-            if question:
-                question.answer_text = answer_text
-                question.answered_at = datetime.utcnow()
-                question.answered_by_user_id = answered_by_user_id
-                await session.flush()
-                await session.refresh(question)
+            outbox_service.add(
+                session, [question.from_user_id],
+                f"Пришел ответ на твой вопрос\n\n"
+                f"❓ Вопрос:\n{escape(question.question_text)}\n\n"
+                f"💬 Ответ:\n{escape(answer_text)}",
+                parse_mode="HTML",
+                kind=OUTBOX_KIND,
+                ref=str(question_id)
+            )
+
+        outbox_service.wake()
+        similarity_service.question_answered(question.id, question.question_text, answer_text)
+        return question
+
+    async def _answer_delivered(self, ref: str, result: DeliveryResult):
+        """Tell whoever answered a question that the guest did not get the answer"""
+        if result.success:
+            return
 
-            return question
+        question = await self.get_question_by_id(int(ref))
+        if not question or not question.answered_by_user_id:
+            return
+
+        async with db.get_session() as session:
+            outbox_service.add(
+                session, [question.answered_by_user_id],
+                f"❌ Не удалось доставить гостю ответ на вопрос #{question.id}: {result.error}\n\n"
+                f"❓ {question.question_text}"
+            )
+        outbox_service.wake()
 
     async def get_pending_questions(self) -> List[Question]:
         """Get all unanswered questions"""
@@ -58,6 +132,97 @@ class QuestionService:
             )
             return result.scalars().all()
 
+    async def get_pending_page(
+        self,
+        cursor_id: Optional[int] = None,
+        direction: str = "next",
+        limit: int = 5
+    ) -> Tuple[List[Question], bool]:
+        """
+        Get one page of unanswered questions using keyset pagination
+
+        Questions are ordered oldest first by (created_at, id), so the ones
+        waiting longest come first; the query is served by the partial
+        ix_questions_pending index. The cursor is the id of the boundary
+        question: "next" returns newer questions after it, "prev" older ones.
+
+        Returns:
+            Tuple of (questions in display order, whether more exist in that direction)
+        """
+        query = select(Question).where(Question.answer_text.is_(None))
+
+        if cursor_id is not None:
+            cursor_created_at = (
+                select(Question.created_at).where(Question.id == cursor_id).scalar_subquery()
+            )
+            if direction == "prev":
+                query = query.where(or_(
+                    Question.created_at < cursor_created_at,
+                    and_(Question.created_at == cursor_created_at, Question.id < cursor_id)
+                ))
+            else:
+                query = query.where(or_(
+                    Question.created_at > cursor_created_at,
+                    and_(Question.created_at == cursor_created_at, Question.id > cursor_id)
+                ))
+
+        if direction == "prev":
+            query = query.order_by(Question.created_at.desc(), Question.id.desc())
+        else:
+            query = query.order_by(Question.created_at.asc(), Question.id.asc())
+
+        # Fetch one extra row to know whether another page exists
+        async with db.get_session() as session:
+            result = await session.execute(query.limit(limit + 1))
+            questions = list(result.scalars().all())
+
+        has_more = len(questions) > limit
+        questions = questions[:limit]
+
+        if direction == "prev":
+            questions.reverse()
+
+        return questions, has_more
+
+    async def count_pending(self) -> int:
+        """Count unanswered questions"""
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(func.count()).select_from(Question).where(Question.answer_text.is_(None))
+            )
+            return result.scalar() or 0
+
+    async def get_undigested_questions(self, limit: int) -> List[Question]:
+        """Get unanswered questions the bride has not been notified about yet"""
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(Question)
+                .where(Question.answer_text.is_(None), Question.digest_sent_at.is_(None))
+                .order_by(Question.created_at.asc(), Question.id.asc())
+                .limit(limit)
+            )
+            return list(result.scalars().all())
+
+    async def mark_digest_sent(self, session, question_ids: List[int]):
+        """Mark questions as included in a digest, in the caller's transaction"""
+        if not question_ids:
+            return
+        await session.execute(
+            update(Question)
+            .where(Question.id.in_(question_ids))
+            .values(digest_sent_at=datetime.utcnow())
+        )
+
+    async def get_answered_pairs(self) -> List[Tuple[int, str, str]]:
+        """Get (id, question_text, answer_text) of all answered questions"""
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(Question.id, Question.question_text, Question.answer_text)
+                .where(Question.answer_text.is_not(None))
+                .order_by(Question.id)
+            )
+            return [tuple(row) for row in result]
+
     async def get_question_by_id(self, question_id: int) -> Optional[Question]:
         """Get question by ID"""
         async with db.get_session() as session:
@@ -0,0 +1,105 @@
+"""Persistent ledger of reminder deliveries"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select, update, func
+
+from database.database import db
+from database.models import ReminderDelivery
+from services.broadcast_service import DeliveryResult
+
+
+@dataclass
+class MilestoneProgress:
+    """Delivery progress of one reminder milestone"""
+    milestone: str
+    sent: int = 0
+    pending: int = 0
+    failed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.sent + self.pending + self.failed
+
+
+class ReminderLedger:
+    """Service for reminder delivery ledger operations"""
+
+    async def start_milestone(self, session, milestone: str, user_ids: List[int]) -> bool:
+        """
+        Record recipients of a milestone in the caller's transaction
+
+        Returns:
+            False if the milestone was already started (nothing recorded)
+        """
+        result = await session.execute(
+            select(ReminderDelivery.id)
+            .where(ReminderDelivery.milestone == milestone)
+            .limit(1)
+        )
+        if result.scalar_one_or_none() is not None:
+            return False
+
+        if user_ids:
+            now = datetime.utcnow()
+            await session.execute(
+                db.insert(ReminderDelivery).on_conflict_do_nothing(
+                    index_elements=["milestone", "user_id"]
+                ),
+                [
+                    {
+                        "milestone": milestone,
+                        "user_id": user_id,
+                        "status": "pending",
+                        "attempts": 0,
+                        "created_at": now
+                    }
+                    for user_id in user_ids
+                ]
+            )
+        return True
+
+    async def record_result(self, milestone: str, result: DeliveryResult):
+        """Store the delivery outcome for one recipient"""
+        values = {
+            "status": "sent" if result.success else "failed",
+            "attempts": ReminderDelivery.attempts + result.attempts,
+            "last_error": result.error
+        }
+        if result.success:
+            values["sent_at"] = datetime.utcnow()
+
+        async with db.get_session() as session:
+            await session.execute(
+                update(ReminderDelivery)
+                .where(
+                    ReminderDelivery.milestone == milestone,
+                    ReminderDelivery.user_id == result.chat_id
+                )
+                .values(**values)
+            )
+
+    async def get_progress(self) -> List[MilestoneProgress]:
+        """Get delivery counts per milestone"""
+        progress = {}
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(
+                    ReminderDelivery.milestone,
+                    ReminderDelivery.status,
+                    func.count(ReminderDelivery.id)
+                )
+                .group_by(ReminderDelivery.milestone, ReminderDelivery.status)
+                .order_by(ReminderDelivery.milestone)
+            )
+            for milestone, status, count in result.all():
+                item = progress.setdefault(milestone, MilestoneProgress(milestone))
+                if status in ("sent", "pending", "failed"):
+                    setattr(item, status, count)
+
+        return list(progress.values())
+
+
+reminder_ledger = ReminderLedger()
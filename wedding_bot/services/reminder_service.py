@@ -1,77 +1,195 @@
 """Service for sending wedding reminder notifications"""
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from telegram import Bot
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from config import Config
 from database.database import db
 from database.models import BotUser
+from services.bot_user_service import bot_user_service
+from services.broadcast_service import DeliveryResult
+from services.outbox_service import outbox_service
+from services.reminder_ledger import reminder_ledger
 
 
 # Московский часовой пояс
 MSK_ZONE = ZoneInfo("Europe/Moscow")
 
 
+# Named milestones: days before the wedding -> (type, message prefix)
+NAMED_MILESTONES = {
+    30: ("month", "📅 **1 месяц до свадьбы!**\n\n"),
+    7: ("week", "📅 **1 неделя до свадьбы!**\n\n"),
+    1: ("day", "🎊 **Завтра свадьба!**\n\n"),
+}
+
+REMINDER_JOB_PREFIX = "reminder_"
+
+# Outbox kind of milestone reminders, the ledger records their outcome
+OUTBOX_KIND = "reminder"
+
+# Service instance used by persisted scheduler jobs
+_active_service: Optional["ReminderService"] = None
+
+
+def get_reminder_milestones() -> Dict[str, Tuple[int, str]]:
+    """Get configured milestones: type -> (days before the wedding, message prefix)"""
+    milestones = {}
+    for days_before in Config.REMINDER_MILESTONES:
+        if days_before in NAMED_MILESTONES:
+            reminder_type, prefix = NAMED_MILESTONES[days_before]
+        else:
+            reminder_type = f"{days_before}d"
+            prefix = f"📅 **{days_before} дней до свадьбы!**\n\n"
+        milestones[reminder_type] = (days_before, prefix)
+    return milestones
+
+
+def get_wedding_datetime() -> datetime:
+    """Get wedding start as an aware Moscow datetime"""
+    wedding_time = datetime.strptime(Config.WEDDING_TIME, "%H:%M").time()
+    return datetime.combine(Config.WEDDING_DATE, wedding_time, tzinfo=MSK_ZONE)
+
+
+def days_until_wedding() -> int:
+    """Get number of days until the wedding in Moscow time"""
+    return (Config.WEDDING_DATE - datetime.now(MSK_ZONE).date()).days
+
+
+def _get_jobstore_url() -> str:
+    """Get a sync SQLAlchemy URL for the persistent job store"""
+    if Config.REMINDER_JOBSTORE_URL:
+        return Config.REMINDER_JOBSTORE_URL
+    # APScheduler uses sync SQLAlchemy, drop the async driver (aiosqlite, asyncpg)
+    url = make_url(Config.DATABASE_URL)
+    return url.set(drivername=url.get_backend_name()).render_as_string(hide_password=False)
+
+
+async def fire_reminder(reminder_type: str):
+    """Scheduler job entry point, must be importable for the persistent job store"""
+    if _active_service is None:
+        print(f"⚠️ Reminder '{reminder_type}' fired before the reminder service started")
+        return
+    await _active_service.send_milestone(reminder_type)
+
+
 class ReminderService:
     """Service for managing wedding reminders"""
 
-    def __init__(self, bot: Bot):
-        self.bot = bot
-        self.scheduler = AsyncIOScheduler(timezone=MSK_ZONE)
-        self._sent_reminders = set()  # Track sent reminders to avoid duplicates
+    def __init__(self):
+        self.scheduler = AsyncIOScheduler(
+            timezone=MSK_ZONE,
+            jobstores={
+                "default": MemoryJobStore(),
+                "persistent": SQLAlchemyJobStore(url=_get_jobstore_url())
+            }
+        )
+        self.milestones = get_reminder_milestones()
 
     def start(self):
         """Start the reminder scheduler"""
-        # Check every hour for upcoming reminders
-        self.scheduler.add_job(
-            self._check_and_send_reminders,
-            'interval',
-            hours=1,
-            id='check_reminders',
-            replace_existing=True
-        )
+        global _active_service
+        _active_service = self
+
+        outbox_service.on_delivered(OUTBOX_KIND, self._record_delivery)
         self.scheduler.start()
+        self._schedule_milestones()
         print("📅 Reminder scheduler started!")
 
     def stop(self):
         """Stop the reminder scheduler"""
+        global _active_service
         if self.scheduler.running:
             self.scheduler.shutdown()
             print("📅 Reminder scheduler stopped!")
+        if _active_service is self:
+            _active_service = None
+
+    def _schedule_milestones(self):
+        """Register one date job per milestone at its exact send time"""
+        wedding_at = get_wedding_datetime()
+        now = datetime.now(MSK_ZONE)
+        grace = timedelta(hours=Config.REMINDER_MISFIRE_GRACE_HOURS)
+        scheduled_ids = set()
+
+        for reminder_type, (days_before, _) in self.milestones.items():
+            job_id = f"{REMINDER_JOB_PREFIX}{self._milestone_key(reminder_type)}"
+            run_at = wedding_at - timedelta(days=days_before)
+
+            if run_at + grace < now:
+                continue
+
+            self.scheduler.add_job(
+                fire_reminder,
+                'date',
+                run_date=run_at,
+                args=[reminder_type],
+                id=job_id,
+                jobstore="persistent",
+                replace_existing=True,
+                misfire_grace_time=int(grace.total_seconds()),
+                coalesce=True
+            )
+            scheduled_ids.add(job_id)
+            print(f"📅 Reminder '{reminder_type}' scheduled for {run_at.strftime('%d.%m.%Y %H:%M')} MSK")
+
+        # Drop jobs of milestones removed from config or of an old wedding date
+        for job in self.scheduler.get_jobs(jobstore="persistent"):
+            if job.id.startswith(REMINDER_JOB_PREFIX) and job.id not in scheduled_ids:
+                job.remove()
+
+    @staticmethod
+    def _milestone_key(reminder_type: str) -> str:
+        """Get ledger key for a milestone of the current wedding date"""
+        return f"{Config.WEDDING_DATE.isoformat()}_{reminder_type}"
+
+    async def send_milestone(self, reminder_type: str):
+        """
+        Queue a milestone reminder for every subscribed recipient
+
+        Recipients are recorded in the ledger in the same transaction as
+        their outbox messages, so a milestone fired twice (e.g. a misfire
+        after a restart) is queued once; the outbox reports each outcome
+        back to the ledger.
+        """
+        milestone = self._milestone_key(reminder_type)
+        if reminder_type not in self.milestones:
+            return
+
+        user_ids = await self.get_recipient_ids()
+        days_before, prefix = self.milestones[reminder_type]
+        message = self._format_reminder_message(prefix, days_before)
 
-    async def _check_and_send_reminders(self):
-        """Check if we need to send any reminders"""
-        today = date.today()
-        wedding_date = Config.WEDDING_DATE
+        async with db.get_session() as session:
+            if not await reminder_ledger.start_milestone(session, milestone, user_ids):
+                return
+            outbox_service.add(
+                session, user_ids, message,
+                parse_mode="Markdown",
+                kind=OUTBOX_KIND,
+                ref=milestone
+            )
+        outbox_service.wake()
+        print(f"📅 Reminder '{milestone}' queued for {len(user_ids)} recipients")
 
-        # Calculate days until wedding
-        days_until = (wedding_date - today).days
-
-        # Define reminder milestones
-        reminders = []
-        if days_until == 30:
-            reminders.append(("month", "📅 **1 месяц до свадьбы!**\n\n"))
-        elif days_until == 7:
-            reminders.append(("week", "📅 **1 неделя до свадьбы!**\n\n"))
-        elif days_until == 1:
-            reminders.append(("day", "🎊 **Завтра свадьба!**\n\n"))
-
-        # Send reminders if any
-        for reminder_type, prefix in reminders:
-            reminder_key = f"{wedding_date.isoformat()}_{reminder_type}"
-            if reminder_key not in self._sent_reminders:
-                await self._send_reminder_to_all(prefix, days_until)
-                self._sent_reminders.add(reminder_key)
-
-    async def _send_reminder_to_all(self, message_prefix: str, days_until: int):
-        """Send reminder to all subscribed bot users"""
+    @staticmethod
+    async def _record_delivery(milestone: str, result: DeliveryResult):
+        """Store the final outcome of a milestone reminder in the ledger"""
+        await reminder_ledger.record_result(milestone, result)
+
+    @staticmethod
+    def _format_reminder_message(message_prefix: str, days_until: int) -> str:
+        """Format reminder message"""
         wedding_date = Config.WEDDING_DATE
         wedding_time = Config.WEDDING_TIME
 
-        message = f"""{message_prefix}💍 До нашей свадьбы осталось **{days_until} дней**!
+        return f"""{message_prefix}💍 До нашей свадьбы осталось **{days_until} дней**!
 
 📆 **Дата:** {wedding_date.strftime('%d.%m.%Y')}
 🕐 **Время:** {wedding_time}
@@ -81,50 +199,28 @@ class ReminderService:
 Если у вас есть вопросы, не стесняйтесь задавать их через бота 🤗
 """
 
+    async def get_recipient_ids(self) -> List[int]:
+        """Get Telegram IDs of all subscribed active bot users"""
+        # Include users that started the bot since the last flush
+        await bot_user_service.flush()
+
         async with db.get_session() as session:
-            from sqlalchemy import select
             result = await session.execute(
-                select(BotUser).where(
+                select(BotUser.user_id).where(
                     BotUser.subscribed_to_reminders == True,
                     BotUser.is_active == True
                 )
             )
-            users = result.scalars().all()
-
-        for user in users:
-            try:
-                await self.bot.send_message(
-                    chat_id=user.user_id,
-                    text=message,
-                    parse_mode="Markdown"
-                )
-                print(f"✅ Reminder sent to {user.first_name or user.username or user.user_id}")
-            except Exception as e:
-                print(f"❌ Failed to send reminder to {user.user_id}: {e}")
-
-    async def send_test_reminder(self, user_id: int):
-        """Send a test reminder (for admin testing)"""
-        message = """📅 **Тестовое напоминание**
+            return list(result.scalars().all())
 
-Это тестовое сообщение для проверки системы напоминаний.
+    async def broadcast(self, message: str) -> int:
+        """Queue a reminder message for all subscribed bot users
 
-💍 До свадьбы осталось **{} дней**!
-
-📆 Дата: {}
-🕐 Время: {}
-""".format(
-            (Config.WEDDING_DATE - date.today()).days,
-            Config.WEDDING_DATE.strftime('%d.%m.%Y'),
-            Config.WEDDING_TIME
-        )
-
-        try:
-            await self.bot.send_message(
-                chat_id=user_id,
-                text=message,
-                parse_mode="Markdown"
-            )
-            return True
-        except Exception as e:
-            print(f"❌ Failed to send test reminder: {e}")
-            return False
+        Returns:
+            Number of recipients
+        """
+        user_ids = await self.get_recipient_ids()
+        async with db.get_session() as session:
+            outbox_service.add(session, user_ids, message, parse_mode="Markdown")
+        outbox_service.wake()
+        return len(user_ids)
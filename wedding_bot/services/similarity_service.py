@@ -0,0 +1,170 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from utils.text import content_stems
+
+# Document keys: (kind, id)
+KIND_FAQ = "faq"
+KIND_QUESTION = "question"
+
+DocKey = Tuple[str, int]
+
+
+@dataclass
+class SimilarityMatch:
+    """Stored answer for a question similar to the new one"""
+    kind: str
+    id: int
+    question: str
+    answer: str
+    score: float
+
+
+@dataclass
+class _Document:
+    question: str
+    answer: str
+    terms: Counter
+    norm: float = 0.0
+
+
+class SimilarityIndex:
+    """In-memory TF-IDF index over FAQ and answered question texts
+
+    Documents are added, replaced and removed one at a time; an inverted
+    index limits scoring to documents sharing a term with the query.
+    Stop words are not indexed, so a match needs a shared content word.
+    Document norms depend on IDF, so they are recomputed lazily after a
+    change (cheap for a few hundred short texts).
+    """
+
+    def __init__(self):
+        self._documents: Dict[DocKey, _Document] = {}
+        self._postings: Dict[str, Set[DocKey]] = {}  # {term: {doc keys}}
+        self._norms_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def upsert(self, kind: str, doc_id: int, question: str, answer: str):
+        """Add or replace a document"""
+        key = (kind, doc_id)
+        self.remove(kind, doc_id)
+
+        terms = Counter(content_stems(question))
+        if not terms:
+            return
+
+        self._documents[key] = _Document(question, answer, terms)
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+        self._norms_dirty = True
+
+    def remove(self, kind: str, doc_id: int):
+        """Remove a document if present"""
+        document = self._documents.pop((kind, doc_id), None)
+        if document is None:
+            return
+
+        for term in document.terms:
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard((kind, doc_id))
+                if not keys:
+                    del self._postings[term]
+        self._norms_dirty = True
+
+    def clear(self):
+        """Remove all documents"""
+        self._documents.clear()
+        self._postings.clear()
+        self._norms_dirty = False
+
+    def find_best(self, text: str, threshold: float) -> Optional[SimilarityMatch]:
+        """Most similar document by cosine similarity, if it reaches threshold"""
+        query_terms = Counter(content_stems(text))
+        if not query_terms or not self._documents:
+            return None
+
+        if self._norms_dirty:
+            self._recompute_norms()
+
+        # Terms no document has still count in the query norm (with the
+        # highest IDF), so extra words in the query lower the score
+        query_weights = {term: tf * self._idf(term) for term, tf in query_terms.items()}
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+
+        scores: Dict[DocKey, float] = {}
+        for term, query_weight in query_weights.items():
+            keys = self._postings.get(term)
+            if not keys:
+                continue
+            idf = self._idf(term)
+            for key in keys:
+                doc_weight = self._documents[key].terms[term] * idf
+                scores[key] = scores.get(key, 0.0) + query_weight * doc_weight
+
+        best_key, best_score = None, 0.0
+        for key, dot in scores.items():
+            score = dot / (query_norm * self._documents[key].norm)
+            # Prefer FAQ over a past answer on equal score
+            if score > best_score or (score == best_score and key[0] == KIND_FAQ):
+                best_key, best_score = key, score
+
+        if best_key is None or best_score < threshold:
+            return None
+
+        document = self._documents[best_key]
+        return SimilarityMatch(best_key[0], best_key[1], document.question, document.answer, best_score)
+
+    def _idf(self, term: str) -> float:
+        # Smoothed IDF, stays positive when a term is in every document
+        document_count = len(self._postings.get(term, ()))
+        return math.log((1 + len(self._documents)) / (1 + document_count)) + 1.0
+
+    def _recompute_norms(self):
+        for document in self._documents.values():
+            document.norm = math.sqrt(sum(
+                (tf * self._idf(term)) ** 2 for term, tf in document.terms.items()
+            ))
+        self._norms_dirty = False
+
+
+class SimilarityService:
+    """Find stored answers for repeated guest questions"""
+
+    def __init__(self):
+        self.index = SimilarityIndex()
+
+    async def load(self):
+        """Build the index from FAQ items and answered questions"""
+        from services.faq_service import faq_service
+        from services.question_service import question_service
+
+        self.index.clear()
+        for faq in await faq_service.get_all_faqs():
+            self.index.upsert(KIND_FAQ, faq.id, faq.question, faq.answer)
+        for question_id, question_text, answer_text in await question_service.get_answered_pairs():
+            self.index.upsert(KIND_QUESTION, question_id, question_text, answer_text)
+
+        print(f"🔎 Similarity index loaded: {len(self.index)} entries", flush=True)
+
+    def find_answer(self, text: str, threshold: float) -> Optional[SimilarityMatch]:
+        """Find a stored answer for the question text"""
+        return self.index.find_best(text, threshold)
+
+    def faq_changed(self, faq_id: int, question: Optional[str] = None, answer: Optional[str] = None):
+        """Update FAQ entry; None question means the FAQ was deleted"""
+        if question is None:
+            self.index.remove(KIND_FAQ, faq_id)
+        else:
+            self.index.upsert(KIND_FAQ, faq_id, question, answer)
+
+    def question_answered(self, question_id: int, question: str, answer: str):
+        """Add a newly answered question"""
+        self.index.upsert(KIND_QUESTION, question_id, question, answer)
+
+
+similarity_service = SimilarityService()
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import delete
+
+# Modules import each other as top-level packages (config, services, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Config reads these at import time
+os.environ.setdefault("API_TOKEN", "1:test")
+
+# Tests touching the database get a throwaway SQLite file, never the configured one
+_database_dir = tempfile.mkdtemp(prefix="wedding_bot_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_database_dir, 'test.db')}"
+
+from database.database import db  # noqa: E402 (needs DATABASE_URL above)
+
+
+def run(scenario):
+    """Run scenario in a fresh event loop, closing pooled connections afterwards
+
+    Tests import it: from conftest import run
+    """
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def clear_tables():
+    """Create the schema and delete all rows of the given models"""
+    def clear(*models):
+        async def scenario():
+            await db.init_db()
+            async with db.get_session() as session:
+                for model in models:
+                    await session.execute(delete(model))
+
+        run(scenario)
+
+    return clear
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_database_dir, ignore_errors=True)
@@ -0,0 +1,168 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import select
+
+from api import codec
+from api.routes import register_guest, register_guests_batch, _parse_batch_body
+from api.schemas import GuestRegistrationRequest
+from config import Config
+from conftest import run
+from database.database import db
+from database.models import Guest, OutboxMessage
+
+TOKEN = "batch-secret"
+
+
+@pytest.fixture(autouse=True)
+def batch_token(monkeypatch):
+    monkeypatch.setattr(Config, "API_BATCH_TOKEN", TOKEN)
+
+
+@pytest.fixture
+def empty_guests(clear_tables):
+    clear_tables(OutboxMessage, Guest)
+
+
+
+def post_batch(body: bytes, content_type: str = "application/json", token: str = TOKEN):
+    """POST body to the batch endpoint, return (status, parsed JSON)"""
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/batch", register_guests_batch)
+        headers = {"Content-Type": content_type}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/batch", data=body, headers=headers)
+            return response.status, codec.loads(await response.read())
+
+    return run(scenario)
+
+
+async def get_rows(model):
+    async with db.get_session() as session:
+        result = await session.execute(select(model).order_by(model.id))
+        return list(result.scalars().all())
+
+
+@pytest.mark.parametrize("token", [None, "wrong"])
+def test_batch_requires_token(token):
+    status, data = post_batch(b'[{"name": "Anna"}]', token=token)
+
+    assert status == 401
+    assert data["error"]["code"] == "UNAUTHORIZED"
+
+
+def test_batch_is_disabled_without_configured_token(monkeypatch):
+    monkeypatch.setattr(Config, "API_BATCH_TOKEN", "")
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/batch", register_guests_batch)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/batch", data=b'[{"name": "Anna"}]')
+            return response.status
+
+    assert run(scenario) == 404
+
+
+def test_batch_creates_guests_with_one_notification(empty_guests):
+    status, data = post_batch(
+        codec.dumps([{"name": "Анна", "guest_count": 2}, {"name": "Борис", "comment": "Без мяса"}])
+    )
+
+    assert status == 201
+    assert data["success"] is True
+    assert (data["data"]["created"], data["data"]["failed"]) == (2, 0)
+    assert [result["data"]["name"] for result in data["data"]["results"]] == ["Анна", "Борис"]
+
+    guests = run(lambda: get_rows(Guest))
+    assert [(g.name, g.guest_count, g.comment) for g in guests] == [("Анна", 2, None), ("Борис", 1, "Без мяса")]
+
+    # One summary message per owner, not one per guest
+    outbox = run(lambda: get_rows(OutboxMessage))
+    assert sorted(row.chat_id for row in outbox) == sorted(Config.get_owners())
+    assert all(row.status == "pending" and "Новые гости: 2" in row.text for row in outbox)
+
+
+def test_batch_with_invalid_items_creates_the_rest(empty_guests):
+    status, data = post_batch(codec.dumps([{"name": ""}, {"name": "Анна"}]))
+
+    assert status == 207
+    assert data["success"] is False
+    assert (data["data"]["created"], data["data"]["failed"]) == (1, 1)
+    first, second = data["data"]["results"]
+    assert first["error"]["code"] == "VALIDATION_ERROR"
+    assert second["success"] is True
+
+    assert [g.name for g in run(lambda: get_rows(Guest))] == ["Анна"]
+    outbox = run(lambda: get_rows(OutboxMessage))
+    assert len(outbox) == len(Config.get_owners())
+    assert all("Новые гости: 1" in row.text for row in outbox)
+
+
+@pytest.mark.parametrize("guest_count", [True, 2.5, "два", None])
+def test_guest_count_must_be_a_whole_number(guest_count):
+    is_valid, message = GuestRegistrationRequest("Анна", guest_count, "pending").validate()
+
+    assert not is_valid
+    assert message == "Guest count must be a valid number"
+
+
+def test_single_and_batch_registration_coerce_guest_count(empty_guests):
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/register", register_guest)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/register", data=codec.dumps({"name": "Анна", "guest_count": "2"}))
+            return response.status, codec.loads(await response.read())
+
+    status, data = run(scenario)
+    batch_status, batch_data = post_batch(codec.dumps([{"name": "Борис", "guest_count": "2"}]))
+
+    assert (status, batch_status) == (201, 201)
+    assert data["data"]["guest_count"] == 2
+    assert batch_data["data"]["results"][0]["data"]["guest_count"] == 2
+    assert [g.guest_count for g in run(lambda: get_rows(Guest))] == [2, 2]
+
+
+@pytest.mark.parametrize("item, error", [
+    ({"name": 1}, "Name must be a string"),
+    ({"name": "Анна", "comment": 5}, "Comment must be a string"),
+    ({"name": "Анна", "confirmation_status": ["confirmed"]}, "Invalid confirmation_status"),
+])
+def test_non_string_field_is_a_validation_error(item, error):
+    is_valid, message = GuestRegistrationRequest(
+        name=item.get("name", ""),
+        guest_count=1,
+        confirmation_status=item.get("confirmation_status", "pending"),
+        comment=item.get("comment")
+    ).validate()
+    assert not is_valid
+    assert message.startswith(error)
+
+
+def test_batch_reports_non_string_fields_per_item():
+    status, data = post_batch(b'[{"name": 1}, {"name": "\\u0410\\u043d\\u043d\\u0430", "comment": 5}]')
+
+    assert status == 400
+    results = data["data"]["results"]
+    assert [result["index"] for result in results] == [0, 1]
+    assert all(result["error"]["code"] == "VALIDATION_ERROR" for result in results)
+
+
+def test_batch_rejects_single_object_body():
+    status, data = post_batch(b'{"name": "Anna"}')
+
+    assert status == 400
+    assert data["error"]["code"] == "INVALID_REQUEST"
+
+
+def test_single_object_is_accepted_as_ndjson():
+    assert _parse_batch_body(b'{"name": "Anna"}', "application/x-ndjson") == [{"name": "Anna"}]
+
+
+def test_ndjson_lines_without_content_type():
+    body = b'{"name": "Anna"}\n{"name": "Boris"}\n'
+    assert _parse_batch_body(body, "application/json") == [{"name": "Anna"}, {"name": "Boris"}]
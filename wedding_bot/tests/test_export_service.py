@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+
+from services.export_service import ExportService
+
+
+@pytest.mark.parametrize("text", ["=HYPERLINK(\"http://x\")", "+1", "-1+2", "@SUM(A1)", "\tx", "\rx"])
+def test_formula_like_text_is_prefixed(text):
+    row = ExportService()._format_row((1, text, 1, "confirmed", text, None))
+
+    assert row[1] == row[4] == "'" + text
+
+
+def test_plain_text_is_kept():
+    row = ExportService()._format_row((1, "Анна", 2, "confirmed", None, None))
+
+    assert row == [1, "Анна", 2, "confirmed", "", ""]
+
+
+def test_created_at_is_in_moscow_time():
+    row = ExportService()._format_row((1, "Анна", 1, "pending", None, datetime(2026, 4, 24, 22, 30)))
+
+    assert row[5] == "2026-04-25 01:30"
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from handlers.faq_search import faq_search_handler
+from services.faq_service import faq_service
+
+FAQ = SimpleNamespace(id=1, question="Можно ли <детям>?", answer="Да & с 5 лет")
+
+
+@pytest.fixture(autouse=True)
+def search_results(monkeypatch):
+    async def search(text, limit):
+        return [FAQ]
+
+    monkeypatch.setattr(faq_service, "search", search)
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+def test_inline_results_escape_faq_text():
+    answer = Recorder()
+    update = SimpleNamespace(inline_query=SimpleNamespace(query="дети", answer=answer))
+
+    asyncio.run(faq_search_handler.inline_query_handler(update, None))
+
+    [(results,), _] = answer.calls[0]
+    content = results[0].input_message_content
+    assert content.parse_mode == "HTML"
+    assert content.message_text == "❓ <b>Можно ли &lt;детям&gt;?</b>\n\n💬 Да &amp; с 5 лет"
+
+
+def test_free_text_reply_escapes_faq_text():
+    reply_text = Recorder()
+    update = SimpleNamespace(message=SimpleNamespace(text="дети", reply_text=reply_text))
+
+    asyncio.run(faq_search_handler.free_text_handler(update, SimpleNamespace(is_admin=False)))
+
+    [(text,), kwargs] = reply_text.calls[0]
+    assert kwargs["parse_mode"] == "HTML"
+    assert "<b>Можно ли &lt;детям&gt;?</b>" in text
+    assert "💬 Да &amp; с 5 лет" in text
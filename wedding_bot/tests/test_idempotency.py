@@ -0,0 +1,212 @@
+import hashlib
+from datetime import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import update
+
+from api import codec, idempotency
+from api.idempotency import (
+    CLAIM_TIMEOUT, IN_PROGRESS, IDEMPOTENCY_HEADER, REPLAYED_HEADER,
+    IdempotencyStore, StoredResponse, idempotency_store, idempotent
+)
+from conftest import run
+from database.database import db
+from database.models import IdempotencyKey
+
+
+
+@pytest.fixture(autouse=True)
+def empty_keys(clear_tables):
+    clear_tables(IdempotencyKey)
+
+
+def make_store() -> IdempotencyStore:
+    """A store of its own, like a separate API worker process"""
+    return IdempotencyStore(ttl=3600, max_size=10)
+
+
+async def age_claim(key: str, age):
+    async with db.get_session() as session:
+        await session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key)
+            .values(created_at=datetime.utcnow() - age)
+        )
+
+
+def test_claim_in_progress_is_seen_by_other_workers():
+    first, second = make_store(), make_store()
+
+    async def scenario():
+        return await first.claim("key-1", "hash"), await second.claim("key-1", "hash")
+
+    claimed, seen = run(scenario)
+
+    assert claimed is None
+    assert seen.status_code == IN_PROGRESS
+    assert seen.request_hash == "hash"
+
+
+def test_stale_claim_is_taken_over_after_claim_timeout():
+    first, second = make_store(), make_store()
+
+    async def scenario():
+        await first.claim("key-1", "hash")
+        await age_claim("key-1", CLAIM_TIMEOUT / 2)
+        still_running = await second.claim("key-1", "hash")
+        await age_claim("key-1", CLAIM_TIMEOUT * 2)
+        return still_running, await second.claim("key-1", "hash")
+
+    still_running, taken_over = run(scenario)
+
+    assert still_running.status_code == IN_PROGRESS
+    assert taken_over is None
+
+
+def test_abandon_releases_only_claims_in_progress():
+    store = make_store()
+
+    async def scenario():
+        await store.claim("failed", "hash")
+        await store.abandon("failed")
+
+        await store.claim("done", "hash")
+        await store.save("done", StoredResponse("hash", 201, '{"success": true}', datetime.utcnow()))
+        await store.abandon("done")
+
+        other = make_store()
+        return await other.claim("failed", "hash"), await other.claim("done", "hash")
+
+    failed, done = run(scenario)
+
+    assert failed is None
+    assert done.status_code == 201
+    assert done.body == '{"success": true}'
+
+
+BODY = b'{"name": "Anna"}'
+
+
+def post_twice(handler, claim_first: bool = False):
+    """POST the same keyed request twice, return [(status, headers, JSON)]"""
+    async def scenario():
+        app = web.Application()
+        app.router.add_post("/guests", idempotent(handler))
+        headers = {IDEMPOTENCY_HEADER: f"{handler.__name__}-key"}
+        if claim_first:
+            # Another worker is handling the same key right now
+            request_hash = hashlib.sha256(b"POST /guests\n" + BODY).hexdigest()
+            await make_store().claim(headers[IDEMPOTENCY_HEADER], request_hash)
+
+        responses = []
+        async with TestClient(TestServer(app)) as client:
+            for _ in range(2):
+                response = await client.post("/guests", data=BODY, headers=headers)
+                responses.append((response.status, response.headers, codec.loads(await response.read())))
+        return responses
+
+    return run(scenario)
+
+
+def test_repeated_request_is_replayed():
+    calls = []
+
+    async def create_guest(request):
+        calls.append(request)
+        return codec.json_response({"success": True, "id": len(calls)}, status=201)
+
+    first, second = post_twice(create_guest)
+
+    assert len(calls) == 1
+    assert first[0] == second[0] == 201
+    assert first[2] == second[2] == {"success": True, "id": 1}
+    assert second[1][REPLAYED_HEADER] == "true"
+
+
+def test_request_in_progress_elsewhere_gets_409():
+    calls = []
+
+    async def in_progress_guest(request):
+        calls.append(request)
+        return codec.json_response({"success": True}, status=201)
+
+    first, _ = post_twice(in_progress_guest, claim_first=True)
+    status, headers, data = first
+
+    assert calls == []
+    assert status == 409
+    assert headers["Retry-After"] == "1"
+    assert data["error"]["code"] == "IDEMPOTENCY_KEY_IN_PROGRESS"
+
+
+def test_failed_request_can_be_retried():
+    calls = []
+
+    async def flaky_guest(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return codec.json_response({"success": False}, status=503)
+        return codec.json_response({"success": True}, status=201)
+
+    first, second = post_twice(flaky_guest)
+
+    assert len(calls) == 2
+    assert (first[0], second[0]) == (503, 201)
+
+
+def fail_saves(monkeypatch, failures: int):
+    """Make the next store saves raise, return the list of attempts"""
+    attempts = []
+    save = idempotency_store.save
+
+    async def flaky_save(key, stored):
+        attempts.append(key)
+        if len(attempts) <= failures:
+            raise RuntimeError("database is locked")
+        await save(key, stored)
+
+    monkeypatch.setattr(idempotency_store, "save", flaky_save)
+    monkeypatch.setattr(idempotency, "SAVE_RETRY_DELAY", 0)
+    return attempts
+
+
+def test_failed_save_is_retried(monkeypatch):
+    calls = []
+    attempts = fail_saves(monkeypatch, failures=2)
+
+    async def retried_save_guest(request):
+        calls.append(request)
+        return codec.json_response({"success": True}, status=201)
+
+    first, second = post_twice(retried_save_guest)
+
+    async def claim_elsewhere():
+        return await make_store().claim("retried_save_guest-key", "other")
+
+    stored = run(claim_elsewhere)
+
+    assert len(attempts) == 3
+    assert len(calls) == 1
+    assert (first[0], second[0]) == (201, 201)
+    # Persisted for other workers, not left in progress
+    assert stored.status_code == 201
+
+
+def test_save_that_keeps_failing_is_logged(monkeypatch, caplog):
+    calls = []
+    attempts = fail_saves(monkeypatch, failures=idempotency.SAVE_ATTEMPTS)
+
+    async def unsaved_guest(request):
+        calls.append(request)
+        return codec.json_response({"success": True}, status=201)
+
+    with caplog.at_level("ERROR", logger="api.idempotency"):
+        first, second = post_twice(unsaved_guest)
+
+    assert len(attempts) == idempotency.SAVE_ATTEMPTS
+    assert any(record.exc_info for record in caplog.records)
+    # The request succeeded; its claim stays in progress instead of being re-run
+    assert len(calls) == 1
+    assert (first[0], second[0]) == (201, 409)
@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from conftest import run
+from database.database import db
+from database.models import OutboxMessage
+from services.broadcast_service import DeliveryResult, OutgoingMessage
+from services.outbox_service import OutboxService
+
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox(clear_tables):
+    clear_tables(OutboxMessage)
+
+
+def make_outbox(listener_calls: list = None) -> OutboxService:
+    outbox = OutboxService(poll_interval=1, batch_size=10, max_attempts=3, retry_base_delay=5)
+    if listener_calls is not None:
+        async def listener(ref, result):
+            listener_calls.append((ref, result))
+        outbox.on_delivered("test", listener)
+    return outbox
+
+
+async def add_messages(outbox: OutboxService, chat_ids, kind: str = None):
+    async with db.get_session() as session:
+        outbox.add(session, chat_ids, "Привет", kind=kind, ref="ref-1" if kind else None)
+
+
+async def get_rows():
+    async with db.get_session() as session:
+        result = await session.execute(select(OutboxMessage).order_by(OutboxMessage.id))
+        return list(result.scalars().all())
+
+
+async def expire_claims():
+    """Pretend the dispatcher holding the claims died"""
+    async with db.get_session() as session:
+        await session.execute(
+            update(OutboxMessage).values(claimed_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+
+async def make_due():
+    """Skip the backoff of rows waiting for a retry"""
+    async with db.get_session() as session:
+        await session.execute(update(OutboxMessage).values(next_attempt_at=datetime.utcnow()))
+
+
+def failure(row, permanent: bool = False) -> DeliveryResult:
+    return DeliveryResult(OutgoingMessage(row.chat_id, row.text), False, 1, "boom", permanent=permanent)
+
+
+def success(row) -> DeliveryResult:
+    return DeliveryResult(OutgoingMessage(row.chat_id, row.text), True, 1)
+
+
+def test_claim_batch_claims_due_messages_once():
+    outbox = make_outbox()
+
+    async def scenario():
+        await add_messages(outbox, [1, 2, 3])
+        async with db.get_session() as session:
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.chat_id == 3)
+                .values(next_attempt_at=datetime.utcnow() + timedelta(minutes=5))
+            )
+        return await outbox.claim_batch(), await outbox.claim_batch()
+
+    claimed, claimed_again = run(scenario)
+
+    assert [row.chat_id for row in claimed] == [1, 2]
+    assert {row.status for row in claimed} == {"sending"}
+    assert len({row.claimed_by for row in claimed}) == 1
+    assert claimed_again == []
+
+
+def test_expired_claim_is_taken_over():
+    outbox = make_outbox()
+
+    async def scenario():
+        await add_messages(outbox, [1, 2])
+        first = await outbox.claim_batch()
+        await expire_claims()
+        return first, await outbox.claim_batch()
+
+    first, second = run(scenario)
+
+    assert [row.id for row in second] == [row.id for row in first]
+    assert second[0].claimed_by != first[0].claimed_by
+
+
+def test_result_of_a_lost_claim_is_not_recorded():
+    outbox = make_outbox()
+
+    async def scenario():
+        await add_messages(outbox, [1])
+        [stale] = await outbox.claim_batch()
+        await expire_claims()
+        [current] = await outbox.claim_batch()
+
+        # The first dispatcher finishes after its claim was taken over
+        await outbox._record(stale, success(stale))
+        after_stale = (await get_rows())[0]
+
+        await outbox._record(current, success(current))
+        return current, after_stale, (await get_rows())[0]
+
+    current, after_stale, after_current = run(scenario)
+
+    assert after_stale.status == "sending"
+    assert after_stale.claimed_by == current.claimed_by
+    assert after_current.status == "sent"
+    assert after_current.attempts == 1
+    assert after_current.claimed_by is None
+
+
+def test_success_notifies_listener():
+    calls = []
+    outbox = make_outbox(calls)
+
+    async def scenario():
+        await add_messages(outbox, [1], kind="test")
+        [row] = await outbox.claim_batch()
+        await outbox._record(row, success(row))
+        return (await get_rows())[0]
+
+    row = run(scenario)
+
+    assert row.status == "sent"
+    assert [(ref, result.success, result.attempts) for ref, result in calls] == [("ref-1", True, 1)]
+
+
+def test_permanent_failure_fails_at_once():
+    calls = []
+    outbox = make_outbox(calls)
+
+    async def scenario():
+        await add_messages(outbox, [1], kind="test")
+        [row] = await outbox.claim_batch()
+        await outbox._record(row, failure(row, permanent=True))
+        return (await get_rows())[0]
+
+    row = run(scenario)
+
+    assert row.status == "failed"
+    assert row.attempts == 1
+    assert row.last_error == "boom"
+    assert [(ref, result.success, result.attempts) for ref, result in calls] == [("ref-1", False, 1)]
+
+
+def test_retryable_failure_backs_off_until_max_attempts():
+    calls = []
+    outbox = make_outbox(calls)
+
+    async def scenario():
+        await add_messages(outbox, [1], kind="test")
+        history = []
+        for _ in range(outbox.max_attempts):
+            await make_due()
+            [row] = await outbox.claim_batch()
+            recorded_at = datetime.utcnow()
+            await outbox._record(row, failure(row))
+            row = (await get_rows())[0]
+            history.append((row.status, row.attempts, row.next_attempt_at - recorded_at, len(calls)))
+        return history
+
+    history = run(scenario)
+
+    # Exponential backoff with up to 10% jitter, the listener only hears the final outcome
+    (status1, attempts1, delay1, calls1), (status2, attempts2, delay2, calls2), final = history
+    assert (status1, attempts1, calls1) == ("pending", 1, 0)
+    assert timedelta(seconds=4.9) <= delay1 <= timedelta(seconds=5.6)
+    assert (status2, attempts2, calls2) == ("pending", 2, 0)
+    assert timedelta(seconds=9.9) <= delay2 <= timedelta(seconds=11.1)
+    assert (final[0], final[1], final[3]) == ("failed", 3, 1)
+    assert calls[0][1].attempts == 3
+
+
+def test_retry_delay_is_capped():
+    outbox = OutboxService(poll_interval=1, batch_size=10, retry_base_delay=5, retry_max_delay=60)
+
+    assert 60 <= outbox.retry_delay(20) <= 66
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import config
+from config import Config, RolesRegistry, ROLE_ADMIN, ROLE_GUEST, ROLE_WEBSITE
+
+
+@pytest.fixture
+def roles_file(tmp_path, monkeypatch):
+    # _load() writes the IDs back to Config, restore them after the test
+    for name in ("ADMIN_IDS", "BRIDE_ID", "GROOM_ID", "WEBSITE_BOT_ID"):
+        monkeypatch.setattr(Config, name, getattr(Config, name))
+    monkeypatch.setattr(config, "_PROCESS_ENV_KEYS", frozenset())
+
+    path = tmp_path / "roles.env"
+    path.write_text("BRIDE_ID=1\nGROOM_ID=2\nADMIN_IDS=1,2,3\nWEBSITE_BOT_ID=9\n")
+    return path
+
+
+def rewrite(path, text: str):
+    path.write_text(text)
+    # Make sure the modification time changes even on coarse clocks
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_roles_are_read_from_file(roles_file, monkeypatch):
+    registry = RolesRegistry(str(roles_file))
+    monkeypatch.setattr(config, "roles", registry)
+
+    assert registry.ids.owners == frozenset((1, 2))
+    assert registry.is_bride(1) and not registry.is_bride(2)
+    assert Config.get_owners() == frozenset((1, 2))
+    assert [registry.role_of(user_id) for user_id in (9, 3, 4)] == [ROLE_WEBSITE, ROLE_ADMIN, ROLE_GUEST]
+
+
+def test_reload_swaps_the_whole_snapshot(roles_file, monkeypatch):
+    registry = RolesRegistry(str(roles_file))
+    monkeypatch.setattr(config, "roles", registry)
+    before = registry.ids
+
+    rewrite(roles_file, "BRIDE_ID=5\nGROOM_ID=6\nADMIN_IDS=5\nWEBSITE_BOT_ID=9\n")
+    assert registry.reload_if_changed()
+
+    assert before.owners == frozenset((1, 2))
+    assert Config.get_owners() == frozenset((5, 6))
+    assert registry.is_bride(5)
+    assert registry.role_of(3) == ROLE_GUEST
+    assert Config.BRIDE_ID == 5
+
+
+def test_invalid_file_keeps_current_roles(roles_file):
+    registry = RolesRegistry(str(roles_file))
+    before = registry.ids
+
+    rewrite(roles_file, "BRIDE_ID=bride\n")
+    assert not registry.reload_if_changed()
+
+    assert registry.ids is before
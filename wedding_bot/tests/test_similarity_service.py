@@ -0,0 +1,36 @@
+from services.similarity_service import SimilarityIndex, KIND_FAQ, KIND_QUESTION
+
+THRESHOLD = 0.65
+
+
+def make_index():
+    index = SimilarityIndex()
+    index.upsert(KIND_FAQ, 1, "Можно ли прийти с детьми?", "Да, дети приглашены")
+    index.upsert(KIND_FAQ, 2, "Какой дресс-код?", "Коктейльный")
+    index.upsert(KIND_QUESTION, 3, "Где будет парковка?", "У ресторана")
+    return index
+
+
+def test_different_topic_with_same_boilerplate_does_not_match():
+    assert make_index().find_best("Можно ли прийти с собакой?", THRESHOLD) is None
+
+
+def test_rephrased_question_matches():
+    match = make_index().find_best("Можно прийти с детьми?", THRESHOLD)
+    assert match is not None
+    assert (match.kind, match.id) == (KIND_FAQ, 1)
+
+
+def test_answered_question_matches():
+    match = make_index().find_best("Где парковка?", THRESHOLD)
+    assert (match.kind, match.id) == (KIND_QUESTION, 3)
+
+
+def test_only_stop_words_do_not_match():
+    assert make_index().find_best("Можно ли?", THRESHOLD) is None
+
+
+def test_removed_document_does_not_match():
+    index = make_index()
+    index.remove(KIND_FAQ, 1)
+    assert index.find_best("Можно прийти с детьми?", THRESHOLD) is None
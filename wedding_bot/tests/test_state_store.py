@@ -0,0 +1,47 @@
+from handlers.conversation import ConversationStates, GUEST_QUESTION
+from handlers.router import MessageRouter
+from utils import state_store
+from utils.state_store import StateStore
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+def make_store(monkeypatch, clock: Clock) -> StateStore:
+    monkeypatch.setattr(state_store.time, "time", clock.time)
+    # Keep the test store out of the process-wide list
+    monkeypatch.setattr(state_store, "_stores", [])
+    return StateStore("test", ttl=60)
+
+
+def test_peek_hides_an_entry_whose_ttl_just_expired(monkeypatch):
+    clock = Clock()
+    store = make_store(monkeypatch, clock)
+    store.set(1, {"state": GUEST_QUESTION})
+
+    clock.now += 59.9
+    assert store.peek(1) == {"state": GUEST_QUESTION}
+
+    clock.now += 0.1
+    assert store.peek(1) is None
+    assert store.peek(1, "missing") == "missing"
+
+
+def test_expired_state_does_not_capture_text(monkeypatch):
+    clock = Clock()
+    states = ConversationStates(make_store(monkeypatch, clock))
+    monkeypatch.setattr("handlers.router.conversation_states", states)
+
+    router = MessageRouter()
+    router.add_state(GUEST_QUESTION, "receive_question")
+    router.set_fallback("fallback")
+    states.set(1, GUEST_QUESTION)
+
+    assert router.resolve(1, "Привет", role="guest")[0] == "receive_question"
+    clock.now += 60
+    assert router.resolve(1, "Привет", role="guest") == ("fallback", None)
@@ -0,0 +1,69 @@
+import asyncio
+
+from utils.update_processor import PerUserUpdateProcessor
+
+USER_A = 1
+USER_B = 2
+
+
+def make_processor(max_concurrent_updates: int) -> PerUserUpdateProcessor:
+    processor = PerUserUpdateProcessor(max_concurrent_updates)
+    # Updates in these tests are (user_id, name) tuples
+    processor.serialization_key = lambda update: update[0]
+    return processor
+
+
+def test_queued_updates_of_one_user_do_not_block_others():
+    processor = make_processor(2)
+    handled = []
+
+    async def scenario():
+        a_may_finish = asyncio.Event()
+
+        async def handle(update, wait: bool = False):
+            handled.append(update[1])
+            if wait:
+                await a_may_finish.wait()
+
+        tasks = [
+            asyncio.create_task(processor.process_update(update, handle(update, wait=True)))
+            for update in ((USER_A, "a1"), (USER_A, "a2"), (USER_A, "a3"))
+        ]
+        await asyncio.sleep(0)
+
+        # a1 is running, a2 and a3 wait for it without holding a slot
+        b = asyncio.create_task(processor.process_update((USER_B, "b1"), handle((USER_B, "b1"))))
+        await asyncio.wait_for(b, timeout=1)
+        handled_before_a_finished = list(handled)
+
+        a_may_finish.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        return handled_before_a_finished
+
+    handled_before_a_finished = asyncio.run(scenario())
+
+    assert handled_before_a_finished == ["a1", "b1"]
+    assert handled == ["a1", "b1", "a2", "a3"]
+    assert processor.active_users == 0
+
+
+def test_concurrency_is_limited():
+    processor = make_processor(2)
+    running = []
+    peak = []
+
+    async def handle():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def scenario():
+        await asyncio.gather(*(
+            processor.process_update((user_id, "text"), handle()) for user_id in range(6)
+        ))
+
+    asyncio.run(scenario())
+
+    assert max(peak) == 2
+    assert processor.max_concurrent_updates == 2
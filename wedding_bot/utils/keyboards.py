@@ -1,3 +1,5 @@
+from typing import Optional
+
 from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
 from config import Config
 
@@ -31,6 +33,15 @@ def get_answer_keyboard(question_id: int, from_user_id: int) -> InlineKeyboardMa
     return InlineKeyboardMarkup(keyboard)
 
 
+def get_duplicate_answer_keyboard() -> InlineKeyboardMarkup:
+    """Get keyboard under a stored answer offered for a guest question"""
+    keyboard = [
+        [InlineKeyboardButton("✅ Это ответ на мой вопрос", callback_data="dupq_ok")],
+        [InlineKeyboardButton("📨 Всё равно отправить вопрос", callback_data="dupq_send")]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
 def get_faq_management_keyboard(empty: bool = False) -> InlineKeyboardMarkup:
     """Get FAQ management keyboard"""
     if empty:
@@ -60,3 +71,54 @@ def get_faq_list_keyboard(faqs) -> InlineKeyboardMarkup:
     keyboard.append([InlineKeyboardButton("➕ Добавить", callback_data="faq_add")])
     keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="faq_back")])
     return InlineKeyboardMarkup(keyboard)
+
+
+def get_guests_page_keyboard(
+    prev_cursor: Optional[int],
+    next_cursor: Optional[int]
+) -> Optional[InlineKeyboardMarkup]:
+    """Get navigation keyboard for guest list pages"""
+    buttons = []
+    if prev_cursor is not None:
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"guests_prev_{prev_cursor}"))
+    if next_cursor is not None:
+        buttons.append(InlineKeyboardButton("Далее ▶️", callback_data=f"guests_next_{next_cursor}"))
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup([buttons])
+
+
+def get_inbox_keyboard(
+    questions,
+    prev_cursor: Optional[int] = None,
+    next_cursor: Optional[int] = None,
+    show_open: bool = False
+) -> InlineKeyboardMarkup:
+    """Get keyboard for the question inbox and digests"""
+    answer_buttons = [
+        InlineKeyboardButton(f"💬 #{question.id}", callback_data=f"inbox_answer_{question.id}")
+        for question in questions
+    ]
+    keyboard = [answer_buttons[i:i + 3] for i in range(0, len(answer_buttons), 3)]
+
+    navigation = []
+    if prev_cursor is not None:
+        navigation.append(InlineKeyboardButton("◀️ Назад", callback_data=f"inbox_prev_{prev_cursor}"))
+    if next_cursor is not None:
+        navigation.append(InlineKeyboardButton("Далее ▶️", callback_data=f"inbox_next_{next_cursor}"))
+    if navigation:
+        keyboard.append(navigation)
+
+    if show_open:
+        keyboard.append([InlineKeyboardButton("📥 Все вопросы", callback_data="inbox_open")])
+    keyboard.append([InlineKeyboardButton("▶️ Отвечать по очереди", callback_data="inbox_session")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def get_answer_session_keyboard() -> InlineKeyboardMarkup:
+    """Get keyboard under a question in an answering session"""
+    keyboard = [[
+        InlineKeyboardButton("⏭ Пропустить", callback_data="inbox_skip"),
+        InlineKeyboardButton("⏹ Завершить", callback_data="inbox_stop")
+    ]]
+    return InlineKeyboardMarkup(keyboard)
@@ -0,0 +1,236 @@
+"""Bounded key-value store for in-flight conversation state
+
+Entries expire after a TTL and the least recently used ones are evicted
+once the store is full. A backend persists entries so conversations and
+FAQ edit locks survive a restart; reads are always served from memory.
+Stores start in memory, the bot attaches the configured backend on start
+(attach_backend), so importing handlers never touches the disk.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+from config import Config
+
+_MISSING = object()
+
+
+class MemoryBackend:
+    """No persistence: state lives only as long as the process"""
+
+    def load(self, namespace: str) -> Iterable[Tuple[Any, Any, Optional[float]]]:
+        return ()
+
+    def save(self, namespace: str, key, value, expires_at: Optional[float]):
+        pass
+
+    def delete(self, namespace: str, key):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """Write-through persistence to a local SQLite file
+
+    Uses the stdlib sqlite3 driver synchronously: a single-row upsert on a
+    WAL database takes tens of microseconds, cheaper than a thread hop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state_entries ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def load(self, namespace: str):
+        now = time.time()
+        self._conn.execute(
+            "DELETE FROM state_entries WHERE namespace = ? AND expires_at <= ?",
+            (namespace, now)
+        )
+        rows = self._conn.execute(
+            "SELECT key, value, expires_at FROM state_entries WHERE namespace = ? ORDER BY rowid",
+            (namespace,)
+        )
+        return [(json.loads(key), json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def save(self, namespace: str, key, value, expires_at: Optional[float]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO state_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, json.dumps(key), json.dumps(value, ensure_ascii=False), expires_at)
+        )
+
+    def delete(self, namespace: str, key):
+        self._conn.execute(
+            "DELETE FROM state_entries WHERE namespace = ? AND key = ?",
+            (namespace, json.dumps(key))
+        )
+
+    def close(self):
+        self._conn.close()
+
+
+def create_backend(name: str = None, path: str = None):
+    """Create backend from STATE_BACKEND ("memory" or "sqlite")"""
+    name = (name or Config.STATE_BACKEND).lower()
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(path or Config.STATE_DB_PATH)
+    raise ValueError(f"Unknown state backend: {name}")
+
+
+class StateStore:
+    """Namespaced store with per-entry TTL and LRU eviction
+
+    Keys and values must be JSON-serializable. Values are replaced, not
+    mutated: call set() again after changing an entry so it is persisted.
+    """
+
+    def __init__(self, namespace: str, backend=None, ttl: float = None, max_entries: int = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {key: (value, expires_at)}
+
+        self.attach(backend or MemoryBackend())
+        _stores.append(self)
+
+    def attach(self, backend):
+        """Switch to backend: load its entries and persist the current ones"""
+        current = list(self._entries.items())
+        self.backend = backend
+
+        self._entries = OrderedDict()
+        for key, value, expires_at in backend.load(self.namespace):
+            self._entries[key] = (value, expires_at)
+        for key, (value, expires_at) in current:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            backend.save(self.namespace, key, value, expires_at)
+        self._evict()
+
+    def get(self, key, default=None):
+        """Get a live entry and mark it as recently used"""
+        item = self._entries.get(key)
+        if item is None:
+            return default
+
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def peek(self, key, default=None):
+        """Get a live entry without the LRU update
+
+        For hot paths: skips move_to_end, and an expired entry is only
+        hidden, not removed (purge_expired() or the next get() drops it).
+        """
+        item = self._entries.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            return default
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        """Store an entry; its TTL starts now"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        self.backend.save(self.namespace, key, value, expires_at)
+        self._evict()
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Store an entry only if the key is absent (or expired)"""
+        if self.get(key, _MISSING) is not _MISSING:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def pop(self, key, default=None):
+        """Remove an entry and return its value"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._remove(key)
+        return value
+
+    def purge_expired(self) -> int:
+        """Drop all expired entries"""
+        now = time.time()
+        expired = [
+            key for key, (_, expires_at) in self._entries.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key):
+        del self._entries[key]
+        self.backend.delete(self.namespace, key)
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self.backend.delete(self.namespace, key)
+
+
+def attach_backend(backend):
+    """Persist every store created so far through backend"""
+    for store in _stores:
+        store.attach(backend)
+
+
+def purge_expired_states() -> int:
+    """Drop expired entries of every store, also from the backend"""
+    return sum(store.purge_expired() for store in _stores)
+
+
+async def purge_expired_loop(interval: float):
+    """Purge expired entries periodically
+
+    Without it an expired entry stays in the backend until its key is
+    read again or the process restarts.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = purge_expired_states()
+            if purged:
+                print(f"🧹 Purged {purged} expired state entries", flush=True)
+        except Exception as e:
+            print(f"❌ Failed to purge expired state: {e}", flush=True)
+
+
+# Stores created in this process, for attach_backend() and purge_expired_states()
+_stores: List[StateStore] = []
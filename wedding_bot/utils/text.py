@@ -0,0 +1,93 @@
+"""Text normalization for FAQ search
+
+A light stemmer: it strips common Russian (and English plural) endings so
+"платье", "платья" and "платьем" match. It is not a full Snowball
+stemmer, but it is good enough for short FAQ texts and has no
+dependencies.
+"""
+import re
+from typing import List
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_MIN_STEM = 3
+
+_REFLEXIVE = ("ся", "сь")
+
+_ENDINGS = tuple(sorted({
+    # adjectives and participles
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый",
+    "ой", "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    # verbs
+    "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ило", "ыло", "ено",
+    "ует", "уют", "ены", "ить", "ыть", "ишь", "ать", "ять", "ешь", "ал", "ял", "ла", "ли", "ть",
+    # nouns
+    "иями", "ями", "ами", "ьми", "ми", "ией", "иям", "ием", "иях", "ев", "ов", "ье", "еи", "ии",
+    "ям", "ам", "ах", "ях", "ию", "ью", "ия", "ья",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+}, key=len, reverse=True))
+
+
+# Function words and question boilerplate ("можно ли прийти...") that carry
+# no topic; dropped before comparing questions so that only content words match
+STOP_WORDS = frozenset({
+    "а", "без", "бы", "в", "во", "вы", "вам", "вас", "где", "да", "для", "до", "его", "ее",
+    "если", "есть", "же", "за", "и", "из", "или", "их", "к", "как", "какая", "какие",
+    "какой", "когда", "ко", "кто", "ли", "мне", "можно", "мы", "на", "над", "нам", "нас",
+    "не", "нет", "ни", "нибудь", "но", "нужно", "надо", "о", "об", "от", "по", "под",
+    "при", "прийти", "придти", "приходить", "с", "со", "так", "там", "то", "тоже", "у",
+    "будет", "будут", "быть", "уже", "что", "чтобы", "это", "этот", "я",
+    "a", "an", "and", "can", "do", "i", "is", "of", "or", "the", "to", "we", "with", "you",
+})
+
+
+def normalize(text: str) -> str:
+    """Lowercase and unify ё"""
+    return text.lower().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized words"""
+    return _WORD_RE.findall(normalize(text))
+
+
+def stem(word: str) -> str:
+    """Strip inflection endings from a normalized word"""
+    if len(word) <= _MIN_STEM:
+        return word
+
+    if word.isascii():
+        if word.endswith("es") and len(word) - 2 >= _MIN_STEM:
+            return word[:-2]
+        if word.endswith("s") and not word.endswith("ss"):
+            return word[:-1]
+        return word
+
+    for ending in _REFLEXIVE:
+        if word.endswith(ending) and len(word) - 2 >= _MIN_STEM:
+            word = word[:-2]
+            break
+
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            word = word[:-len(ending)]
+            break
+
+    if word.endswith("ь") and len(word) - 1 >= _MIN_STEM:
+        word = word[:-1]
+    return word
+
+
+def stem_words(text: str) -> List[str]:
+    """Tokenize and stem text"""
+    return [stem(word) for word in tokenize(text)]
+
+
+def stem_text(text: str) -> str:
+    """Stemmed text as one string, as stored in the search index"""
+    return " ".join(stem_words(text))
+
+
+def content_stems(text: str) -> List[str]:
+    """Stems of the text's words except stop words"""
+    return [stem(word) for word in tokenize(text) if word not in STOP_WORDS]
@@ -0,0 +1,23 @@
+"""Bot API request class that records call latency"""
+import time
+
+from telegram.request import HTTPXRequest
+
+from utils.metrics import telegram_api_request_duration_seconds
+
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest that observes the latency of every Bot API method call"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        started_at = time.perf_counter()
+        result = "error"
+        try:
+            response = await super().do_request(url, method, *args, **kwargs)
+            result = "ok" if response[0] < 400 else "error"
+            return response
+        finally:
+            telegram_api_request_duration_seconds.observe(
+                time.perf_counter() - started_at, method=api_method, result=result
+            )
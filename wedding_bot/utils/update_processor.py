@@ -0,0 +1,95 @@
+"""Concurrent Telegram update processing with per-user ordering
+
+Updates from different users run in parallel; updates from the same user
+run one at a time in arrival order, so a user's conversation steps never
+race each other. Handler state (conversation_states, FAQ edit locks) is
+keyed by user and changed without awaiting in between, so per-user
+ordering is all it needs.
+"""
+import asyncio
+import sys
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from utils.metrics import registry, CallbackMetric
+
+
+class _UserLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # Updates holding or waiting for the lock
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently, serialised per user
+
+    max_concurrent_updates bounds updates being handled. An update waiting
+    for an earlier update of the same user does not hold a slot, so a burst
+    from one user never keeps other users waiting. Tasks are started in
+    arrival order and asyncio locks are FIFO, so each user's updates are
+    handled in the order Telegram sent them.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        # BaseUpdateProcessor.process_update (final) holds its semaphore
+        # around do_process_update, including the wait for the user's turn.
+        # Leave it unbounded and limit with our own slots instead.
+        super().__init__(sys.maxsize)
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        self._max_concurrent_updates = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._locks: Dict[int, _UserLock] = {}
+        registry.register(CallbackMetric(
+            "telegram_updates_active_users", "Users with an update being processed or waiting",
+            "gauge", lambda: self.active_users
+        ))
+
+    @staticmethod
+    def serialization_key(update: object) -> Optional[int]:
+        """User (or chat) whose updates must not overlap; None runs unordered"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user:
+            return update.effective_user.id
+        if update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.serialization_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        user_lock = self._locks.get(key)
+        if user_lock is None:
+            user_lock = self._locks[key] = _UserLock()
+
+        user_lock.users += 1
+        try:
+            async with user_lock.lock:
+                # Take a slot only once it is this update's turn
+                async with self._slots:
+                    await coroutine
+        finally:
+            user_lock.users -= 1
+            # Drop the lock with its last user so the dict does not grow
+            if not user_lock.users:
+                del self._locks[key]
+
+    @property
+    def active_users(self) -> int:
+        """Users with an update being processed or waiting"""
+        return len(self._locks)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass